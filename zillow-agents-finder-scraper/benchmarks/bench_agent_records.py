@@ -0,0 +1,68 @@
+import argparse
+import json
+import time
+import tracemalloc
+from typing import Any, Callable, List
+
+from common import PROFILES_DIR, load_corpus
+from extractors.zillow_parser import ZillowParser
+from utils.agent_record import AgentRecord
+
+def traced_mb(build: Callable[[], List[Any]]) -> float:
+    tracemalloc.start()
+    records = build()
+    current = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del records
+    return current / (1024 * 1024)
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare memory and NDJSON encoding of agent dicts and AgentRecords."
+    )
+    parser.add_argument("-n", "--agents", type=int, default=200_000, help="Records (default: 200000)")
+    return parser.parse_args()
+
+def main() -> None:
+    args = parse_args()
+    parser = ZillowParser(embedded_state=False)
+    templates = [parser.parse_agent_profile(html) for html in load_corpus(PROFILES_DIR).values()]
+    # Distinct URLs so every record holds at least one string of its own.
+    urls = [f"https://www.zillow.com/profile/bench-agent-{i}" for i in range(args.agents)]
+
+    def build_dicts() -> List[Any]:
+        return [
+            dict(templates[i % len(templates)].to_dict(), profileUrl=url)
+            for i, url in enumerate(urls)
+        ]
+
+    def build_records() -> List[Any]:
+        records = []
+        for i, url in enumerate(urls):
+            record = AgentRecord.from_dict(templates[i % len(templates)])
+            record.profile_url = url
+            records.append(record)
+        return records
+
+    urls_mb = traced_mb(lambda: list(urls))
+    dict_mb = traced_mb(build_dicts) - urls_mb
+    record_mb = traced_mb(build_records) - urls_mb
+
+    dicts = build_dicts()
+    records = build_records()
+    start = time.perf_counter()
+    dict_lines = [json.dumps(agent, ensure_ascii=False) for agent in dicts]
+    dict_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    record_lines = [record.to_json() for record in records]
+    record_seconds = time.perf_counter() - start
+    if dict_lines != record_lines:
+        raise AssertionError("AgentRecord.to_json output differs from json.dumps of the dict")
+
+    print(f"{args.agents} agents (NDJSON lines identical)")
+    print(f"  {'':<12}{'memory MB':>12}{'encode ms':>12}")
+    print(f"  {'dict':<12}{dict_mb:>12.1f}{dict_seconds * 1000:>12.1f}")
+    print(f"  {'AgentRecord':<12}{record_mb:>12.1f}{record_seconds * 1000:>12.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import random
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from bs4 import BeautifulSoup
+
+from common import PROFILES_DIR, load_corpus
+from extractors.count_scanner import COUNT_PHRASES, first_int_token, scan_counts
+from utils.helpers import try_int
+
+# Tokens try_int has to agree on, valid or not.
+ODD_TOKENS = (
+    "124", "+5", "-3", "1_000", "1__000", "_1", "1_", "1,234", ",5,", "1,_0", "+,5", ",",
+    "١٢٣", "１２", "12abc", "4.5", "²", "(12)", "12)", "0", "-0", "+-5", "9" * 5000,
+)
+ODD_WORDS = (
+    "Reviews", "REVIEW", "reviewed", "for sale", "For  sale", "FOR SALE", "Active Listings",
+    "sold", "Sold", "ſold", "İ", "homes", "agent", "\x00", "​", " ", " ", "\n",
+)
+
+def legacy_first_int_token(text: str) -> Optional[int]:
+    for part in text.split():
+        value = try_int(part)
+        if value is not None:
+            return value
+    return None
+
+def legacy_scan_counts(texts: Sequence[str]) -> Dict[str, Optional[int]]:
+    """
+    The per-node lowercase/split/try_int scan the parser used before
+    count_scanner.
+    """
+    counts: Dict[str, Optional[int]] = {field: None for field in COUNT_PHRASES}
+    for text in texts:
+        lower = text.lower()
+        for field, phrases in COUNT_PHRASES.items():
+            if counts[field] is None and any(phrase in lower for phrase in phrases):
+                counts[field] = legacy_first_int_token(text)
+    return counts
+
+def random_texts(rng: random.Random) -> List[str]:
+    texts = []
+    for _ in range(rng.randint(0, 12)):
+        words = [
+            rng.choice(ODD_TOKENS if rng.random() < 0.4 else ODD_WORDS)
+            for _ in range(rng.randint(0, 6))
+        ]
+        texts.append(rng.choice(("", " ", "\xa0", "\t")).join(words) if words else "")
+    return texts
+
+def check_parity(page_texts: Dict[str, List[str]], samples: int, seed: int) -> None:
+    for name, texts in page_texts.items():
+        expected = legacy_scan_counts(texts)
+        actual = scan_counts(texts)
+        if actual != expected:
+            raise AssertionError(f"Counts differ for {name}: {actual} vs {expected}")
+        for field in COUNT_PHRASES:
+            if scan_counts(texts, (field,)) != {field: expected[field]}:
+                raise AssertionError(f"{field} differs for {name} when scanned alone")
+
+    rng = random.Random(seed)
+    for _ in range(samples):
+        texts = random_texts(rng)
+        if scan_counts(texts) != legacy_scan_counts(texts):
+            raise AssertionError(f"Counts differ for {texts!r}")
+        for text in texts:
+            if first_int_token(text) != legacy_first_int_token(text):
+                raise AssertionError(f"first_int_token differs for {text!r}")
+
+def best_time(func: Callable[[Sequence[str]], object], corpus: List[List[str]], rounds: int) -> float:
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for texts in corpus:
+            func(texts)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare the regex count scanner with the per-node try_int scan."
+    )
+    parser.add_argument(
+        "-c",
+        "--corpus",
+        default=PROFILES_DIR,
+        help=f"Directory of saved profile pages (default: {PROFILES_DIR})",
+    )
+    parser.add_argument(
+        "-r",
+        "--rounds",
+        type=int,
+        default=20,
+        help="Timing rounds per mode; the best round is reported (default: 20)",
+    )
+    parser.add_argument(
+        "-n",
+        "--samples",
+        type=int,
+        default=20_000,
+        help="Random text samples checked for parity (default: 20000)",
+    )
+    parser.add_argument("--seed", type=int, default=7, help="Random seed (default: 7)")
+    return parser.parse_args()
+
+def main() -> None:
+    args = parse_args()
+    pages = load_corpus(args.corpus)
+    page_texts = {
+        f"{name} ({backend})": [str(text) for text in BeautifulSoup(html, backend).find_all(string=True)]
+        for name, html in pages.items()
+        for backend in ("html.parser", "lxml")
+    }
+    check_parity(page_texts, args.samples, args.seed)
+
+    corpus = list(page_texts.values())
+    legacy = best_time(legacy_scan_counts, corpus, args.rounds)
+    scanner = best_time(scan_counts, corpus, args.rounds)
+    print(
+        f"{len(corpus)} pages, {args.samples} random samples, best of {args.rounds} rounds "
+        "(results identical)"
+    )
+    for mode, seconds in (("per-node", legacy), ("regex scan", scanner)):
+        per_page_us = seconds / len(corpus) * 1e6
+        print(
+            f"  {mode:<11} {seconds * 1000:8.2f} ms total  {per_page_us:8.1f} us/page"
+            f"  {legacy / seconds:5.2f}x"
+        )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,384 @@
+import argparse
+import datetime
+import inspect
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+
+from common import BENCH_DIR
+import stub_server
+
+from utils.metrics import Metrics
+from pipeline import async_queries, runner
+from pipeline import queries as sync_queries
+
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+LOCATIONS = ("Orlando, FL", "Los Angeles, CA")
+
+class StageTimer:
+    """
+    Collects wall-clock durations per pipeline stage from any number of
+    threads.
+    """
+
+    def __init__(self) -> None:
+        self.samples: Dict[str, List[float]] = {}
+        self.metrics: Optional[Metrics] = None
+        self._lock = threading.Lock()
+
+    def record(self, stage: str, elapsed: float) -> None:
+        with self._lock:
+            self.samples.setdefault(stage, []).append(elapsed)
+
+    def wrap(self, stage: str, func: Callable[..., Any]) -> Callable[..., Any]:
+        if inspect.iscoroutinefunction(func):
+
+            async def timed_async(*args: Any, **kwargs: Any) -> Any:
+                start = time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+
+            return timed_async
+
+        def timed(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter() - start)
+
+        return timed
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage: _latency_summary(values) for stage, values in sorted(self.samples.items())}
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+def _latency_summary(values: List[float]) -> Dict[str, float]:
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "total_ms": sum(ordered) * 1000,
+        "p50_ms": _percentile(ordered, 50) * 1000,
+        "p90_ms": _percentile(ordered, 90) * 1000,
+        "p99_ms": _percentile(ordered, 99) * 1000,
+        "max_ms": ordered[-1] * 1000,
+    }
+
+def instrument(timer: StageTimer) -> None:
+    """
+    Wrap the client, parser and filter that process_queries builds so every
+    fetch, parse and filter call is timed.
+    """
+    build_http_client = runner.build_http_client
+    build_async_http_client = runner.build_async_http_client
+    build_parser = runner.build_parser
+    build_metrics = runner.build_metrics
+
+    def timed_client(client: Any) -> Any:
+        # get_url also fetches the later search results pages.
+        fetch_next_page = timer.wrap("fetch_search", client.get_url)
+        fetch_profile = timer.wrap("fetch_profile", client.get_url)
+        client.get = timer.wrap("fetch_search", client.get)
+        client.get_url = lambda url, *args, **kwargs: (
+            fetch_next_page if sync_queries.SEARCH_PATH in url else fetch_profile
+        )(url, *args, **kwargs)
+        return client
+
+    def build_timed_client(settings: Dict[str, Any], *args: Any) -> Any:
+        return timed_client(build_http_client(settings, *args))
+
+    def build_timed_async_client(settings: Dict[str, Any], *args: Any) -> Any:
+        return timed_client(build_async_http_client(settings, *args))
+
+    def build_timed_parser(settings: Dict[str, Any], *args: Any) -> Any:
+        parser = build_parser(settings, *args)
+        parser.parse_search_page = timer.wrap("parse_search", parser.parse_search_page)
+        if parser.max_pending:
+            # Pages go to worker processes; time each one until its record is back.
+            submit = parser.submit_agent_profile
+
+            def timed_submit(*args: Any, **kwargs: Any) -> Any:
+                start = time.perf_counter()
+                future = submit(*args, **kwargs)
+                future.add_done_callback(
+                    lambda _: timer.record("parse_profile", time.perf_counter() - start)
+                )
+                return future
+
+            parser.submit_agent_profile = timed_submit
+        else:
+            parser.parse_agent_profile = timer.wrap("parse_profile", parser.parse_agent_profile)
+        return parser
+
+    def build_kept_metrics(settings: Dict[str, Any]) -> Any:
+        timer.metrics = build_metrics(settings)
+        return timer.metrics
+
+    runner.build_http_client = build_timed_client
+    runner.build_async_http_client = build_timed_async_client
+    runner.build_parser = build_timed_parser
+    runner.build_metrics = build_kept_metrics
+    for module in (sync_queries, async_queries):
+        module.filter_agents = timer.wrap("filter", module.filter_agents)
+        module.matches_filter = timer.wrap("filter", module.matches_filter)
+
+def build_queries(base_url: str, searches: int, profiles: int, limit: int) -> List[Dict[str, Any]]:
+    queries: List[Dict[str, Any]] = []
+    for i in range(searches):
+        queries.append(
+            {
+                "type": "search",
+                "name": f"Bench Agent {i}",
+                "location": LOCATIONS[i % len(LOCATIONS)],
+                "limit": limit,
+                "filters": {"min_reviews": 10} if i % 2 else {"min_rating": 4.0},
+            }
+        )
+    for i in range(profiles):
+        queries.append(
+            {
+                "type": "profile",
+                "profileUrl": f"{base_url}/profile/BenchProfile{i}",
+                "filters": {},
+            }
+        )
+    return queries
+
+def build_settings(args: argparse.Namespace, base_url: str) -> Dict[str, Any]:
+    return {
+        "base_url": base_url,
+        "request_timeout": 10,
+        "max_retries": args.max_retries,
+        "retry_backoff_factor": 0,
+        "rate_limit_per_minute": 0,
+        "user_agent": "zillow-agents-finder-benchmark",
+        "profile_concurrency": args.profile_concurrency,
+        "query_concurrency": args.query_concurrency,
+        "cache_enabled": False,
+        "agent_cache_enabled": True,
+        "log_level": "WARNING",
+        "single_pass_extraction": True,
+        "parser_backend": args.backend,
+        "embedded_state_fast_path": True,
+        "parse_workers": args.parse_workers,
+        "http_backend": args.http_backend,
+        "search_max_pages": args.result_pages,
+        "search_card_prefilter": not args.no_card_prefilter,
+        "adaptive_throttle_enabled": not args.no_adaptive_throttle,
+    }
+
+def git_revision() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=BENCH_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip() or None
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run(args: argparse.Namespace) -> Dict[str, Any]:
+    if args.in_process_server:
+        server = stub_server.start_in_thread(
+            latency=args.latency_ms / 1000.0,
+            result_pages=args.result_pages,
+            max_rps=args.server_max_rps,
+        )
+        base_url = server.base_url
+    else:
+        _, base_url = stub_server.start_in_process(
+            latency=args.latency_ms / 1000.0,
+            port=args.port,
+            result_pages=args.result_pages,
+            max_rps=args.server_max_rps,
+        )
+
+    timer = StageTimer()
+    instrument(timer)
+    settings = build_settings(args, base_url)
+    queries = build_queries(base_url, args.searches, args.profiles, args.limit)
+
+    if args.trace_memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    agents = runner.process_queries(queries, settings)
+    elapsed = time.perf_counter() - start
+    traced_peak = None
+    if args.trace_memory:
+        traced_peak = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    profile_fetches = len(timer.samples.get("fetch_profile", []))
+    search_fetches = len(timer.samples.get("fetch_search", []))
+    counters = timer.metrics.snapshot()["counters"] if timer.metrics is not None else {}
+    throttled = counters.get("http.status.429", 0) + counters.get("http.status.503", 0)
+    return {
+        "revision": git_revision(),
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {
+            "searches": args.searches,
+            "profiles": args.profiles,
+            "limit": args.limit,
+            "result_pages": args.result_pages,
+            "card_prefilter": not args.no_card_prefilter,
+            "server_max_rps": args.server_max_rps,
+            "adaptive_throttle": not args.no_adaptive_throttle,
+            "latency_ms": args.latency_ms,
+            "profile_concurrency": args.profile_concurrency,
+            "query_concurrency": args.query_concurrency,
+            "parse_workers": args.parse_workers,
+            "backend": args.backend,
+            "http_backend": args.http_backend,
+        },
+        "elapsed_s": elapsed,
+        "queries": len(queries),
+        "agents": len(agents),
+        "throttled_responses": throttled,
+        "profile_fetches": profile_fetches,
+        "search_fetches": search_fetches,
+        "agents_per_s": len(agents) / elapsed if elapsed else 0.0,
+        "pages_per_s": (profile_fetches + search_fetches) / elapsed if elapsed else 0.0,
+        "stages": timer.summary(),
+        "peak_rss_mb": peak_rss_mb(),
+        "peak_traced_mb": traced_peak,
+    }
+
+def print_report(result: Dict[str, Any], baseline: Optional[Dict[str, Any]] = None) -> None:
+    def delta(key: str) -> str:
+        if not baseline or not baseline.get(key) or result.get(key) is None:
+            return ""
+        return f"  ({(result[key] / baseline[key] - 1) * 100:+.1f}% vs {baseline.get('revision')})"
+
+    print(
+        f"{result['queries']} queries, {result['agents']} agents, "
+        f"{result.get('search_fetches', 0)} search and {result['profile_fetches']} profile fetches "
+        f"in {result['elapsed_s']:.2f} s"
+        f"{delta('elapsed_s')}"
+    )
+    print(f"  agents/s      {result['agents_per_s']:8.1f}{delta('agents_per_s')}")
+    if result.get("throttled_responses"):
+        print(f"  throttled     {result['throttled_responses']:8d} responses (429/503)")
+    print(f"  pages/s       {result['pages_per_s']:8.1f}{delta('pages_per_s')}")
+    print(f"  peak RSS      {result['peak_rss_mb']:8.1f} MB{delta('peak_rss_mb')}")
+    if result["peak_traced_mb"] is not None:
+        print(f"  peak traced   {result['peak_traced_mb']:8.1f} MB{delta('peak_traced_mb')}")
+    print(f"  {'stage':<14}{'count':>7}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage, stats in result["stages"].items():
+        print(
+            f"  {stage:<14}{stats['count']:>7}{stats['p50_ms']:>10.2f}{stats['p90_ms']:>10.2f}"
+            f"{stats['p99_ms']:>10.2f}{stats['max_ms']:>10.2f}"
+        )
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Run process_queries end to end against a local server replaying "
+            "recorded pages and report throughput, per-stage latency and memory."
+        )
+    )
+    parser.add_argument("--searches", type=int, default=20, help="Search queries to run (default: 20)")
+    parser.add_argument("--profiles", type=int, default=20, help="Profile queries to run (default: 20)")
+    parser.add_argument("--limit", type=int, default=25, help="Limit per search query (default: 25)")
+    parser.add_argument(
+        "--result-pages",
+        type=int,
+        default=1,
+        help="Results pages the server links per search (default: 1)",
+    )
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=20.0,
+        help="Simulated server latency per response (default: 20)",
+    )
+    parser.add_argument("--profile-concurrency", type=int, default=4)
+    parser.add_argument("--query-concurrency", type=int, default=2)
+    parser.add_argument("--parse-workers", default=0, help='Parser processes, or "auto" (default: 0)')
+    parser.add_argument("--backend", default="html.parser", help="BeautifulSoup tree builder")
+    parser.add_argument(
+        "--http-backend",
+        default="requests",
+        choices=("requests", "aiohttp"),
+        help="HTTP client implementation (default: requests)",
+    )
+    parser.add_argument(
+        "--no-card-prefilter",
+        action="store_true",
+        help="Fetch every candidate profile instead of skipping those whose search card fails the filters",
+    )
+    parser.add_argument(
+        "--server-max-rps",
+        type=float,
+        help="Have the server answer 429 beyond this many requests per second",
+    )
+    parser.add_argument(
+        "--no-adaptive-throttle",
+        action="store_true",
+        help="Keep the configured concurrency and rate even when the server throttles",
+    )
+    parser.add_argument("--max-retries", type=int, default=1, help="HTTP attempts per request (default: 1)")
+    parser.add_argument("--port", type=int, default=8765, help="Stub server port (default: 8765)")
+    parser.add_argument(
+        "--in-process-server",
+        action="store_true",
+        help="Serve from a thread in this process instead of a child process",
+    )
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="Also report the tracemalloc peak (slows the run down)",
+    )
+    parser.add_argument(
+        "-o",
+        "--output",
+        help="Where to write the JSON result (default: benchmarks/results/end_to_end-<revision>.json)",
+    )
+    parser.add_argument("--compare", help="Earlier JSON result to report changes against")
+    args = parser.parse_args()
+    if args.parse_workers != "auto":
+        args.parse_workers = int(args.parse_workers)
+    return args
+
+def main() -> None:
+    args = parse_args()
+    logging.basicConfig(level=logging.WARNING)
+    result = run(args)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(result, baseline)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"end_to_end-{result['revision'] or 'unknown'}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=2)
+    print(f"Result written to {output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+import argparse
+import random
+import time
+from typing import Any, Dict, List
+
+from common import PROFILES_DIR, load_corpus
+from extractors.filter_index import AgentIndex
+from extractors.filters import AgentFilter, filter_agents
+from extractors.zillow_parser import ZillowParser
+
+CITIES = (
+    ("Orlando", "FL", "328"),
+    ("Los Angeles", "CA", "900"),
+    ("Austin", "TX", "787"),
+    ("Seattle", "WA", "981"),
+    ("Miami", "FL", "331"),
+    ("Denver", "CO", "802"),
+    ("Boston", "MA", "021"),
+    ("Phoenix", "AZ", "850"),
+)
+# Values the numeric filters have to coerce the same way filter_agents does.
+ODD_REVIEWS = (None, "17", "n/a", 12.9, True, "", "-3")
+ODD_RATINGS = (None, "4.5", "n/a", 5, "nan", "", float("inf"))
+
+def build_agents(count: int, seed: int) -> List[Dict[str, Any]]:
+    rng = random.Random(seed)
+    parser = ZillowParser(embedded_state=False)
+    templates = [parser.parse_agent_profile(html) for html in load_corpus(PROFILES_DIR).values()]
+    agents = []
+    for i in range(count):
+        agent = dict(rng.choice(templates))
+        city, state, zip_prefix = rng.choice(CITIES)
+        roll = rng.random()
+        if roll < 0.05:
+            agent["location"] = None
+        elif roll < 0.5:
+            agent["location"] = f"{city}, {state} {zip_prefix}{rng.randint(0, 99):02d}"
+        else:
+            agent["location"] = f"{city.upper() if roll < 0.6 else city}, {state}"
+        agent["reviews"] = rng.choice(ODD_REVIEWS) if rng.random() < 0.05 else rng.randint(0, 400)
+        agent["rating"] = (
+            rng.choice(ODD_RATINGS) if rng.random() < 0.05 else round(rng.uniform(1, 5), 1)
+        )
+        agent["profileUrl"] = f"https://www.zillow.com/profile/bench-agent-{i}"
+        agents.append(agent)
+    return agents
+
+def build_filters(count: int, seed: int) -> List[AgentFilter]:
+    rng = random.Random(seed + 1)
+    filters = [AgentFilter()]
+    while len(filters) < count:
+        city, state, zip_prefix = rng.choice(CITIES)
+        filters.append(
+            AgentFilter(
+                location=rng.choice((None, city, city.lower(), f"{city}, {state}", state)),
+                zip=rng.choice((None, None, None, zip_prefix, f"{zip_prefix}1")),
+                min_reviews=rng.choice((None, None, 0, 10, 50, 200, "25")),
+                min_rating=rng.choice((None, None, 3.0, 4.5, 4.9, "4")),
+            )
+        )
+    return filters
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Compare filter_agents with AgentIndex over many filters."
+    )
+    parser.add_argument("-n", "--agents", type=int, default=100_000, help="Agents (default: 100000)")
+    parser.add_argument("-f", "--filters", type=int, default=200, help="Filters (default: 200)")
+    parser.add_argument("--seed", type=int, default=7, help="Random seed (default: 7)")
+    return parser.parse_args()
+
+def main() -> None:
+    args = parse_args()
+    agents = build_agents(args.agents, args.seed)
+    filters = build_filters(args.filters, args.seed)
+
+    start = time.perf_counter()
+    expected = [filter_agents(agents, f) for f in filters]
+    scan_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index = AgentIndex(agents)
+    build_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    actual = index.filter_many(filters)
+    query_seconds = time.perf_counter() - start
+
+    for f, want, got in zip(filters, expected, actual):
+        if len(want) != len(got) or any(a is not b for a, b in zip(want, got)):
+            raise AssertionError(f"AgentIndex result differs for {f}: {len(got)} vs {len(want)} agents")
+
+    indexed_seconds = build_seconds + query_seconds
+    print(f"{len(agents)} agents, {len(filters)} filters (results identical)")
+    print(f"  filter_agents   {scan_seconds * 1000:10.1f} ms")
+    print(
+        f"  AgentIndex      {indexed_seconds * 1000:10.1f} ms"
+        f"  (build {build_seconds * 1000:.1f} ms, queries {query_seconds * 1000:.1f} ms)"
+        f"  {scan_seconds / indexed_seconds:5.2f}x"
+    )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import sys
+from typing import Dict, List
+
+from bs4.builder import builder_registry
+
+from common import PROFILES_DIR, SEARCH_DIR, best_time, load_corpus
+from extractors.zillow_parser import ZillowParser
+
+REFERENCE_BACKEND = "html.parser"
+
+def available_backends() -> List[str]:
+    return [name for name in ZillowParser.BACKENDS if builder_registry.lookup(name) is not None]
+
+def check_parity(
+    backends: List[str],
+    profiles: Dict[str, str],
+    searches: Dict[str, str],
+) -> List[str]:
+    """
+    Compare every backend (in both extraction modes) against html.parser on
+    each fixture and return a description of every mismatch.
+    """
+    reference = ZillowParser(backend=REFERENCE_BACKEND, single_pass=False, embedded_state=False)
+    expected_profiles = {name: reference.parse_agent_profile(html) for name, html in profiles.items()}
+    expected_searches = {name: reference.parse_search_results(html) for name, html in searches.items()}
+
+    failures: List[str] = []
+    for backend in backends:
+        for single_pass in (True, False):
+            parser = ZillowParser(backend=backend, single_pass=single_pass, embedded_state=False)
+            label = f"{backend} ({'single-pass' if single_pass else 'per-field'})"
+            for name, html in profiles.items():
+                actual = parser.parse_agent_profile(html)
+                if actual != expected_profiles[name]:
+                    failures.append(
+                        f"{label} profile {name}:\n"
+                        f"  expected: {expected_profiles[name]}\n  actual:   {actual}"
+                    )
+            for name, html in searches.items():
+                actual_urls = parser.parse_search_results(html)
+                if actual_urls != expected_searches[name]:
+                    failures.append(
+                        f"{label} search {name}:\n"
+                        f"  expected: {expected_searches[name]}\n  actual:   {actual_urls}"
+                    )
+    return failures
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Check parser backend parity and compare their throughput."
+    )
+    parser.add_argument(
+        "--profiles",
+        default=PROFILES_DIR,
+        help=f"Directory of saved profile pages (default: {PROFILES_DIR})",
+    )
+    parser.add_argument(
+        "--search",
+        default=SEARCH_DIR,
+        help=f"Directory of saved search result pages (default: {SEARCH_DIR})",
+    )
+    parser.add_argument(
+        "-r",
+        "--rounds",
+        type=int,
+        default=5,
+        help="Timing rounds per backend; the best round is reported (default: 5)",
+    )
+    parser.add_argument(
+        "--parity-only",
+        action="store_true",
+        help="Only run the parity checks",
+    )
+    return parser.parse_args()
+
+def main() -> None:
+    args = parse_args()
+    profiles = load_corpus(args.profiles)
+    searches = load_corpus(args.search)
+    backends = available_backends()
+
+    failures = check_parity(backends, profiles, searches)
+    if failures:
+        print("Parity check FAILED:")
+        for failure in failures:
+            print(failure)
+        sys.exit(1)
+    print(
+        f"Parity OK: {', '.join(backends)} agree on "
+        f"{len(profiles)} profile and {len(searches)} search pages"
+    )
+    if args.parity_only:
+        return
+
+    profile_pages = list(profiles.values())
+    search_pages = list(searches.values())
+    print(f"Throughput, best of {args.rounds} rounds:")
+    for backend in backends:
+        parser = ZillowParser(backend=backend, embedded_state=False)
+        profile_seconds = best_time(parser.parse_agent_profile, profile_pages, args.rounds)
+        search_seconds = best_time(parser.parse_search_results, search_pages, args.rounds)
+        print(
+            f"  {backend:<12} profiles {len(profile_pages) / profile_seconds:8.1f} pages/s"
+            f"   search {len(search_pages) / search_seconds:8.1f} pages/s"
+        )
+
+if __name__ == "__main__":
+    main()
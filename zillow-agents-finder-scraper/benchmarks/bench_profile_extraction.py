@@ -0,0 +1,66 @@
+import argparse
+from typing import Dict
+
+from common import PROFILES_DIR, best_time, load_corpus
+from extractors.zillow_parser import ZillowParser
+
+def check_parity(pages: Dict[str, str]) -> None:
+    single_pass = ZillowParser(single_pass=True, embedded_state=False)
+    per_field = ZillowParser(single_pass=False, embedded_state=False)
+    for name, html in pages.items():
+        expected = per_field.parse_agent_profile(html)
+        actual = single_pass.parse_agent_profile(html)
+        if actual != expected:
+            raise AssertionError(
+                f"Single-pass result differs for {name}:\n"
+                f"  per-field:   {expected}\n  single-pass: {actual}"
+            )
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Compare per-field, single-pass and embedded-state profile extraction."
+        )
+    )
+    parser.add_argument(
+        "-c",
+        "--corpus",
+        default=PROFILES_DIR,
+        help=f"Directory of saved profile pages (default: {PROFILES_DIR})",
+    )
+    parser.add_argument(
+        "-r",
+        "--rounds",
+        type=int,
+        default=5,
+        help="Timing rounds per mode; the best round is reported (default: 5)",
+    )
+    return parser.parse_args()
+
+def main() -> None:
+    args = parse_args()
+    pages = load_corpus(args.corpus)
+    check_parity(pages)
+
+    htmls = list(pages.values())
+    parsers = {
+        "per-field": ZillowParser(single_pass=False, embedded_state=False),
+        "single-pass": ZillowParser(single_pass=True, embedded_state=False),
+        "embedded": ZillowParser(single_pass=True, embedded_state=True),
+    }
+    results = {
+        mode: best_time(parser.parse_agent_profile, htmls, args.rounds)
+        for mode, parser in parsers.items()
+    }
+
+    print(f"{len(htmls)} pages, best of {args.rounds} rounds (per-field and single-pass identical)")
+    baseline = results["per-field"]
+    for mode, seconds in results.items():
+        per_page_ms = seconds / len(htmls) * 1000
+        print(
+            f"  {mode:<12} {seconds * 1000:8.2f} ms total  {per_page_ms:7.3f} ms/page"
+            f"  {baseline / seconds:5.2f}x"
+        )
+
+if __name__ == "__main__":
+    main()
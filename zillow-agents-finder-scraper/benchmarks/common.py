@@ -0,0 +1,36 @@
+import glob
+import os
+import sys
+import time
+from typing import Callable, Dict, List
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(BENCH_DIR, "fixtures")
+PROFILES_DIR = os.path.join(FIXTURES_DIR, "profiles")
+SEARCH_DIR = os.path.join(FIXTURES_DIR, "search")
+
+# Benchmarks import the scraper modules the same way main.py does.
+SRC_DIR = os.path.join(BENCH_DIR, "..", "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+def load_corpus(corpus_dir: str) -> Dict[str, str]:
+    pages: Dict[str, str] = {}
+    for path in sorted(glob.glob(os.path.join(corpus_dir, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            pages[os.path.basename(path)] = f.read()
+    if not pages:
+        raise FileNotFoundError(f"No saved *.html pages found in {corpus_dir}")
+    return pages
+
+def best_time(func: Callable[[str], object], pages: List[str], rounds: int) -> float:
+    """
+    Run ``func`` over every page ``rounds`` times and return the fastest round.
+    """
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for html in pages:
+            func(html)
+        best = min(best, time.perf_counter() - start)
+    return best
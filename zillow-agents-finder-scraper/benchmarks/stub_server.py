@@ -0,0 +1,236 @@
+import argparse
+import multiprocessing
+import os
+import re
+import sys
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from common import PROFILES_DIR, SEARCH_DIR, load_corpus
+from extractors.zillow_parser import ZillowParser
+
+SEARCH_PATH = "/agents/real-estate-agent-reviews/"
+_PROFILE_HREF_RE = re.compile(r'href="(?:https?://www\.zillow\.com)?/profile/([^"/?#]+)/?"')
+_NEXT_LINK_RE = re.compile(r'<a href="[^"]*[?&]page=\d+">Next</a>')
+_CARD_RE = re.compile(r'<li class="agent-card">.*?</li>', re.DOTALL)
+_CARD_SLUG_RE = re.compile(r'/profile/([^"/?#]+)"')
+_CARD_RATING_RE = re.compile(r'<span class="rating">[^<]*</span>')
+_CARD_REVIEWS_RE = re.compile(r'<span class="reviews">[^<]*</span>')
+
+class ReplayHandler(BaseHTTPRequestHandler):
+    """
+    Serves recorded pages: the search endpoint returns a saved results page
+    whose profile links point back at this server (made unique per search
+    query and results page), and every /profile/<slug> returns a saved
+    profile page picked by a stable hash of the slug. Result cards show the
+    rating and review count of the profile page their link leads to. Each
+    search has ``result_pages`` pages linked by "Next". With ``max_rps``
+    set, requests beyond that many per second get a 429 with
+    ``Retry-After: 1``, like a server that throttles scrapers.
+    """
+
+    server: "ReplayServer"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+    def do_GET(self) -> None:  # noqa: N802
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        if not self.server.admit():
+            self._send(429, "<html><body>Too many requests</body></html>", {"Retry-After": "1"})
+            return
+
+        parts = urlsplit(self.path)
+        if parts.path.rstrip("/") == SEARCH_PATH.rstrip("/"):
+            params = parse_qs(parts.query)
+            query = params.get("searchQuery", [""])[0]
+            try:
+                page = int(params.get("page", ["1"])[0])
+            except ValueError:
+                page = 1
+            self._send(200, self.server.search_page(query, page))
+        elif parts.path.startswith("/profile/"):
+            slug = parts.path[len("/profile/"):].strip("/")
+            self._send(200, self.server.profile_page(slug))
+        else:
+            self._send(404, "<html><body>Not found</body></html>")
+
+    def _send(self, status: int, body: str, headers: Optional[Dict[str, str]] = None) -> None:
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+class ReplayServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Room for async clients that open hundreds of connections at once.
+    request_queue_size = 1024
+
+    def __init__(
+        self,
+        address: Tuple[str, int],
+        latency: float = 0.0,
+        result_pages: int = 1,
+        max_rps: Optional[float] = None,
+        search_dir: str = SEARCH_DIR,
+        profiles_dir: str = PROFILES_DIR,
+    ) -> None:
+        super().__init__(address, ReplayHandler)
+        self.latency = latency
+        self.result_pages = result_pages
+        self.max_rps = max_rps
+        self.rejected = 0
+        self._allowance = max_rps or 0.0
+        self._allowance_updated = time.monotonic()
+        self._admit_lock = threading.Lock()
+        self.search_pages: List[str] = list(load_corpus(search_dir).values())
+        self.profile_pages: List[str] = list(load_corpus(profiles_dir).values())
+        parser = ZillowParser(embedded_state=True)
+        self.profile_cards: List[Tuple[str, str]] = []
+        for html in self.profile_pages:
+            agent = parser.parse_agent_profile(html)
+            rating = "" if agent.rating is None else str(agent.rating)
+            reviews = "" if agent.reviews is None else f"{agent.reviews} reviews"
+            self.profile_cards.append((rating, reviews))
+
+    def handle_error(self, request: object, client_address: Tuple[str, int]) -> None:
+        # Clients that stop early (limit reached) drop connections mid-response.
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def admit(self) -> bool:
+        if not self.max_rps:
+            return True
+        with self._admit_lock:
+            now = time.monotonic()
+            elapsed = now - self._allowance_updated
+            self._allowance = min(self.max_rps, self._allowance + elapsed * self.max_rps)
+            self._allowance_updated = now
+            if self._allowance >= 1:
+                self._allowance -= 1
+                return True
+            self.rejected += 1
+            return False
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def search_page(self, query: str, page: int = 1) -> str:
+        html = self.search_pages[zlib.crc32(query.encode("utf-8")) % len(self.search_pages)]
+        suffix = f"{zlib.crc32(query.encode('utf-8')):08x}"
+        if page > 1:
+            suffix += f"-p{page}"
+        html = _PROFILE_HREF_RE.sub(
+            lambda m: f'href="{self.base_url}/profile/{m.group(1)}-{suffix}"', html
+        )
+        html = _CARD_RE.sub(lambda m: self._sync_card(m.group(0)), html)
+        next_link = ""
+        if page < self.result_pages:
+            params = urlencode({"searchQuery": query, "page": page + 1})
+            next_link = f'<a href="{SEARCH_PATH}?{params}">Next</a>'
+        return _NEXT_LINK_RE.sub(next_link, html)
+
+    def _profile_index(self, slug: str) -> int:
+        return zlib.crc32(slug.encode("utf-8")) % len(self.profile_pages)
+
+    def _sync_card(self, card: str) -> str:
+        match = _CARD_SLUG_RE.search(card)
+        if match is None:
+            return card
+        rating, reviews = self.profile_cards[self._profile_index(match.group(1))]
+        card = _CARD_RATING_RE.sub(f'<span class="rating">{rating}</span>', card)
+        return _CARD_REVIEWS_RE.sub(f'<span class="reviews">{reviews}</span>', card)
+
+    def profile_page(self, slug: str) -> str:
+        return self.profile_pages[self._profile_index(slug)]
+
+def _serve(
+    port: int,
+    latency: float,
+    result_pages: int,
+    max_rps: Optional[float],
+    ready: "multiprocessing.synchronize.Event",
+) -> None:
+    server = ReplayServer(
+        ("127.0.0.1", port), latency=latency, result_pages=result_pages, max_rps=max_rps
+    )
+    ready.set()
+    server.serve_forever()
+
+def start_in_thread(
+    latency: float = 0.0,
+    port: int = 0,
+    result_pages: int = 1,
+    max_rps: Optional[float] = None,
+) -> ReplayServer:
+    server = ReplayServer(
+        ("127.0.0.1", port), latency=latency, result_pages=result_pages, max_rps=max_rps
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def start_in_process(
+    latency: float = 0.0,
+    port: int = 8765,
+    result_pages: int = 1,
+    max_rps: Optional[float] = None,
+) -> Tuple[multiprocessing.Process, str]:
+    """
+    Run the server in a child process so it doesn't share the GIL or the
+    memory accounting of the code being measured.
+    """
+    ready = multiprocessing.Event()
+    process = multiprocessing.Process(target=_serve, args=(port, latency, result_pages, max_rps, ready), daemon=True)
+    process.start()
+    if not ready.wait(timeout=10):
+        process.terminate()
+        raise RuntimeError("Stub server did not start")
+    return process, f"http://127.0.0.1:{port}"
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Serve recorded Zillow pages locally.")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on (default: 8765)")
+    parser.add_argument(
+        "--latency-ms",
+        type=float,
+        default=0.0,
+        help="Artificial delay added to every response (default: 0)",
+    )
+    parser.add_argument(
+        "--result-pages",
+        type=int,
+        default=1,
+        help="Results pages per search, linked by 'Next' (default: 1)",
+    )
+    parser.add_argument(
+        "--max-rps",
+        type=float,
+        help="Answer 429 to requests beyond this many per second (default: no limit)",
+    )
+    return parser.parse_args()
+
+def main() -> None:
+    args = parse_args()
+    server = ReplayServer(
+        ("127.0.0.1", args.port),
+        latency=args.latency_ms / 1000.0,
+        result_pages=args.result_pages,
+        max_rps=args.max_rps,
+    )
+    print(f"Serving recorded pages on {server.base_url} (pid {os.getpid()})")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
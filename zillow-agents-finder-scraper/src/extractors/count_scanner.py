@@ -0,0 +1,102 @@
+import re
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# Phrases that mark the text node holding each count, matched like
+# ``phrase in text.lower()``.
+COUNT_PHRASES: Dict[str, Sequence[str]] = {
+    "reviews": ("review",),
+    "salesListings": ("for sale", "active listings"),
+    "soldListings": ("sold",),
+}
+
+# Joins text nodes into one document; nodes containing it are scanned one by one.
+NODE_SEPARATOR = "\x00"
+
+# A whitespace-delimited token that ``try_int`` accepts: an optional sign and
+# (Unicode) digits, single underscores between digits, and commas anywhere.
+_INT_BODY = r",*[+-]?,*\d[\d,]*(?:_,*\d[\d,]*)*"
+INT_TOKEN = re.compile(rf"(?<!\S){_INT_BODY}(?!\S)")
+# The same inside a joined document, where node boundaries end tokens too.
+_NODE_INT_TOKEN = re.compile(rf"(?<![^\s\x00]){_INT_BODY}(?![^\s\x00])")
+
+# ASCII-only case folding is what ``str.lower`` does for these phrases.
+_PHRASE_PATTERN = re.compile(
+    "|".join(
+        f"(?P<{field}>{'|'.join(re.escape(phrase) for phrase in phrases)})"
+        for field, phrases in COUNT_PHRASES.items()
+    ),
+    re.IGNORECASE | re.ASCII,
+)
+
+def _first_int(matches: Iterable["re.Match[str]"]) -> Optional[int]:
+    for match in matches:
+        try:
+            return int(match.group().replace(",", ""))
+        except ValueError:  # more digits than int() converts
+            continue
+    return None
+
+def first_int_token(text: str) -> Optional[int]:
+    """
+    The first whitespace-separated token of ``text`` that ``try_int``
+    accepts, as an int; None if there is none.
+    """
+    return _first_int(INT_TOKEN.finditer(text))
+
+def scan_counts(
+    texts: Sequence[str],
+    fields: Optional[Iterable[str]] = None,
+) -> Dict[str, Optional[int]]:
+    """
+    Find the review, for-sale and sold counts among a page's text nodes in
+    one pass: for each field, the first integer token of the first node
+    that mentions one of its ``COUNT_PHRASES`` and has such a token.
+    """
+    wanted = set(COUNT_PHRASES if fields is None else fields)
+    counts: Dict[str, Optional[int]] = {field: None for field in wanted}
+    if not texts:
+        return counts
+    document = NODE_SEPARATOR.join(texts)
+    if document.count(NODE_SEPARATOR) != len(texts) - 1:
+        return _scan_nodes(texts, wanted, counts)
+
+    pending = set(wanted)
+    # Start of the last node checked for each field, so a node mentioning a
+    # phrase twice is only scanned once.
+    checked: Dict[str, int] = {}
+    for match in _PHRASE_PATTERN.finditer(document):
+        field = match.lastgroup
+        if field not in pending:
+            continue
+        start = document.rfind(NODE_SEPARATOR, 0, match.start()) + 1
+        if checked.get(field) == start:
+            continue
+        checked[field] = start
+        end = document.find(NODE_SEPARATOR, match.end())
+        value = _first_int(
+            _NODE_INT_TOKEN.finditer(document, start, len(document) if end < 0 else end)
+        )
+        if value is not None:
+            counts[field] = value
+            pending.discard(field)
+            if not pending:
+                break
+    return counts
+
+def _scan_nodes(
+    texts: Sequence[str],
+    wanted: Iterable[str],
+    counts: Dict[str, Optional[int]],
+) -> Dict[str, Optional[int]]:
+    # Fallback for text that contains NODE_SEPARATOR itself.
+    pending: List[str] = list(wanted)
+    for text in texts:
+        fields = {match.lastgroup for match in _PHRASE_PATTERN.finditer(text)}
+        for field in [field for field in pending if field in fields]:
+            value = first_int_token(text)
+            if value is not None:
+                counts[field] = value
+                pending.remove(field)
+        if not pending:
+            break
+    return counts
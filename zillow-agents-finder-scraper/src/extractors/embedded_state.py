@@ -0,0 +1,176 @@
+import json
+import logging
+import re
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from utils.helpers import normalize_whitespace, try_float, try_int
+
+_SCRIPT_RE = re.compile(r"<script\b([^>]*)>(.*?)</script\s*>", re.IGNORECASE | re.DOTALL)
+_NEXT_DATA_RE = re.compile(r"""\bid\s*=\s*["']?__NEXT_DATA__\b""", re.IGNORECASE)
+_JSON_LD_RE = re.compile(r"""\btype\s*=\s*["']?application/ld\+json\b""", re.IGNORECASE)
+
+AGENT_LD_TYPES = {"RealEstateAgent", "Person", "LocalBusiness", "Organization"}
+
+# Keys looked up (depth-first, first hit wins) inside __NEXT_DATA__ for each
+# agent field. A dotted key descends into nested objects from the match.
+NEXT_DATA_KEYS: Dict[str, Tuple[str, ...]] = {
+    "agentName": ("displayUser.name", "agentName", "fullName"),
+    "agency": ("displayUser.businessName", "businessName", "brokerageName"),
+    "phoneNumber": ("phoneNumbers.cell", "phoneNumbers.business", "phoneNumber"),
+    "reviews": ("ratings.count", "reviewCount", "totalReviews"),
+    "rating": ("ratings.average", "averageRating", "ratingValue"),
+    "salesListings": ("forSaleListings.listing_count", "activeListingsCount", "forSaleCount"),
+    "soldListings": ("pastSales.total", "soldListingsCount", "soldCount"),
+    "location": ("displayUser.location", "businessAddress.cityStateZip", "cityState"),
+    "profileUrl": ("profileUrl", "canonicalUrl"),
+}
+
+def _iter_scripts(html: str) -> Iterator[Tuple[str, str]]:
+    for match in _SCRIPT_RE.finditer(html):
+        yield match.group(1), match.group(2)
+
+def _load_json(text: str) -> Any:
+    try:
+        return json.loads(text.strip())
+    except ValueError as exc:
+        logging.debug("Ignoring undecodable embedded JSON: %s", exc)
+        return None
+
+def find_embedded_blobs(html: str) -> Tuple[Optional[Any], List[Any]]:
+    """
+    Return the decoded ``__NEXT_DATA__`` object (or None) and every decoded
+    JSON-LD block found in the raw HTML, without building a DOM.
+    """
+    next_data = None
+    json_ld: List[Any] = []
+    for attrs, body in _iter_scripts(html):
+        if next_data is None and _NEXT_DATA_RE.search(attrs):
+            next_data = _load_json(body)
+        elif _JSON_LD_RE.search(attrs):
+            decoded = _load_json(body)
+            if decoded is not None:
+                json_ld.append(decoded)
+    return next_data, json_ld
+
+def _lookup_path(value: Any, path: List[str]) -> Any:
+    for part in path:
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+def _find_key(data: Any, dotted_key: str) -> Any:
+    """
+    Depth-first search for the first dict containing the head of
+    ``dotted_key`` whose remaining path resolves to a non-empty value.
+    """
+    head, *rest = dotted_key.split(".")
+    stack = [data]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, dict):
+            if head in node:
+                found = _lookup_path(node[head], rest)
+                if found not in (None, "", [], {}):
+                    return found
+            stack.extend(reversed(list(node.values())))
+        elif isinstance(node, list):
+            stack.extend(reversed(node))
+    return None
+
+def _iter_ld_nodes(blob: Any) -> Iterator[Dict[str, Any]]:
+    if isinstance(blob, list):
+        for item in blob:
+            yield from _iter_ld_nodes(item)
+    elif isinstance(blob, dict):
+        if "@graph" in blob:
+            yield from _iter_ld_nodes(blob["@graph"])
+        yield blob
+
+def _is_agent_node(node: Dict[str, Any]) -> bool:
+    types = node.get("@type")
+    if isinstance(types, str):
+        types = [types]
+    return bool(types) and any(t in AGENT_LD_TYPES for t in types)
+
+def _name_of(value: Any) -> Optional[str]:
+    if isinstance(value, dict):
+        value = value.get("name")
+    if isinstance(value, list) and value:
+        return _name_of(value[0])
+    return value if isinstance(value, str) else None
+
+def _location_of(address: Any) -> Optional[str]:
+    if isinstance(address, list) and address:
+        address = address[0]
+    if isinstance(address, str):
+        return address
+    if not isinstance(address, dict):
+        return None
+    parts = [address.get("addressLocality"), address.get("addressRegion")]
+    parts = [part for part in parts if isinstance(part, str) and part.strip()]
+    return ", ".join(parts) if parts else None
+
+def _fields_from_json_ld(blobs: List[Any]) -> Dict[str, Any]:
+    fields: Dict[str, Any] = {}
+    for blob in blobs:
+        for node in _iter_ld_nodes(blob):
+            if not _is_agent_node(node):
+                continue
+            rating = node.get("aggregateRating")
+            if not isinstance(rating, dict):
+                rating = {}
+            candidates = {
+                "agentName": node.get("name"),
+                "profileUrl": node.get("url"),
+                "agency": _name_of(node.get("worksFor") or node.get("parentOrganization") or node.get("brand")),
+                "phoneNumber": node.get("telephone"),
+                "location": _location_of(node.get("address")),
+                "rating": rating.get("ratingValue"),
+                "reviews": rating.get("reviewCount") or rating.get("ratingCount"),
+            }
+            for key, value in candidates.items():
+                if fields.get(key) is None and value not in (None, ""):
+                    fields[key] = value
+    return fields
+
+def _fields_from_next_data(next_data: Any) -> Dict[str, Any]:
+    fields: Dict[str, Any] = {}
+    for field, keys in NEXT_DATA_KEYS.items():
+        for key in keys:
+            value = _find_key(next_data, key)
+            if value is not None:
+                fields[field] = value
+                break
+    return fields
+
+def _normalize(fields: Dict[str, Any]) -> Dict[str, Any]:
+    normalized: Dict[str, Any] = {}
+    for key, value in fields.items():
+        if key in ("reviews", "salesListings", "soldListings"):
+            value = try_int(value)
+        elif key == "rating":
+            value = try_float(value)
+        elif isinstance(value, str):
+            value = normalize_whitespace(value) if key != "profileUrl" else value.strip()
+        else:
+            # Unexpected shape (e.g. an object where a string belongs).
+            value = None
+        if value is not None and value != "":
+            normalized[key] = value
+    return normalized
+
+def extract_embedded_fields(html: str) -> Dict[str, Any]:
+    """
+    Pull agent fields out of the structured state embedded in a profile page
+    (``__NEXT_DATA__`` first, then schema.org JSON-LD). Only fields that were
+    found are returned, normalized to the same types as the DOM extractors.
+    """
+    next_data, json_ld = find_embedded_blobs(html)
+    fields: Dict[str, Any] = {}
+    if next_data is not None:
+        fields.update(_normalize(_fields_from_next_data(next_data)))
+    if json_ld:
+        for key, value in _normalize(_fields_from_json_ld(json_ld)).items():
+            fields.setdefault(key, value)
+    return fields
@@ -0,0 +1,130 @@
+import math
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from extractors.filters import AgentFilter, rating_value, review_count
+
+class _SortedColumn:
+    """
+    One numeric column, plus agent ids ordered by value so "value >= t" is
+    a bisect and a slice instead of a comparison per agent.
+    """
+
+    def __init__(self, values: List[Any]) -> None:
+        self.values = values
+        # NaN compares false against every threshold; keep it out of the order.
+        ids = [
+            i for i, value in enumerate(values) if not (isinstance(value, float) and math.isnan(value))
+        ]
+        ids.sort(key=values.__getitem__)
+        self.ids = ids
+        self.sorted_values = [values[i] for i in ids]
+
+    def count_at_least(self, threshold: Any) -> int:
+        if isinstance(threshold, float) and math.isnan(threshold):
+            return 0
+        return len(self.ids) - bisect_left(self.sorted_values, threshold)
+
+    def at_least(self, threshold: Any) -> List[int]:
+        count = self.count_at_least(threshold)
+        return self.ids[len(self.ids) - count:] if count else []
+
+class AgentIndex:
+    """
+    Read-only index over a fixed collection of agent records for running
+    many :class:`AgentFilter` queries against the same data.
+
+    Records are normalized once into columns: review counts and ratings
+    (converted exactly as ``filter_agents`` converts them, and sorted so a
+    minimum is a bisect) and location strings, grouped by distinct value so
+    a location or zip filter scans each distinct location once. Each query
+    starts from its most selective criterion and checks the others against
+    the columns. ``filter`` returns the same records, in the same order, as
+    ``filter_agents(agents, filters)``.
+    """
+
+    def __init__(self, agents: Iterable[Mapping[str, Any]]) -> None:
+        self.agents: List[Mapping[str, Any]] = list(agents)
+        self._reviews: Optional[_SortedColumn] = None
+        self._ratings: Optional[_SortedColumn] = None
+
+        self._locations = [agent.get("location") or "" for agent in self.agents]
+        self._lower_locations = [location.lower() for location in self._locations]
+        self._by_location: Dict[str, List[int]] = {}
+        self._by_lower_location: Dict[str, List[int]] = {}
+        for i, (location, lower) in enumerate(zip(self._locations, self._lower_locations)):
+            self._by_location.setdefault(location, []).append(i)
+            self._by_lower_location.setdefault(lower, []).append(i)
+        self._substring_hits: Dict[Tuple[bool, str], List[int]] = {}
+
+    def __len__(self) -> int:
+        return len(self.agents)
+
+    def _reviews_column(self) -> _SortedColumn:
+        if self._reviews is None:
+            self._reviews = _SortedColumn([review_count(agent) for agent in self.agents])
+        return self._reviews
+
+    def _ratings_column(self) -> _SortedColumn:
+        if self._ratings is None:
+            self._ratings = _SortedColumn([rating_value(agent) for agent in self.agents])
+        return self._ratings
+
+    def _containing(self, needle: str, lower: bool) -> List[int]:
+        key = (lower, needle)
+        hits = self._substring_hits.get(key)
+        if hits is None:
+            groups = self._by_lower_location if lower else self._by_location
+            hits = [i for location, ids in groups.items() if needle in location for i in ids]
+            self._substring_hits[key] = hits
+        return hits
+
+    def matching_ids(self, filters: AgentFilter) -> List[int]:
+        """
+        Positions (ascending) of the agents that satisfy ``filters``.
+        """
+        if not self.agents:
+            return []
+
+        # (estimated matches, candidate ids, check for a single id)
+        criteria: List[Tuple[int, Callable[[], List[int]], Callable[[int], bool]]] = []
+        if filters.location:
+            needle = filters.location.lower()
+            hits = self._containing(needle, lower=True)
+            lower_locations = self._lower_locations
+            criteria.append((len(hits), lambda: hits, lambda i: needle in lower_locations[i]))
+        if filters.zip:
+            zip_code = filters.zip
+            zip_hits = self._containing(zip_code, lower=False)
+            locations = self._locations
+            criteria.append((len(zip_hits), lambda: zip_hits, lambda i: zip_code in locations[i]))
+        if filters.min_reviews is not None:
+            criteria.append(self._at_least(self._reviews_column(), int(filters.min_reviews)))
+        if filters.min_rating is not None:
+            criteria.append(self._at_least(self._ratings_column(), float(filters.min_rating)))
+
+        if not criteria:
+            return list(range(len(self.agents)))
+        criteria.sort(key=lambda criterion: criterion[0])
+        ids = criteria[0][1]()
+        for _, _, check in criteria[1:]:
+            ids = [i for i in ids if check(i)]
+        return sorted(ids)
+
+    @staticmethod
+    def _at_least(
+        column: _SortedColumn, threshold: Any
+    ) -> Tuple[int, Callable[[], List[int]], Callable[[int], bool]]:
+        values = column.values
+        return (
+            column.count_at_least(threshold),
+            lambda: column.at_least(threshold),
+            lambda i: values[i] >= threshold,
+        )
+
+    def filter(self, filters: AgentFilter) -> List[Mapping[str, Any]]:
+        agents = self.agents
+        return [agents[i] for i in self.matching_ids(filters)]
+
+    def filter_many(self, filters: Iterable[AgentFilter]) -> List[List[Mapping[str, Any]]]:
+        return [self.filter(f) for f in filters]
@@ -1,5 +1,5 @@
-thonfrom dataclasses import dataclass
-from typing import Any, Dict, List, Optional
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional
 
 @dataclass
 class AgentFilter:
@@ -21,39 +21,49 @@ class AgentFilter:
             min_rating=data.get("min_rating") or data.get("minRating"),
         )
 
-def _matches_location(agent: Dict[str, Any], location: Optional[str]) -> bool:
+def review_count(agent: Mapping[str, Any]) -> int:
+    """
+    The agent's review count as compared by ``min_reviews`` (0 if unusable).
+    """
+    reviews = agent.get("reviews")
+    try:
+        return int(reviews) if reviews is not None else 0
+    except (TypeError, ValueError):
+        return 0
+
+def rating_value(agent: Mapping[str, Any]) -> float:
+    """
+    The agent's rating as compared by ``min_rating`` (0.0 if unusable).
+    """
+    rating = agent.get("rating")
+    try:
+        return float(rating) if rating is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+def _matches_location(agent: Mapping[str, Any], location: Optional[str]) -> bool:
     if not location:
         return True
     agent_loc = (agent.get("location") or "").lower()
     return location.lower() in agent_loc
 
-def _matches_zip(agent: Dict[str, Any], zip_code: Optional[str]) -> bool:
+def _matches_zip(agent: Mapping[str, Any], zip_code: Optional[str]) -> bool:
     if not zip_code:
         return True
     agent_loc = (agent.get("location") or "")
     return zip_code in agent_loc
 
-def _matches_min_reviews(agent: Dict[str, Any], min_reviews: Optional[int]) -> bool:
+def _matches_min_reviews(agent: Mapping[str, Any], min_reviews: Optional[int]) -> bool:
     if min_reviews is None:
         return True
-    reviews = agent.get("reviews")
-    try:
-        reviews_int = int(reviews) if reviews is not None else 0
-    except (TypeError, ValueError):
-        reviews_int = 0
-    return reviews_int >= int(min_reviews)
+    return review_count(agent) >= int(min_reviews)
 
-def _matches_min_rating(agent: Dict[str, Any], min_rating: Optional[float]) -> bool:
+def _matches_min_rating(agent: Mapping[str, Any], min_rating: Optional[float]) -> bool:
     if min_rating is None:
         return True
-    rating = agent.get("rating")
-    try:
-        rating_float = float(rating) if rating is not None else 0.0
-    except (TypeError, ValueError):
-        rating_float = 0.0
-    return rating_float >= float(min_rating)
+    return rating_value(agent) >= float(min_rating)
 
-def matches_filter(agent: Dict[str, Any], filters: AgentFilter) -> bool:
+def matches_filter(agent: Mapping[str, Any], filters: AgentFilter) -> bool:
     """
     Return True if the agent satisfies the filter criteria.
     """
@@ -67,9 +77,29 @@ def matches_filter(agent: Dict[str, Any], filters: AgentFilter) -> bool:
         return False
     return True
 
-def filter_agents(agents: List[Dict[str, Any]], filters: AgentFilter) -> List[Dict[str, Any]]:
+def may_match(agent: Mapping[str, Any], filters: AgentFilter) -> bool:
+    """
+    Like ``matches_filter`` for a partial record, such as a search result
+    card: criteria on fields the record doesn't have (None) are not checked,
+    so only agents that certainly fail the filters are rejected.
+    """
+    location = agent.get("location")
+    if location is not None:
+        if not _matches_location(agent, filters.location):
+            return False
+        # Cards often show just the city; only a location with digits has a zip to check.
+        if any(char.isdigit() for char in location) and not _matches_zip(agent, filters.zip):
+            return False
+    if agent.get("reviews") is not None and not _matches_min_reviews(agent, filters.min_reviews):
+        return False
+    if agent.get("rating") is not None and not _matches_min_rating(agent, filters.min_rating):
+        return False
+    return True
+
+def filter_agents(agents: List[Mapping[str, Any]], filters: AgentFilter) -> List[Mapping[str, Any]]:
     """
-    Filter a list of agent records based on the provided filters.
+    Filter a list of agent records (dicts or ``AgentRecord``s) based on the
+    provided filters.
     """
     if not agents:
         return []
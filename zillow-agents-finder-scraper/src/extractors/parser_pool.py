@@ -0,0 +1,113 @@
+import logging
+import os
+import signal
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Optional
+
+from extractors.zillow_parser import SearchPage, ZillowParser
+from utils.agent_record import AgentRecord
+from utils.metrics import Metrics
+
+# Parser instance owned by each worker process.
+_worker_parser: Optional[ZillowParser] = None
+
+def _init_worker(single_pass: bool, backend: str, embedded_state: bool) -> None:
+    global _worker_parser
+    # Ctrl-C is handled by the main process, which then shuts the pool down.
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_parser = ZillowParser(
+        single_pass=single_pass, backend=backend, embedded_state=embedded_state
+    )
+
+def _parse_agent_profile(html: str, profile_url: Optional[str]) -> AgentRecord:
+    assert _worker_parser is not None
+    return _worker_parser.parse_agent_profile(html, profile_url=profile_url)
+
+def _parse_search_page(html: str, limit: Optional[int]) -> SearchPage:
+    assert _worker_parser is not None
+    return _worker_parser.parse_search_page(html, limit=limit)
+
+class ProcessPoolParser(ZillowParser):
+    """
+    ZillowParser that hands pages to a pool of worker processes, so parsing
+    runs on every core instead of sharing the fetch threads' GIL.
+
+    ``submit_agent_profile`` returns as soon as the page is queued, so fetch
+    threads can go on fetching while it is parsed; the ``parse_*`` methods
+    wait for the result. At most ``max_pending`` pages are queued for or
+    inside the workers; further callers wait before submitting, which keeps
+    memory bounded when fetching outruns parsing.
+
+    Workers don't share ``metrics``; only the time each page takes to come
+    back (queueing included) is recorded, as ``parse.search`` and
+    ``parse.profile``.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_pending: Optional[int] = None,
+        single_pass: bool = True,
+        backend: str = "html.parser",
+        embedded_state: bool = True,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        super().__init__(
+            single_pass=single_pass,
+            backend=backend,
+            embedded_state=embedded_state,
+            metrics=metrics,
+        )
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 2
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=_init_worker,
+            initargs=(single_pass, backend, embedded_state),
+        )
+        logging.info(
+            "Parsing in %d worker processes (max %d pages pending).",
+            self.workers,
+            self.max_pending,
+        )
+
+    def _submit(self, func: Callable[..., Any], *args: Any) -> "Future[Any]":
+        self._slots.acquire()
+        try:
+            future: "Future[Any]" = self._executor.submit(func, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def parse_search_page(self, html: str, limit: Optional[int] = None) -> SearchPage:
+        with self._timed("parse.search"):
+            return self._submit(_parse_search_page, html, limit).result()
+
+    def submit_agent_profile(
+        self,
+        html: str,
+        profile_url: Optional[str] = None,
+    ) -> "Future[AgentRecord]":
+        started = time.perf_counter()
+        future = self._submit(_parse_agent_profile, html, profile_url)
+        if self.metrics is not None:
+            metrics = self.metrics
+            future.add_done_callback(
+                lambda _: metrics.observe("parse.profile", time.perf_counter() - started)
+            )
+        return future
+
+    def parse_agent_profile(
+        self,
+        html: str,
+        profile_url: Optional[str] = None,
+    ) -> AgentRecord:
+        return self.submit_agent_profile(html, profile_url).result()
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,105 @@
+import logging
+import os
+import signal
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from extractors.zillow_parser import ZillowParser
+from utils.agent_record import AgentRecord
+from utils.html_archive import ArchiveEntry, HtmlArchive
+
+PROFILE_PATH_MARKER = "/profile/"
+
+# Archive reader and parser owned by each worker process.
+_worker_state: Optional[Tuple[HtmlArchive, ZillowParser]] = None
+
+def is_profile_url(url: str) -> bool:
+    return PROFILE_PATH_MARKER in urlsplit(url).path
+
+def _parse_entry(
+    archive: HtmlArchive,
+    parser: ZillowParser,
+    entry: ArchiveEntry,
+) -> Optional[AgentRecord]:
+    try:
+        return parser.parse_agent_profile(archive.read(entry), profile_url=entry.url)
+    except Exception as exc:  # noqa: BLE001
+        logging.warning("Could not re-parse %s: %s", entry.url, exc)
+        return None
+
+def _init_worker(directory: str, single_pass: bool, backend: str, embedded_state: bool) -> None:
+    global _worker_state
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_state = (
+        HtmlArchive(directory),
+        ZillowParser(single_pass=single_pass, backend=backend, embedded_state=embedded_state),
+    )
+
+def _parse_entries(entries: List[ArchiveEntry]) -> List[Optional[AgentRecord]]:
+    assert _worker_state is not None
+    archive, parser = _worker_state
+    return [_parse_entry(archive, parser, entry) for entry in entries]
+
+def _chunks(entries: List[ArchiveEntry], size: int) -> Iterable[List[ArchiveEntry]]:
+    for start in range(0, len(entries), size):
+        yield entries[start : start + size]
+
+def iter_reparsed_profiles(
+    directory: str,
+    workers: Optional[int] = None,
+    chunk_size: int = 64,
+    single_pass: bool = True,
+    backend: str = "html.parser",
+    embedded_state: bool = True,
+) -> Iterator[AgentRecord]:
+    """
+    Parse the latest archived copy of every profile page in the archive at
+    ``directory`` again, without any network access, and yield the agents
+    in the order the profiles were first archived.
+
+    Pages are spread over ``workers`` processes (all cores by default) in
+    chunks of ``chunk_size``; each worker reads the pages it is given from
+    the archive itself, so only index entries and parsed records cross
+    process boundaries. Pages that fail to parse are logged and skipped.
+    """
+    archive = HtmlArchive(directory)
+    try:
+        entries = [entry for entry in archive.latest_entries() if is_profile_url(entry.url)]
+    finally:
+        archive.close()
+    workers = workers or os.cpu_count() or 1
+    logging.info(
+        "Re-parsing %d archived profiles from %s in %d processes.",
+        len(entries),
+        directory,
+        workers,
+    )
+
+    if workers <= 1:
+        archive = HtmlArchive(directory)
+        parser = ZillowParser(
+            single_pass=single_pass, backend=backend, embedded_state=embedded_state
+        )
+        try:
+            for entry in entries:
+                agent = _parse_entry(archive, parser, entry)
+                if agent is not None:
+                    yield agent
+        finally:
+            parser.close()
+            archive.close()
+        return
+
+    executor = ProcessPoolExecutor(
+        max_workers=workers,
+        initializer=_init_worker,
+        initargs=(directory, single_pass, backend, embedded_state),
+    )
+    try:
+        for agents in executor.map(_parse_entries, _chunks(entries, max(1, chunk_size))):
+            for agent in agents:
+                if agent is not None:
+                    yield agent
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
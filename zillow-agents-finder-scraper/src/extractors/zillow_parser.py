@@ -1,84 +1,473 @@
-thonimport logging
-from typing import Any, Dict, List, Optional
+import logging
+from bisect import bisect_right
+from concurrent.futures import Future
+from contextlib import nullcontext
+from dataclasses import dataclass, field
+from typing import Any, ContextManager, Dict, List, Optional
+
+from bs4 import BeautifulSoup, Tag
+from bs4.builder import builder_registry
+
+from extractors.count_scanner import first_int_token, scan_counts
+from extractors.embedded_state import extract_embedded_fields
+from utils.agent_record import AgentRecord
+from utils.helpers import completed_future, try_int, try_float, normalize_whitespace
+from utils.metrics import Metrics
+
+@dataclass
+class SearchPage:
+    """
+    Candidates of one search results page, plus the href of the next
+    results page when the page links to one.
+
+    Each candidate is an ``AgentRecord`` holding its profile URL and
+    whatever its result card shows (name, brokerage, rating, review count,
+    location); fields the card doesn't show are None.
+    """
 
-from bs4 import BeautifulSoup
+    candidates: List[AgentRecord] = field(default_factory=list)
+    next_page_url: Optional[str] = None
 
-from utils.helpers import try_int, try_float, normalize_whitespace
+    @property
+    def profile_urls(self) -> List[str]:
+        return [candidate.profile_url for candidate in self.candidates]
 
 class ZillowParser:
     """
     Responsible for parsing Zillow HTML pages and extracting structured agent data.
+
+    With ``single_pass`` enabled (the default) profile fields are collected in
+    one walk over the parsed tree; otherwise every ``_extract_*`` method runs
+    its own search. Both modes return identical agent dicts.
+
+    ``backend`` selects the BeautifulSoup tree builder (``"html.parser"``,
+    ``"lxml"`` or ``"html5lib"``); the faster builders need their package
+    installed.
+
+    With ``embedded_state`` enabled, profile fields are first read from the
+    JSON state embedded in the page (``__NEXT_DATA__`` / JSON-LD) and the
+    tree is only built when some field is still missing.
+
+    With ``metrics`` set, page parse times are recorded there, broken down
+    into embedded-state, tree-building and extraction steps (per field when
+    ``single_pass`` is off).
     """
 
-    def parse_search_results(self, html: str, limit: Optional[int] = None) -> List[str]:
+    AGENCY_LABELS = ("Brokerage", "Company", "Agency")
+    NEXT_PAGE_LABELS = ("next", "next page", "›", "»")
+    BACKENDS = ("html.parser", "lxml", "html5lib")
+    FIELDS = (
+        "agentName",
+        "profileUrl",
+        "agency",
+        "phoneNumber",
+        "reviews",
+        "salesListings",
+        "soldListings",
+        "location",
+        "rating",
+    )
+    # Pages ``submit_agent_profile`` accepts before parsing them; 0 means they
+    # are parsed in the calling thread.
+    max_pending = 0
+
+    def __init__(
+        self,
+        single_pass: bool = True,
+        backend: str = "html.parser",
+        embedded_state: bool = True,
+        metrics: Optional[Metrics] = None,
+    ) -> None:
+        if backend not in self.BACKENDS:
+            raise ValueError(
+                f"Unknown parser backend '{backend}', expected one of {', '.join(self.BACKENDS)}."
+            )
+        if builder_registry.lookup(backend) is None:
+            raise ValueError(
+                f"Parser backend '{backend}' is not available; install the '{backend}' package."
+            )
+        self.single_pass = single_pass
+        self.backend = backend
+        self.embedded_state = embedded_state
+        self.metrics = metrics
+
+    def _timed(self, name: str) -> ContextManager[None]:
+        return self.metrics.time(name) if self.metrics is not None else nullcontext()
+
+    def _make_soup(self, html: str) -> BeautifulSoup:
+        return BeautifulSoup(html, self.backend)
+
+    def close(self) -> None:
+        """
+        Release resources held by the parser. Nothing to do for in-process parsing.
+        """
+
+    def parse_search_results(self, html: str, limit: Optional[int] = None) -> List[AgentRecord]:
+        """
+        Parse a Zillow agent search results page and return its candidates:
+        partial agent records with the profile URL and the result card's
+        fields (see ``SearchPage``).
+        """
+        return self.parse_search_page(html, limit=limit).candidates
+
+    def parse_search_page(self, html: str, limit: Optional[int] = None) -> SearchPage:
         """
-        Parse a Zillow agent search results page and return candidate profile URLs.
+        Parse a Zillow agent search results page into its candidates and the
+        link to the next results page, if any.
         This is intentionally generic and may need to be tuned for Zillow's markup.
         """
-        soup = BeautifulSoup(html, "html.parser")
-        urls: List[str] = []
+        with self._timed("parse.search"):
+            soup = self._make_soup(html)
+            candidates: Dict[str, AgentRecord] = {}
 
-        for link in soup.find_all("a", href=True):
-            href = link["href"]
-            if "/profile/" not in href:
-                continue
+            for link in soup.find_all("a", href=True):
+                href = link["href"]
+                if "/profile/" not in href:
+                    continue
 
-            if href.startswith("http"):
-                url = href
-            else:
-                # Fallback to main Zillow domain
-                url = f"https://www.zillow.com{href}"
+                if href.startswith("http"):
+                    url = href
+                else:
+                    # Fallback to main Zillow domain
+                    url = f"https://www.zillow.com{href}"
 
-            if url not in urls:
-                urls.append(url)
-                logging.debug("Discovered profile URL: %s", url)
+                if url not in candidates:
+                    candidates[url] = self._extract_search_card(link, url)
+                    logging.debug("Discovered profile URL: %s", url)
 
-            if limit is not None and len(urls) >= int(limit):
-                break
+                if limit is not None and len(candidates) >= int(limit):
+                    break
+
+            next_page_url = self._extract_next_page_url(soup)
 
-        logging.info("Parsed %d profile URLs from search results.", len(urls))
-        return urls
+        logging.info("Parsed %d profile URLs from search results.", len(candidates))
+        return SearchPage(candidates=list(candidates.values()), next_page_url=next_page_url)
+
+    @staticmethod
+    def _find_search_card(link: Tag) -> Optional[Tag]:
+        # The nearest enclosing result card, e.g. <li class="agent-card">.
+        for parent in link.parents:
+            if parent.name in ("ul", "ol", "main", "body"):
+                return None
+            if parent.name in ("li", "article") or any(
+                "card" in cls_name.lower() for cls_name in parent.get("class") or ()
+            ):
+                return parent
+        return None
+
+    @staticmethod
+    def _card_review_count(text: str, needs_label: bool = False) -> Optional[int]:
+        """
+        The review count ``text`` shows if that is all it shows, like
+        "262 reviews" or "(262)"; None for any other text. With
+        ``needs_label`` the number must be followed by "review(s)".
+        """
+        tokens = text.replace("(", " ").replace(")", " ").split()
+        if len(tokens) == 2 and tokens[1].lower() in ("review", "reviews"):
+            return try_int(tokens[0])
+        if len(tokens) == 1 and not needs_label:
+            return try_int(tokens[0])
+        return None
+
+    @classmethod
+    def _extract_search_card(cls, link: Tag, profile_url: str) -> AgentRecord:
+        """
+        Read the fields a search result card shows for the agent behind
+        ``link``. Anything the card doesn't show clearly stays None; the
+        review count is only read from ``itemprop="reviewCount"`` or an
+        element showing nothing but the count, since ``may_match`` drops
+        candidates on it.
+        """
+        candidate = AgentRecord(profile_url=profile_url)
+        card = cls._find_search_card(link)
+        if card is None:
+            return candidate
+
+        for tag in card.find_all(True):
+            classes = [cls_name.lower() for cls_name in tag.get("class") or ()]
+            itemprop = tag.get("itemprop")
+            content = tag.get("content")
+            if candidate.agent_name is None and (
+                itemprop == "name" or (tag.name == "a" and any("name" in c for c in classes))
+            ):
+                candidate.agent_name = normalize_whitespace(content or tag.get_text(strip=True)) or None
+            if candidate.agency is None and any(
+                "brokerage" in c or "agency" in c or "company" in c for c in classes
+            ):
+                candidate.agency = normalize_whitespace(tag.get_text(strip=True)) or None
+            if candidate.location is None and any("location" in c or "address" in c for c in classes):
+                candidate.location = normalize_whitespace(tag.get_text(" ", strip=True)) or None
+            if candidate.rating is None and (
+                itemprop == "ratingValue" or any("rating" in c for c in classes)
+            ):
+                candidate.rating = try_float(content or tag.get_text(" ", strip=True))
+            if candidate.reviews is None:
+                if itemprop == "reviewCount":
+                    candidate.reviews = (
+                        try_int(content) if content else first_int_token(tag.get_text(" ", strip=True))
+                    )
+                elif any("review" in c for c in classes):
+                    candidate.reviews = cls._card_review_count(tag.get_text(" ", strip=True))
+
+        if candidate.reviews is None:
+            for text in card.stripped_strings:
+                candidate.reviews = cls._card_review_count(text, needs_label=True)
+                if candidate.reviews is not None:
+                    break
+        if candidate.agent_name is None:
+            image = card.find("img", alt=True)
+            if image is not None:
+                candidate.agent_name = normalize_whitespace(image["alt"]) or None
+        return candidate
+
+    def _extract_next_page_url(self, soup: BeautifulSoup) -> Optional[str]:
+        link = soup.find("a", rel="next", href=True)
+        if link is None:
+            for candidate in soup.find_all("a", href=True):
+                label = candidate.get("aria-label") or candidate.get_text(" ", strip=True)
+                if (normalize_whitespace(label) or "").lower() in self.NEXT_PAGE_LABELS:
+                    link = candidate
+                    break
+        if link is None:
+            return None
+        return link["href"].strip() or None
+
+    def submit_agent_profile(
+        self,
+        html: str,
+        profile_url: Optional[str] = None,
+    ) -> "Future[AgentRecord]":
+        """
+        ``parse_agent_profile`` as a future. The page is parsed right away
+        here; parsers with ``max_pending`` hand it on and return without
+        waiting for the result.
+        """
+        return completed_future(self.parse_agent_profile(html, profile_url=profile_url))
 
     def parse_agent_profile(
         self,
         html: str,
         profile_url: Optional[str] = None,
-    ) -> Dict[str, Any]:
+    ) -> AgentRecord:
         """
         Parse a Zillow agent profile page and extract core fields.
 
         The function makes best-effort guesses using common Zillow patterns but
         is resilient to minor layout changes.
         """
-        soup = BeautifulSoup(html, "html.parser")
+        with self._timed("parse.profile"):
+            fields: Dict[str, Any] = {}
+            if self.embedded_state:
+                with self._timed("parse.embedded_state"):
+                    fields = extract_embedded_fields(html)
+
+            missing = [
+                field
+                for field in self.FIELDS
+                if field not in fields and not (field == "profileUrl" and profile_url)
+            ]
+            if missing:
+                with self._timed("parse.build_tree"):
+                    soup = self._make_soup(html)
+                if self.single_pass:
+                    with self._timed("parse.single_pass"):
+                        dom_fields = self._extract_fields_single_pass(soup)
+                else:
+                    dom_fields = self._extract_fields_per_field(soup, missing, self.metrics)
+                for field in missing:
+                    fields[field] = dom_fields[field]
+
+            if not profile_url:
+                profile_url = fields["profileUrl"]
+
+            agent = AgentRecord(
+                agent_name=fields["agentName"],
+                profile_url=profile_url,
+                agency=fields["agency"],
+                phone_number=fields["phoneNumber"],
+                reviews=fields["reviews"],
+                sales_listings=fields["salesListings"],
+                sold_listings=fields["soldListings"],
+                location=fields["location"],
+                rating=fields["rating"],
+            )
+
+        logging.debug("Parsed agent profile: %s", agent)
+        return agent
 
-        agent_name = self._extract_agent_name(soup)
-        agency = self._extract_agency(soup)
-        phone = self._extract_phone(soup)
-        location = self._extract_location(soup)
-        rating = self._extract_rating(soup)
-        reviews = self._extract_reviews_count(soup)
-        sales_listings = self._extract_sales_listings_count(soup)
-        sold_listings = self._extract_sold_listings_count(soup)
+    @classmethod
+    def _extract_fields_per_field(
+        cls,
+        soup: BeautifulSoup,
+        fields: Optional[List[str]] = None,
+        metrics: Optional[Metrics] = None,
+    ) -> Dict[str, Any]:
+        extractors = {
+            "agentName": cls._extract_agent_name,
+            "profileUrl": cls._extract_profile_url,
+            "agency": cls._extract_agency,
+            "phoneNumber": cls._extract_phone,
+            "reviews": cls._extract_reviews_count,
+            "salesListings": cls._extract_sales_listings_count,
+            "soldListings": cls._extract_sold_listings_count,
+            "location": cls._extract_location,
+            "rating": cls._extract_rating,
+        }
+        if metrics is None:
+            return {field: extractors[field](soup) for field in (fields or cls.FIELDS)}
+        values: Dict[str, Any] = {}
+        for field in fields or cls.FIELDS:
+            with metrics.time(f"parse.field.{field}"):
+                values[field] = extractors[field](soup)
+        return values
+
+    @classmethod
+    def _extract_fields_single_pass(cls, soup: BeautifulSoup) -> Dict[str, Any]:
+        """
+        Visit every node once and feed it to all field matchers at the same time.
+
+        Each matcher keeps the first node that the corresponding ``_extract_*``
+        method would have found, so the resolved values are identical.
+        """
+        og_title = og_url = first_h1 = None
+        tel_link = phone_el = location_el = brokerage_el = None
+        rating_el = reviews_el = None
+        rating_from_text: Optional[float] = None
+        texts: List[str] = []
+
+        label_hits: Dict[str, Any] = {}
+        pending_labels = list(cls.AGENCY_LABELS)
+        spans: List[Tag] = []
+        span_positions: List[int] = []
+        tag_positions: Dict[int, int] = {}
+
+        for position, node in enumerate(soup.descendants):
+            if isinstance(node, Tag):
+                tag_positions[id(node)] = position
+                name = node.name
+                attrs = node.attrs
+
+                if name == "meta":
+                    prop = attrs.get("property")
+                    if og_title is None and prop == "og:title":
+                        og_title = node
+                    elif og_url is None and prop == "og:url":
+                        og_url = node
+                elif name == "h1":
+                    if first_h1 is None:
+                        first_h1 = node
+                elif name == "a":
+                    href = attrs.get("href")
+                    if tel_link is None and href and href.startswith("tel:"):
+                        tel_link = node
+                elif name == "span" or name == "div":
+                    if name == "span":
+                        spans.append(node)
+                        span_positions.append(position)
+                    classes = attrs.get("class")
+                    if classes:
+                        lowered = [cls_name.lower() for cls_name in classes]
+                        if phone_el is None and any("phone" in c for c in lowered):
+                            phone_el = node
+                        if location_el is None and any(
+                            "location" in c or "address" in c for c in lowered
+                        ):
+                            location_el = node
+                        if (
+                            brokerage_el is None
+                            and name == "div"
+                            and "agent-brokerage" in classes
+                        ):
+                            brokerage_el = node
+
+                itemprop = attrs.get("itemprop")
+                if itemprop is not None:
+                    if rating_el is None and itemprop == "ratingValue":
+                        rating_el = node
+                    elif reviews_el is None and itemprop == "reviewCount":
+                        reviews_el = node
+                continue
+
+            if not node:
+                continue
 
-        if not profile_url:
-            profile_url = self._extract_profile_url(soup)
+            if pending_labels:
+                for label in list(pending_labels):
+                    if label in node:
+                        label_hits[label] = node
+                        pending_labels.remove(label)
 
-        agent = {
+            if rating_from_text is None and " / 5" in node:
+                rating_from_text = try_float(node.split(" / 5", 1)[0].strip())
+
+            texts.append(node)
+
+        # The counts are found by one scan over all of the text.
+        counts = scan_counts(texts)
+
+        # Resolve each field with the same precedence as its _extract_* method.
+        agent_name = None
+        if og_title is not None and og_title.get("content"):
+            agent_name = normalize_whitespace(og_title["content"])
+        elif first_h1 is not None:
+            agent_name = normalize_whitespace(first_h1.get_text(strip=True))
+
+        profile_url = None
+        if og_url is not None and og_url.get("content"):
+            profile_url = og_url["content"]
+
+        agency = None
+        for label in cls.AGENCY_LABELS:
+            label_el = label_hits.get(label)
+            if label_el is None or not label_el.parent:
+                continue
+            parent_position = tag_positions.get(id(label_el.parent), -1)
+            idx = bisect_right(span_positions, parent_position)
+            if idx < len(spans):
+                agency = normalize_whitespace(spans[idx].get_text(strip=True))
+                break
+        else:
+            if brokerage_el is not None:
+                agency = normalize_whitespace(brokerage_el.get_text(strip=True))
+
+        phone = None
+        if tel_link is not None:
+            phone = tel_link.get_text(strip=True) or None
+        if phone is None and phone_el is not None:
+            phone = normalize_whitespace(phone_el.get_text(strip=True))
+
+        location = None
+        if location_el is not None:
+            location = normalize_whitespace(location_el.get_text(strip=True))
+        else:
+            for span in spans:
+                text = span.get_text(strip=True)
+                if "," in text and any(char.isdigit() for char in text) is False:
+                    location = normalize_whitespace(text)
+                    break
+
+        if rating_el is not None and rating_el.get("content"):
+            rating = try_float(rating_el["content"])
+        else:
+            rating = rating_from_text
+
+        if reviews_el is not None and reviews_el.get("content"):
+            reviews = try_int(reviews_el["content"])
+        else:
+            reviews = counts["reviews"]
+
+        return {
             "agentName": agent_name,
             "profileUrl": profile_url,
             "agency": agency,
             "phoneNumber": phone,
             "reviews": reviews,
-            "salesListings": sales_listings,
-            "soldListings": sold_listings,
+            "salesListings": counts["salesListings"],
+            "soldListings": counts["soldListings"],
             "location": location,
             "rating": rating,
         }
 
-        logging.debug("Parsed agent profile: %s", agent)
-        return agent
-
     @staticmethod
     def _extract_agent_name(soup: BeautifulSoup) -> Optional[str]:
         # Try meta tag first
@@ -183,45 +572,14 @@ class ZillowParser:
             return try_int(reviews_el["content"])
 
         # Look for patterns like "124 Reviews"
-        for text in soup.find_all(string=True):
-            if not text:
-                continue
-            stripped = text.strip()
-            if "review" in stripped.lower():
-                parts = stripped.split()
-                for part in parts:
-                    value = try_int(part)
-                    if value is not None:
-                        return value
-
-        return None
+        return scan_counts(soup.find_all(string=True), ("reviews",))["reviews"]
 
     @staticmethod
     def _extract_sales_listings_count(soup: BeautifulSoup) -> Optional[int]:
         # Very generic: look for text blocks near "for sale" or similar
-        for text in soup.find_all(string=True):
-            if not text:
-                continue
-            lower = text.lower()
-            if "for sale" in lower or "active listings" in lower:
-                parts = text.split()
-                for part in parts:
-                    value = try_int(part)
-                    if value is not None:
-                        return value
-        return None
+        return scan_counts(soup.find_all(string=True), ("salesListings",))["salesListings"]
 
     @staticmethod
     def _extract_sold_listings_count(soup: BeautifulSoup) -> Optional[int]:
         # Very generic: look for text blocks near "sold" or "recently sold"
-        for text in soup.find_all(string=True):
-            if not text:
-                continue
-            lower = text.lower()
-            if "sold" in lower:
-                parts = text.split()
-                for part in parts:
-                    value = try_int(part)
-                    if value is not None:
-                        return value
-        return None
\ No newline at end of file
+        return scan_counts(soup.find_all(string=True), ("soldListings",))["soldListings"]
@@ -1,149 +1,37 @@
-thonimport argparse
-import json
-import logging
+import argparse
 import os
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterable
 
 from utils.helpers import (
+    iter_json_lines_file,
     load_json_file,
-    save_json_file,
     setup_logging,
     load_settings,
 )
-from utils.http_client import HttpClient
-from extractors.zillow_parser import ZillowParser
-from extractors.filters import AgentFilter, filter_agents
-
-def build_http_client(settings: Dict[str, Any]) -> HttpClient:
-    base_url = settings.get("base_url", "https://www.zillow.com")
-    timeout = settings.get("request_timeout", 10)
-    max_retries = settings.get("max_retries", 3)
-    backoff_factor = settings.get("retry_backoff_factor", 1)
-    rate_limit_per_minute = settings.get("rate_limit_per_minute", 30)
-    user_agent = settings.get("user_agent")
-
-    return HttpClient(
-        base_url=base_url,
-        timeout=timeout,
-        max_retries=max_retries,
-        backoff_factor=backoff_factor,
-        rate_limit_per_minute=rate_limit_per_minute,
-        user_agent=user_agent,
-    )
-
-def _build_filters(filter_dict: Dict[str, Any]) -> AgentFilter:
-    if not filter_dict:
-        return AgentFilter()
-    return AgentFilter.from_dict(filter_dict)
-
-def _process_profile_query(
-    http_client: HttpClient,
-    parser: ZillowParser,
-    query: Dict[str, Any],
-) -> List[Dict[str, Any]]:
-    profile_url = query.get("profileUrl")
-    if not profile_url:
-        logging.warning("Profile query missing 'profileUrl' field, skipping.")
-        return []
-
-    logging.info("Fetching profile: %s", profile_url)
-    html = http_client.get_url(profile_url)
-    if not html:
-        return []
-
-    agent = parser.parse_agent_profile(html, profile_url=profile_url)
-    filters = _build_filters(query.get("filters", {}))
-    filtered = filter_agents([agent], filters)
-    return filtered
-
-def _process_search_query(
-    http_client: HttpClient,
-    parser: ZillowParser,
-    query: Dict[str, Any],
-    base_url: str,
-) -> List[Dict[str, Any]]:
-    name = query.get("name")
-    location = query.get("location")
-    limit = query.get("limit")
-
-    if not name and not query.get("screenName"):
-        logging.warning("Search query missing 'name' or 'screenName', skipping.")
-        return []
-
-    # If we have a screen name, we can directly build a profile URL
-    screen_name = query.get("screenName")
-    if screen_name:
-        profile_url = f"{base_url.rstrip('/')}/profile/{screen_name}"
-        logging.info("Using screenName query, direct profile URL: %s", profile_url)
-        return _process_profile_query(
-            http_client, parser, {"profileUrl": profile_url, "filters": query.get("filters", {})}
-        )
-
-    # Name-based search
-    search_path = "/agents/real-estate-agent-reviews/"
-    params: Dict[str, Any] = {}
-    if name:
-        params["searchQuery"] = name
-    if location:
-        params["locationText"] = location
-
-    logging.info("Searching agents by name='%s', location='%s'", name, location)
-    html = http_client.get(search_path, params=params)
-    if not html:
-        return []
-
-    profile_urls = parser.parse_search_results(html, limit=limit)
-    logging.info("Found %d candidate profiles", len(profile_urls))
-
-    agents: List[Dict[str, Any]] = []
-    for url in profile_urls:
-        try:
-            logging.info("Fetching candidate profile: %s", url)
-            agent_html = http_client.get_url(url)
-            if not agent_html:
-                continue
-            agent = parser.parse_agent_profile(agent_html, profile_url=url)
-            agents.append(agent)
-        except Exception as exc:  # noqa: BLE001
-            logging.exception("Error processing profile %s: %s", url, exc)
-
-    filters = _build_filters(query.get("filters", {}))
-    filtered_agents = filter_agents(agents, filters)
-    if limit is not None:
-        filtered_agents = filtered_agents[: int(limit)]
-    return filtered_agents
-
-def process_queries(
-    queries: List[Dict[str, Any]],
-    settings: Dict[str, Any],
-) -> List[Dict[str, Any]]:
-    setup_logging(settings.get("log_level", "INFO"))
-
-    http_client = build_http_client(settings)
-    parser = ZillowParser()
-
-    results: List[Dict[str, Any]] = []
-    base_url = settings.get("base_url", "https://www.zillow.com")
-
-    for idx, query in enumerate(queries, start=1):
-        logging.info("Processing query %d/%d: %s", idx, len(queries), json.dumps(query))
-
-        qtype = query.get("type", "search")
-        try:
-            if qtype == "profile":
-                agents = _process_profile_query(http_client, parser, query)
-            else:
-                agents = _process_search_query(http_client, parser, query, base_url)
-
-            results.extend(agents)
-        except KeyboardInterrupt:
-            logging.warning("Interrupted by user.")
-            break
-        except Exception as exc:  # noqa: BLE001
-            logging.exception("Error processing query %s: %s", query, exc)
-
-    logging.info("Finished processing queries. Total agents: %d", len(results))
-    return results
+from utils.refresh import STATE_SUFFIX
+from utils.writers import (
+    LINE_FORMATS,
+    OUTPUT_FORMATS,
+    is_json_lines_path,
+    output_format_for_path,
+)
+from pipeline.builders import build_refresh_state, build_work_queue
+from pipeline.distributed import run_coordinator, run_worker
+from pipeline.offline import filter_previous_output, reparse_archive
+from pipeline.runner import iter_agents, run_with_checkpoint, write_agents
+
+def load_queries(path: str) -> Iterable[Dict[str, Any]]:
+    """
+    Return the queries in ``path``. NDJSON files (.jsonl/.ndjson, one query
+    per line) are read lazily; anything else must be a JSON list.
+    """
+    if is_json_lines_path(path):
+        return iter_json_lines_file(path)
+
+    queries = load_json_file(path)
+    if not isinstance(queries, list):
+        raise ValueError("Input JSON must be a list of query objects.")
+    return queries
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(
@@ -156,13 +44,30 @@ def parse_args() -> argparse.Namespace:
         "-i",
         "--input",
         default=default_input,
-        help=f"Path to input JSON file (default: {default_input})",
+        help=(
+            f"Path to input JSON file (default: {default_input}). "
+            "A .jsonl/.ndjson file with one query per line is read lazily."
+        ),
     )
     parser.add_argument(
         "-o",
         "--output",
         default=default_output,
-        help=f"Path to output JSON file (default: {default_output})",
+        help=(
+            f"Path to output JSON file (default: {default_output}). "
+            "A .jsonl/.ndjson path streams agents to disk as they are found."
+        ),
+    )
+    parser.add_argument(
+        "-f",
+        "--format",
+        choices=OUTPUT_FORMATS,
+        default=None,
+        help=(
+            "Output format: pretty-printed JSON, compact NDJSON, CSV, or Parquet / Arrow "
+            "(needs pyarrow). Default: from the output extension (.jsonl/.ndjson, .csv, "
+            ".parquet, .arrow/.feather), else json"
+        ),
     )
     parser.add_argument(
         "-s",
@@ -170,6 +75,78 @@ def parse_args() -> argparse.Namespace:
         default=None,
         help="Optional path to settings.json (defaults to src/config/settings.json)",
     )
+    parser.add_argument(
+        "--checkpoint",
+        default=None,
+        help=(
+            "Path to the checkpoint journal for ndjson and csv outputs "
+            "(default: <output>.checkpoint)"
+        ),
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Resume an interrupted run: skip checkpointed work and append to the output",
+    )
+    parser.add_argument(
+        "--refresh",
+        metavar="PREVIOUS_OUTPUT",
+        default=None,
+        help=(
+            "Incremental run: reuse agents from a previous output that were fetched "
+            "within refresh_max_age_hours, and skip parsing pages that haven't changed"
+        ),
+    )
+    parser.add_argument(
+        "--refresh-state",
+        default=None,
+        help=(
+            "Refresh state file, read by --refresh and rewritten with this run's fetch "
+            f"times (default: read <PREVIOUS_OUTPUT>{STATE_SUFFIX}, write "
+            f"<OUTPUT>{STATE_SUFFIX}). Without --refresh, only record fetch times there "
+            "for a later --refresh"
+        ),
+    )
+    parser.add_argument(
+        "--reparse",
+        metavar="ARCHIVE_DIR",
+        default=None,
+        help=(
+            "Parse the profile pages in an HTML archive (see archive_enabled in the "
+            "settings) again, without network access, and write the agents to --output"
+        ),
+    )
+    parser.add_argument(
+        "--filter",
+        metavar="PREVIOUS_OUTPUT",
+        default=None,
+        help=(
+            "Don't scrape: apply each input query's filters and limit to the agents "
+            "of a previous output and write the matches to --output"
+        ),
+    )
+    parser.add_argument(
+        "--queue",
+        default=None,
+        help=(
+            "Path to a SQLite work queue shared by several scraper nodes; "
+            "see --role"
+        ),
+    )
+    parser.add_argument(
+        "--role",
+        choices=("coordinator", "worker"),
+        default="coordinator",
+        help=(
+            "With --queue: the coordinator queues the input, works on it and writes "
+            "the merged output; workers only process batches (default: coordinator)"
+        ),
+    )
+    parser.add_argument(
+        "--worker-id",
+        default=None,
+        help="Name of this node in the work queue (default: <hostname>:<pid>)",
+    )
     return parser.parse_args()
 
 def main() -> None:
@@ -182,13 +159,61 @@ def main() -> None:
         settings_path = os.path.join(current_dir, "config", "settings.json")
 
     settings = load_settings(settings_path)
-    queries = load_json_file(args.input)
+    setup_logging(settings.get("log_level", "INFO"))
 
-    if not isinstance(queries, list):
-        raise ValueError("Input JSON must be a list of query objects.")
+    if args.reparse:
+        reparse_archive(args.reparse, settings, args.output, args.format)
+        return
+
+    if args.filter:
+        filter_previous_output(
+            load_queries(args.input), args.filter, settings, args.output, args.format
+        )
+        return
+
+    if args.queue:
+        if args.resume or args.refresh:
+            raise ValueError("--queue can't be combined with --resume or --refresh.")
+        queue = build_work_queue(settings, args.queue)
+        try:
+            if args.role == "worker":
+                run_worker(queue, settings, args.worker_id)
+            else:
+                run_coordinator(
+                    load_queries(args.input),
+                    queue,
+                    settings,
+                    args.output,
+                    args.worker_id,
+                    args.format,
+                )
+        finally:
+            queue.close()
+        return
+
+    queries = load_queries(args.input)
+    output_format = output_format_for_path(args.output, args.format)
+    if args.resume and output_format not in LINE_FORMATS:
+        raise ValueError("--resume requires an ndjson or csv output.")
+    # Loaded before the run starts, so the previous output may be overwritten.
+    refresh = build_refresh_state(settings, args.refresh, args.refresh_state)
+
+    if output_format in LINE_FORMATS:
+        checkpoint_path = args.checkpoint or f"{args.output}.checkpoint"
+        run_with_checkpoint(
+            queries,
+            settings,
+            args.output,
+            checkpoint_path,
+            resume=args.resume,
+            refresh=refresh,
+            output_format=output_format,
+        )
+    else:
+        write_agents(iter_agents(queries, settings, refresh), settings, args.output, output_format)
 
-    agents = process_queries(queries, settings)
-    save_json_file(args.output, agents)
+    if refresh is not None:
+        refresh.save(args.refresh_state or args.output + STATE_SUFFIX)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,224 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Set
+
+from utils.agent_cache import AgentCache
+from utils.async_http_client import AsyncHttpClient
+from utils.checkpoint import QueryProfileLog
+from extractors.filters import AgentFilter, filter_agents, matches_filter
+from extractors.zillow_parser import ZillowParser
+from pipeline.builders import build_filters
+from pipeline.queries import (
+    SEARCH_PATH,
+    next_search_page_url,
+    page_profile_urls,
+    screen_name_profile_query,
+    search_params,
+)
+
+async def _fetch_agent_async(
+    http_client: AsyncHttpClient,
+    parser: ZillowParser,
+    url: str,
+    agent_cache: Optional[AgentCache] = None,
+) -> Optional[Dict[str, Any]]:
+    async def fetch() -> Optional[Dict[str, Any]]:
+        html = await http_client.get_url(url)
+        if not html:
+            return None
+        # Parsing is CPU-bound; keep it off the event loop. A parser with
+        # max_pending only holds the thread until the page is queued.
+        parsed = await asyncio.to_thread(parser.submit_agent_profile, html, url)
+        return await asyncio.wrap_future(parsed)
+
+    if agent_cache is None:
+        return await fetch()
+    return await agent_cache.get_or_fetch_async(url, fetch)
+
+async def _process_profile_query_async(
+    http_client: AsyncHttpClient,
+    parser: ZillowParser,
+    query: Dict[str, Any],
+    agent_cache: Optional[AgentCache] = None,
+) -> List[Dict[str, Any]]:
+    profile_url = query.get("profileUrl")
+    if not profile_url:
+        logging.warning("Profile query missing 'profileUrl' field, skipping.")
+        return []
+
+    logging.info("Fetching profile: %s", profile_url)
+    agent = await _fetch_agent_async(http_client, parser, profile_url, agent_cache)
+    if not agent:
+        return []
+
+    return filter_agents([agent], build_filters(query.get("filters", {})))
+
+async def _fetch_candidate_profile_async(
+    http_client: AsyncHttpClient,
+    parser: ZillowParser,
+    url: str,
+    profile_store: Optional[QueryProfileLog] = None,
+    agent_cache: Optional[AgentCache] = None,
+) -> Optional[Dict[str, Any]]:
+    try:
+        if profile_store is not None:
+            saved = profile_store.get(url)
+            if saved is not None:
+                logging.info("Using checkpointed profile: %s", url)
+                return saved
+
+        logging.info("Fetching candidate profile: %s", url)
+        agent = await _fetch_agent_async(http_client, parser, url, agent_cache)
+        if agent is not None and profile_store is not None:
+            profile_store.put(url, agent)
+        return agent
+    except Exception as exc:  # noqa: BLE001
+        logging.exception("Error processing profile %s: %s", url, exc)
+        return None
+
+async def _iter_candidate_profiles_async(
+    http_client: AsyncHttpClient,
+    parser: ZillowParser,
+    profile_urls: AsyncIterator[str],
+    concurrency: int = 1,
+    profile_store: Optional[QueryProfileLog] = None,
+    agent_cache: Optional[AgentCache] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Async counterpart of ``pipeline.queries._iter_candidate_profiles``: up
+    to ``concurrency`` fetches run as tasks, agents are yielded in URL
+    order, and tasks still pending when the generator is closed are
+    cancelled.
+    """
+    window = max(1, concurrency)
+    pending: Deque["asyncio.Task[Optional[Dict[str, Any]]]"] = deque()
+    try:
+        async for url in profile_urls:
+            pending.append(
+                asyncio.create_task(
+                    _fetch_candidate_profile_async(
+                        http_client, parser, url, profile_store, agent_cache
+                    )
+                )
+            )
+            if len(pending) >= window:
+                agent = await pending.popleft()
+                if agent is not None:
+                    yield agent
+        while pending:
+            agent = await pending.popleft()
+            if agent is not None:
+                yield agent
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def _iter_search_result_urls_async(
+    http_client: AsyncHttpClient,
+    parser: ZillowParser,
+    query: Dict[str, Any],
+    base_url: str,
+    max_pages: int = 1,
+    card_filters: Optional[AgentFilter] = None,
+) -> AsyncIterator[str]:
+    html = await http_client.get(SEARCH_PATH, params=search_params(query))
+    seen_pages: Set[str] = set()
+    seen_urls: Set[str] = set()
+    page_number = 1
+    while html:
+        page = await asyncio.to_thread(parser.parse_search_page, html)
+        new_urls = page_profile_urls(page, page_number, seen_urls, card_filters)
+        for url in new_urls:
+            yield url
+
+        if page_number >= max_pages:
+            return
+        next_url = next_search_page_url(page.next_page_url, base_url, seen_pages)
+        if next_url is None:
+            return
+        page_number += 1
+        logging.info("Fetching search results page %d: %s", page_number, next_url)
+        html = await http_client.get_url(next_url)
+
+async def _process_search_query_async(
+    http_client: AsyncHttpClient,
+    parser: ZillowParser,
+    query: Dict[str, Any],
+    base_url: str,
+    profile_concurrency: int = 1,
+    profile_store: Optional[QueryProfileLog] = None,
+    agent_cache: Optional[AgentCache] = None,
+    max_search_pages: int = 1,
+    card_prefilter: bool = True,
+) -> List[Dict[str, Any]]:
+    if not query.get("name") and not query.get("screenName"):
+        logging.warning("Search query missing 'name' or 'screenName', skipping.")
+        return []
+
+    profile_query = screen_name_profile_query(query, base_url)
+    if profile_query is not None:
+        return await _process_profile_query_async(http_client, parser, profile_query, agent_cache)
+
+    limit = query.get("limit")
+    limit = int(limit) if limit is not None else None
+    filters = build_filters(query.get("filters", {}))
+    matched: List[Dict[str, Any]] = []
+    if limit is not None and limit <= 0:
+        return matched
+
+    urls = _iter_search_result_urls_async(
+        http_client,
+        parser,
+        query,
+        base_url,
+        max_search_pages,
+        filters if card_prefilter else None,
+    )
+    agents = _iter_candidate_profiles_async(
+        http_client, parser, urls, profile_concurrency, profile_store, agent_cache
+    )
+    try:
+        async for agent in agents:
+            if matches_filter(agent, filters):
+                matched.append(agent)
+                if limit is not None and len(matched) >= limit:
+                    break
+    finally:
+        await agents.aclose()
+        await urls.aclose()
+    return matched
+
+async def process_query_async(
+    http_client: AsyncHttpClient,
+    parser: ZillowParser,
+    query: Dict[str, Any],
+    base_url: str,
+    profile_concurrency: int = 1,
+    profile_store: Optional[QueryProfileLog] = None,
+    agent_cache: Optional[AgentCache] = None,
+    max_search_pages: int = 1,
+    card_prefilter: bool = True,
+) -> List[Dict[str, Any]]:
+    """
+    Coroutine counterpart of :func:`pipeline.queries.process_query`, for
+    the aiohttp backend. Parsing runs in worker threads.
+    """
+    qtype = query.get("type", "search")
+    try:
+        if qtype == "profile":
+            return await _process_profile_query_async(http_client, parser, query, agent_cache)
+        return await _process_search_query_async(
+            http_client,
+            parser,
+            query,
+            base_url,
+            profile_concurrency,
+            profile_store,
+            agent_cache,
+            max_search_pages,
+            card_prefilter,
+        )
+    except Exception as exc:  # noqa: BLE001
+        logging.exception("Error processing query %s: %s", query, exc)
+        return []
@@ -0,0 +1,184 @@
+import os
+from typing import Any, Dict, Optional
+
+from utils.agent_cache import AgentCache
+from utils.async_http_client import AsyncHttpClient
+from utils.html_archive import HtmlArchive
+from utils.http_client import HttpClient
+from utils.metrics import Metrics
+from utils.refresh import RefreshState
+from utils.response_cache import ResponseCache
+from utils.throttle import AdaptiveThrottle
+from utils.work_queue import WorkQueue
+from utils.writers import open_writer, output_format_for_path
+from extractors.filters import AgentFilter
+from extractors.parser_pool import ProcessPoolParser
+from extractors.zillow_parser import ZillowParser
+
+HTTP_BACKENDS = ("requests", "aiohttp")
+
+def _http_client_options(settings: Dict[str, Any]) -> Dict[str, Any]:
+    cache = None
+    if settings.get("cache_enabled"):
+        max_size_mb = settings.get("cache_max_size_mb")
+        cache = ResponseCache(
+            path=settings.get("cache_path", os.path.join("data", "http_cache.sqlite")),
+            ttl_seconds=settings.get("cache_ttl_seconds", 86400),
+            max_size_bytes=int(max_size_mb * 1024 * 1024) if max_size_mb else None,
+            path_ttls=settings.get("cache_path_ttls"),
+        )
+
+    archive = None
+    if settings.get("archive_enabled"):
+        archive = build_html_archive(settings, settings.get("archive_path"))
+
+    return {
+        "base_url": settings.get("base_url", "https://www.zillow.com"),
+        "timeout": settings.get("request_timeout", 10),
+        "max_retries": settings.get("max_retries", 3),
+        "backoff_factor": settings.get("retry_backoff_factor", 1),
+        "rate_limit_per_minute": settings.get("rate_limit_per_minute", 30),
+        "rate_limit_burst": settings.get("rate_limit_burst", 1),
+        "host_rate_limits": settings.get("host_rate_limits"),
+        "user_agent": settings.get("user_agent"),
+        "cache": cache,
+        "archive": archive,
+    }
+
+def build_html_archive(settings: Dict[str, Any], path: Optional[str] = None) -> HtmlArchive:
+    segment_max_mb = settings.get("archive_segment_max_mb", 256)
+    archive = HtmlArchive(
+        path or os.path.join("data", "html_archive"),
+        compression=settings.get("archive_compression", "gzip"),
+        segment_max_bytes=int(segment_max_mb * 1024 * 1024),
+    )
+    # Fail before any work starts if another process writes there.
+    archive.lock_directory()
+    return archive
+
+def _request_concurrency(settings: Dict[str, Any]) -> int:
+    profile_concurrency = int(settings.get("profile_concurrency", 1))
+    query_concurrency = int(settings.get("query_concurrency", 1))
+    return max(1, profile_concurrency) * max(1, query_concurrency)
+
+def build_throttle(
+    settings: Dict[str, Any],
+    max_concurrency: int,
+    metrics: Optional[Metrics] = None,
+) -> Optional[AdaptiveThrottle]:
+    if not settings.get("adaptive_throttle_enabled", True):
+        return None
+    return AdaptiveThrottle(
+        max_concurrency=max_concurrency,
+        min_concurrency=int(settings.get("throttle_min_concurrency", 1)),
+        min_rate_fraction=float(settings.get("throttle_min_rate_fraction", 0.1)),
+        metrics=metrics,
+    )
+
+def build_http_client(settings: Dict[str, Any], metrics: Optional[Metrics] = None) -> HttpClient:
+    concurrency = _request_concurrency(settings)
+    return HttpClient(
+        pool_maxsize=max(10, concurrency),
+        metrics=metrics,
+        throttle=build_throttle(settings, concurrency, metrics),
+        **_http_client_options(settings),
+    )
+
+def build_async_http_client(
+    settings: Dict[str, Any],
+    metrics: Optional[Metrics] = None,
+) -> AsyncHttpClient:
+    max_connections = int(settings.get("async_max_connections", 100))
+    return AsyncHttpClient(
+        max_connections=max_connections,
+        metrics=metrics,
+        throttle=build_throttle(
+            settings, min(max_connections, _request_concurrency(settings)), metrics
+        ),
+        **_http_client_options(settings),
+    )
+
+def build_filters(filter_dict: Dict[str, Any]) -> AgentFilter:
+    if not filter_dict:
+        return AgentFilter()
+    return AgentFilter.from_dict(filter_dict)
+
+def build_parser(settings: Dict[str, Any], metrics: Optional[Metrics] = None) -> ZillowParser:
+    single_pass = settings.get("single_pass_extraction", True)
+    backend = settings.get("parser_backend", "html.parser")
+    embedded_state = settings.get("embedded_state_fast_path", True)
+    parse_workers = settings.get("parse_workers", 0)
+    if parse_workers:
+        queue_size = settings.get("parse_queue_size")
+        return ProcessPoolParser(
+            workers=None if parse_workers == "auto" else int(parse_workers),
+            max_pending=int(queue_size) if queue_size else None,
+            single_pass=single_pass,
+            backend=backend,
+            embedded_state=embedded_state,
+            metrics=metrics,
+        )
+    return ZillowParser(
+        single_pass=single_pass,
+        backend=backend,
+        embedded_state=embedded_state,
+        metrics=metrics,
+    )
+
+def build_agent_cache(settings: Dict[str, Any]) -> Optional[AgentCache]:
+    """
+    Agent cache for the run, unbounded unless ``agent_cache_max_entries`` is
+    set; None when it is disabled or that limit is 0.
+    """
+    if not settings.get("agent_cache_enabled", True):
+        return None
+    max_entries = settings.get("agent_cache_max_entries")
+    if max_entries is None:
+        return AgentCache()
+    max_entries = int(max_entries)
+    if max_entries < 0:
+        raise ValueError("agent_cache_max_entries must be null (unbounded) or at least 0.")
+    if max_entries == 0:
+        return None
+    return AgentCache(max_entries=max_entries)
+
+def build_metrics(settings: Dict[str, Any]) -> Optional[Metrics]:
+    if not settings.get("metrics_enabled", True):
+        return None
+    return Metrics()
+
+def build_refresh_state(
+    settings: Dict[str, Any],
+    previous_output: Optional[str] = None,
+    state_path: Optional[str] = None,
+) -> Optional[RefreshState]:
+    """
+    Refresh state for ``--refresh``, or only to record fetch times for a
+    later refresh when just ``--refresh-state`` is given; None otherwise.
+    """
+    if not previous_output and not state_path:
+        return None
+    if not settings.get("refresh_state_enabled", True):
+        raise ValueError("--refresh and --refresh-state need refresh_state_enabled in the settings.")
+    max_age = float(settings.get("refresh_max_age_hours", 24)) * 3600
+    if previous_output:
+        return RefreshState.load(previous_output, state_path, max_age_seconds=max_age)
+    return RefreshState(max_age_seconds=max_age)
+
+def build_work_queue(settings: Dict[str, Any], path: str) -> WorkQueue:
+    return WorkQueue(path, lease_seconds=float(settings.get("queue_lease_seconds", 600)))
+
+def build_output_writer(
+    settings: Dict[str, Any],
+    output_path: str,
+    output_format: Optional[str] = None,
+    append: bool = False,
+) -> Any:
+    return open_writer(
+        output_path,
+        output_format_for_path(output_path, output_format),
+        append=append,
+        flush_every=int(settings.get("output_flush_every", 100)),
+        batch_size=int(settings.get("output_batch_size", 10000)),
+        compression=settings.get("output_compression", "zstd"),
+    )
@@ -0,0 +1,113 @@
+import logging
+import os
+import socket
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from utils.work_queue import WorkBatch, WorkQueue
+from pipeline.runner import iter_query_results, write_agents
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def run_worker(
+    queue: WorkQueue,
+    settings: Dict[str, Any],
+    worker_id: Optional[str] = None,
+) -> int:
+    """
+    Process batches claimed from ``queue`` until it is sealed and every
+    batch is done, storing each batch's agents back in the queue. Several
+    workers (on this machine or others sharing the queue file) split the
+    work between them; each one keeps to its own rate limits. Returns the
+    number of batches this worker completed.
+    """
+    worker_id = worker_id or default_worker_id()
+    poll_seconds = float(settings.get("queue_poll_seconds", 5))
+    completed = 0
+
+    while True:
+        first = queue.claim(worker_id)
+        if first is None:
+            if queue.is_finished():
+                break
+            time.sleep(poll_seconds)
+            continue
+
+        # Batches whose queries have been handed out, oldest first, with the
+        # agents found so far for each.
+        open_batches: Deque[Tuple[WorkBatch, List[List[Dict[str, Any]]]]] = deque()
+
+        def claimed_queries() -> Iterator[Dict[str, Any]]:
+            batch: Optional[WorkBatch] = first
+            while batch is not None:
+                logging.info(
+                    "Worker %s claimed batch %d (%d queries from input query %d).",
+                    worker_id,
+                    batch.id,
+                    len(batch.queries),
+                    batch.first_index,
+                )
+                open_batches.append((batch, []))
+                yield from batch.queries
+                # Stop when the queue runs dry: waiting here would also hold
+                # back the batches still being finished by this worker.
+                batch = queue.claim(worker_id)
+
+        for _, _, agents in iter_query_results(claimed_queries(), settings):
+            queue.heartbeat(worker_id)
+            batch, results = open_batches[0]
+            results.append(agents)
+            if len(results) < len(batch.queries):
+                continue
+            open_batches.popleft()
+            if queue.complete(batch, results):
+                completed += 1
+            else:
+                logging.info("Batch %d was already completed by another worker.", batch.id)
+        if open_batches:
+            # Interrupted: leave the rest to be taken over once the lease expires.
+            logging.warning(
+                "Worker %s stopped with %d batches unfinished.", worker_id, len(open_batches)
+            )
+            break
+
+    logging.info("Worker %s completed %d batches.", worker_id, completed)
+    return completed
+
+def run_coordinator(
+    queries: Iterable[Dict[str, Any]],
+    queue: WorkQueue,
+    settings: Dict[str, Any],
+    output_path: str,
+    worker_id: Optional[str] = None,
+    output_format: Optional[str] = None,
+) -> None:
+    """
+    Queue ``queries`` for the workers (unless the queue already holds a
+    run, which is then picked up where it stopped), work on them as one
+    more worker, and write the merged agents, de-duplicated by profile URL,
+    once every batch is done.
+    """
+    counts = queue.counts()
+    if any(counts.values()):
+        logging.info(
+            "Queue %s already holds %d batches (%d done), not queueing the input again.",
+            queue.path,
+            sum(counts.values()),
+            counts["done"],
+        )
+    else:
+        batch_size = int(settings.get("queue_batch_size", 10))
+        added = queue.enqueue(queries, batch_size=batch_size)
+        logging.info("Queued %d queries in batches of %d.", added, batch_size)
+    queue.seal()
+
+    run_worker(queue, settings, worker_id)
+    if not queue.is_finished():
+        logging.warning("Stopped before the queue was finished; not writing the output.")
+        return
+
+    total = write_agents(queue.iter_merged_agents(), settings, output_path, output_format)
+    logging.info("Wrote %d merged agents to %s.", total, output_path)
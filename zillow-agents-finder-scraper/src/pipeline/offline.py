@@ -0,0 +1,70 @@
+import logging
+import time
+from typing import Any, Dict, Iterable, Iterator, Mapping, Optional
+
+from utils.writers import iter_output_agents
+from extractors.filter_index import AgentIndex
+from extractors.reparse import iter_reparsed_profiles
+from pipeline.builders import build_filters
+from pipeline.runner import write_agents
+
+def reparse_archive(
+    archive_path: str,
+    settings: Dict[str, Any],
+    output_path: str,
+    output_format: Optional[str] = None,
+) -> None:
+    """
+    Parse every profile page in the HTML archive at ``archive_path`` again,
+    offline and on all cores (or ``parse_workers`` processes), and write the
+    agents to ``output_path``. Query filters don't apply: every archived
+    profile is written.
+    """
+    parse_workers = settings.get("parse_workers", 0)
+    agents = iter_reparsed_profiles(
+        archive_path,
+        workers=None if parse_workers in (0, "auto") else int(parse_workers),
+        single_pass=settings.get("single_pass_extraction", True),
+        backend=settings.get("parser_backend", "html.parser"),
+        embedded_state=settings.get("embedded_state_fast_path", True),
+    )
+    started = time.perf_counter()
+    total = write_agents(agents, settings, output_path, output_format)
+    logging.info(
+        "Re-parsed %d archived profiles into %s in %.1f s.",
+        total,
+        output_path,
+        time.perf_counter() - started,
+    )
+
+def filter_previous_output(
+    queries: Iterable[Dict[str, Any]],
+    agents_path: str,
+    settings: Dict[str, Any],
+    output_path: str,
+    output_format: Optional[str] = None,
+) -> None:
+    """
+    Answer queries from the agents of a previous output (in any output
+    format) instead of scraping: each query's ``filters`` and ``limit`` are
+    applied to the whole set and the matches are written in query order.
+    What a query searches for (name, location text, profile URL) isn't used.
+    The agents are indexed once, so many queries cost little more than one.
+    """
+    index = AgentIndex(item for item in iter_output_agents(agents_path) if isinstance(item, dict))
+    logging.info("Filtering %d agents from %s.", len(index), agents_path)
+
+    def matches() -> Iterator[Mapping[str, Any]]:
+        for idx, query in enumerate(queries, start=1):
+            if not isinstance(query, dict):
+                logging.warning("Query %d is not a JSON object, skipping.", idx)
+                continue
+            agents = index.filter(build_filters(query.get("filters", {})))
+            limit = query.get("limit")
+            if limit is not None:
+                agents = agents[: max(0, int(limit))]
+            logging.info("Query %d: %d matching agents.", idx, len(agents))
+            yield from agents
+
+    total = write_agents(matches(), settings, output_path, output_format)
+    logging.info("Wrote %d agents from %s into %s.", total, agents_path, output_path)
@@ -0,0 +1,343 @@
+import logging
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+from urllib.parse import urljoin
+
+from utils.agent_cache import AgentCache
+from utils.checkpoint import QueryProfileLog
+from utils.helpers import chain_future, completed_future
+from utils.http_client import HttpClient
+from extractors.filters import AgentFilter, filter_agents, matches_filter, may_match
+from extractors.zillow_parser import SearchPage, ZillowParser
+from pipeline.builders import build_filters
+
+SEARCH_PATH = "/agents/real-estate-agent-reviews/"
+
+def _fetch_agent(
+    http_client: HttpClient,
+    parser: ZillowParser,
+    url: str,
+    agent_cache: Optional[AgentCache] = None,
+) -> "Future[Optional[Dict[str, Any]]]":
+    """
+    Fetch a profile page and return its agent as a future, which is None
+    if the page couldn't be fetched. With a parser that has
+    ``max_pending``, the page may still be being parsed when this returns.
+    """
+    def fetch() -> "Future[Optional[Dict[str, Any]]]":
+        html = http_client.get_url(url)
+        if not html:
+            return completed_future(None)
+        return parser.submit_agent_profile(html, profile_url=url)
+
+    if agent_cache is None:
+        return fetch()
+    return agent_cache.get_or_submit(url, fetch)
+
+def _process_profile_query(
+    http_client: HttpClient,
+    parser: ZillowParser,
+    query: Dict[str, Any],
+    agent_cache: Optional[AgentCache] = None,
+) -> List[Dict[str, Any]]:
+    profile_url = query.get("profileUrl")
+    if not profile_url:
+        logging.warning("Profile query missing 'profileUrl' field, skipping.")
+        return []
+
+    logging.info("Fetching profile: %s", profile_url)
+    agent = _fetch_agent(http_client, parser, profile_url, agent_cache).result()
+    if not agent:
+        return []
+
+    return filter_agents([agent], build_filters(query.get("filters", {})))
+
+def _fetch_candidate_profile(
+    http_client: HttpClient,
+    parser: ZillowParser,
+    url: str,
+    profile_store: Optional[QueryProfileLog] = None,
+    agent_cache: Optional[AgentCache] = None,
+) -> "Future[Optional[Dict[str, Any]]]":
+    try:
+        if profile_store is not None:
+            saved = profile_store.get(url)
+            if saved is not None:
+                logging.info("Using checkpointed profile: %s", url)
+                return completed_future(saved)
+
+        logging.info("Fetching candidate profile: %s", url)
+        fetched = _fetch_agent(http_client, parser, url, agent_cache)
+    except Exception as exc:  # noqa: BLE001
+        logging.exception("Error processing profile %s: %s", url, exc)
+        return completed_future(None)
+
+    def stored(agent: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if agent is not None and profile_store is not None:
+            profile_store.put(url, agent)
+        return agent
+
+    return chain_future(fetched, stored)
+
+def _candidate_agent(
+    url: str,
+    fetched: "Future[Optional[Dict[str, Any]]]",
+) -> Optional[Dict[str, Any]]:
+    try:
+        return fetched.result()
+    except Exception as exc:  # noqa: BLE001
+        logging.exception("Error processing profile %s: %s", url, exc)
+        return None
+
+def _iter_candidate_profiles(
+    http_client: HttpClient,
+    parser: ZillowParser,
+    profile_urls: Iterable[str],
+    concurrency: int = 1,
+    profile_store: Optional[QueryProfileLog] = None,
+    agent_cache: Optional[AgentCache] = None,
+    stop: Optional[threading.Event] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Fetch and parse candidate profiles lazily, overlapping up to
+    ``concurrency`` requests, and yield agents in the order of
+    ``profile_urls``. Fetch threads don't wait for a parser with
+    ``max_pending`` to parse their page, so up to that many more profiles
+    can be parsing meanwhile. ``profile_urls`` is only consumed as far as
+    needed to keep that many profiles in flight; requests not yet started
+    when the generator is closed are cancelled and the ones in flight
+    (parsing included) are waited for. Once ``stop`` is set, no further
+    profiles are fetched.
+    """
+    def stopped() -> bool:
+        return stop is not None and stop.is_set()
+
+    def fetch(url: str) -> "Future[Optional[Dict[str, Any]]]":
+        if stopped():
+            return completed_future(None)
+        return _fetch_candidate_profile(http_client, parser, url, profile_store, agent_cache)
+
+    if concurrency <= 1 and not parser.max_pending:
+        for url in profile_urls:
+            if stopped():
+                return
+            agent = _candidate_agent(url, fetch(url))
+            if agent is not None:
+                yield agent
+        return
+
+    concurrency = max(1, concurrency)
+    window = concurrency + parser.max_pending
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    pending: Deque[Tuple[str, "Future[Future[Optional[Dict[str, Any]]]]"]] = deque()
+    try:
+        for url in profile_urls:
+            if stopped():
+                return
+            pending.append((url, executor.submit(fetch, url)))
+            if len(pending) >= window:
+                url, fetched = pending.popleft()
+                agent = _candidate_agent(url, fetched.result())
+                if agent is not None:
+                    yield agent
+        while pending:
+            url, fetched = pending.popleft()
+            agent = _candidate_agent(url, fetched.result())
+            if agent is not None:
+                yield agent
+    finally:
+        # Drop requests that haven't started yet, and let the ones in flight
+        # finish so nothing still uses the client once this returns; pages
+        # being parsed still write to the agent cache and profile store.
+        executor.shutdown(wait=True, cancel_futures=True)
+        wait([fetched.result() for _, fetched in pending if not fetched.cancelled()])
+
+def screen_name_profile_query(query: Dict[str, Any], base_url: str) -> Optional[Dict[str, Any]]:
+    """
+    Profile query equivalent to a search query that names a screenName,
+    whose profile URL can be built directly.
+    """
+    screen_name = query.get("screenName")
+    if not screen_name:
+        return None
+    profile_url = f"{base_url.rstrip('/')}/profile/{screen_name}"
+    logging.info("Using screenName query, direct profile URL: %s", profile_url)
+    return {"profileUrl": profile_url, "filters": query.get("filters", {})}
+
+def search_params(query: Dict[str, Any]) -> Dict[str, Any]:
+    name = query.get("name")
+    location = query.get("location")
+    params: Dict[str, Any] = {}
+    if name:
+        params["searchQuery"] = name
+    if location:
+        params["locationText"] = location
+    logging.info("Searching agents by name='%s', location='%s'", name, location)
+    return params
+
+def next_search_page_url(href: Optional[str], base_url: str, seen: Set[str]) -> Optional[str]:
+    if not href:
+        return None
+    url = urljoin(base_url.rstrip("/") + "/", href)
+    if url in seen:
+        logging.warning("Search results page %s links back to an earlier page, stopping.", url)
+        return None
+    seen.add(url)
+    return url
+
+def page_profile_urls(
+    page: SearchPage,
+    page_number: int,
+    seen_urls: Set[str],
+    card_filters: Optional[AgentFilter] = None,
+) -> List[str]:
+    """
+    Profile URLs of a results page's candidates not seen on earlier pages,
+    minus those whose result card already rules them out of ``card_filters``.
+    """
+    urls: List[str] = []
+    ruled_out = 0
+    for candidate in page.candidates:
+        url = candidate.profile_url
+        if url in seen_urls:
+            continue
+        seen_urls.add(url)
+        if card_filters is not None and not may_match(candidate, card_filters):
+            logging.debug("Skipping %s, its search card doesn't match the filters.", url)
+            ruled_out += 1
+            continue
+        urls.append(url)
+    logging.info(
+        "Found %d candidate profiles on results page %d (%d ruled out by their search card)",
+        len(urls),
+        page_number,
+        ruled_out,
+    )
+    return urls
+
+def _iter_search_result_urls(
+    http_client: HttpClient,
+    parser: ZillowParser,
+    query: Dict[str, Any],
+    base_url: str,
+    max_pages: int = 1,
+    card_filters: Optional[AgentFilter] = None,
+) -> Iterator[str]:
+    """
+    Yield the candidate profile URLs of a search, following the results
+    pages' "next" links up to ``max_pages`` pages. A page is only fetched
+    once the URLs of the previous one have been consumed. With
+    ``card_filters``, candidates whose result card fails them are skipped
+    without fetching their profile.
+    """
+    html = http_client.get(SEARCH_PATH, params=search_params(query))
+    seen_pages: Set[str] = set()
+    seen_urls: Set[str] = set()
+    page_number = 1
+    while html:
+        page = parser.parse_search_page(html)
+        new_urls = page_profile_urls(page, page_number, seen_urls, card_filters)
+        yield from new_urls
+
+        if page_number >= max_pages:
+            return
+        next_url = next_search_page_url(page.next_page_url, base_url, seen_pages)
+        if next_url is None:
+            return
+        page_number += 1
+        logging.info("Fetching search results page %d: %s", page_number, next_url)
+        html = http_client.get_url(next_url)
+
+def _take_matching(agents: Iterable[Dict[str, Any]], query: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """
+    Agents from ``agents`` that pass the query's filters, stopping as soon
+    as ``limit`` of them have been found.
+    """
+    limit = query.get("limit")
+    limit = int(limit) if limit is not None else None
+    filters = build_filters(query.get("filters", {}))
+    matched: List[Dict[str, Any]] = []
+    if limit is not None and limit <= 0:
+        return matched
+    for agent in agents:
+        if matches_filter(agent, filters):
+            matched.append(agent)
+            if limit is not None and len(matched) >= limit:
+                break
+    return matched
+
+def _process_search_query(
+    http_client: HttpClient,
+    parser: ZillowParser,
+    query: Dict[str, Any],
+    base_url: str,
+    profile_concurrency: int = 1,
+    profile_store: Optional[QueryProfileLog] = None,
+    agent_cache: Optional[AgentCache] = None,
+    max_search_pages: int = 1,
+    card_prefilter: bool = True,
+    stop: Optional[threading.Event] = None,
+) -> List[Dict[str, Any]]:
+    if not query.get("name") and not query.get("screenName"):
+        logging.warning("Search query missing 'name' or 'screenName', skipping.")
+        return []
+
+    profile_query = screen_name_profile_query(query, base_url)
+    if profile_query is not None:
+        return _process_profile_query(http_client, parser, profile_query, agent_cache)
+
+    card_filters = build_filters(query.get("filters", {})) if card_prefilter else None
+    agents = _iter_candidate_profiles(
+        http_client,
+        parser,
+        _iter_search_result_urls(
+            http_client, parser, query, base_url, max_search_pages, card_filters
+        ),
+        concurrency=profile_concurrency,
+        profile_store=profile_store,
+        agent_cache=agent_cache,
+        stop=stop,
+    )
+    try:
+        return _take_matching(agents, query)
+    finally:
+        agents.close()
+
+def process_query(
+    http_client: HttpClient,
+    parser: ZillowParser,
+    query: Dict[str, Any],
+    base_url: str,
+    profile_concurrency: int = 1,
+    profile_store: Optional[QueryProfileLog] = None,
+    agent_cache: Optional[AgentCache] = None,
+    max_search_pages: int = 1,
+    card_prefilter: bool = True,
+    stop: Optional[threading.Event] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Agents matching one input query (a ``search`` or a ``profile`` lookup),
+    fetching up to ``profile_concurrency`` candidate profiles at a time.
+    Errors are logged and give no agents.
+    """
+    qtype = query.get("type", "search")
+    try:
+        if qtype == "profile":
+            return _process_profile_query(http_client, parser, query, agent_cache)
+        return _process_search_query(
+            http_client,
+            parser,
+            query,
+            base_url,
+            profile_concurrency,
+            profile_store,
+            agent_cache,
+            max_search_pages,
+            card_prefilter,
+            stop,
+        )
+    except Exception as exc:  # noqa: BLE001
+        logging.exception("Error processing query %s: %s", query, exc)
+        return []
@@ -0,0 +1,387 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from collections import deque
+from typing import (
+    Any,
+    Callable,
+    Coroutine,
+    Deque,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sized,
+    Tuple,
+)
+
+from utils.helpers import setup_logging, truncate_file
+from utils.agent_cache import AgentCache
+from utils.checkpoint import CheckpointJournal
+from utils.metrics import MetricsFileReporter
+from utils.refresh import RefreshingParser, RefreshState
+from pipeline.async_queries import process_query_async
+from pipeline.builders import (
+    HTTP_BACKENDS,
+    build_agent_cache,
+    build_async_http_client,
+    build_http_client,
+    build_metrics,
+    build_output_writer,
+    build_parser,
+)
+from pipeline.queries import process_query
+
+QueryResult = Tuple[int, Dict[str, Any], List[Dict[str, Any]]]
+
+def _collect_in_order(
+    queries: Iterable[Tuple[int, Dict[str, Any]]],
+    submit: Callable[[int, Dict[str, Any]], "Future[List[Dict[str, Any]]]"],
+    window: int,
+) -> Iterator[QueryResult]:
+    """
+    Submit indexed queries and yield each query's agents in input order,
+    keeping at most ``window`` submitted queries that haven't been yielded.
+    Futures still pending when the generator exits are cancelled.
+    """
+    pending: Deque[Tuple[int, Dict[str, Any], "Future[List[Dict[str, Any]]]"]] = deque()
+    try:
+        for idx, query in queries:
+            pending.append((idx, query, submit(idx, query)))
+            if len(pending) >= window:
+                idx, query, future = pending.popleft()
+                yield idx, query, future.result()
+        while pending:
+            idx, query, future = pending.popleft()
+            yield idx, query, future.result()
+    finally:
+        for _, _, future in pending:
+            future.cancel()
+
+def _run_queries_concurrently(
+    queries: Iterable[Tuple[int, Dict[str, Any]]],
+    run_query: Callable[[int, Dict[str, Any]], List[Dict[str, Any]]],
+    concurrency: int,
+    stop: Optional[threading.Event] = None,
+) -> Iterator[QueryResult]:
+    """
+    Run indexed queries on a pool of ``concurrency`` workers and yield each
+    query's agents in input order. At most ``2 * concurrency`` queries are in
+    flight or waiting to be collected at any time. When the generator exits,
+    ``stop`` is set so running queries wind down, and the workers are joined.
+    """
+    executor = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        yield from _collect_in_order(
+            queries,
+            lambda idx, query: executor.submit(run_query, idx, query),
+            concurrency * 2,
+        )
+    finally:
+        # On Ctrl-C, drop queued queries; in-flight ones finish their request.
+        if stop is not None:
+            stop.set()
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def _run_queries_on_event_loop(
+    queries: Iterable[Tuple[int, Dict[str, Any]]],
+    run_query: Callable[[int, Dict[str, Any]], Coroutine[Any, Any, List[Dict[str, Any]]]],
+    concurrency: int,
+    on_close: Optional[Callable[[], Coroutine[Any, Any, None]]] = None,
+) -> Iterator[QueryResult]:
+    """
+    Run indexed query coroutines on an event loop in a background thread and
+    yield each query's agents in input order, with up to ``concurrency``
+    queries in flight together. When the generator exits, tasks still
+    running are cancelled and awaited, and ``on_close`` runs on the loop
+    before it stops.
+    """
+    async def shutdown() -> None:
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await loop.shutdown_asyncgens()
+        if on_close is not None:
+            await on_close()
+        await loop.shutdown_default_executor()
+
+    loop = asyncio.new_event_loop()
+    thread = threading.Thread(target=loop.run_forever, name="query-event-loop", daemon=True)
+    thread.start()
+    try:
+        yield from _collect_in_order(
+            queries,
+            lambda idx, query: asyncio.run_coroutine_threadsafe(run_query(idx, query), loop),
+            max(1, concurrency),
+        )
+    finally:
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), loop).result(timeout=30)
+        except Exception as exc:  # noqa: BLE001
+            logging.warning("Error while shutting down the event loop: %s", exc)
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+def iter_query_results(
+    queries: Iterable[Dict[str, Any]],
+    settings: Dict[str, Any],
+    checkpoint: Optional[CheckpointJournal] = None,
+    refresh: Optional[RefreshState] = None,
+) -> Iterator[QueryResult]:
+    """
+    Process queries and yield ``(index, query, agents)`` for each one as soon
+    as it completes, in input order, without holding the whole run in memory.
+    ``queries`` may be a lazy iterator; it is consumed as work is scheduled.
+
+    With a ``checkpoint``, queries it records as done are skipped and parsed
+    profiles are journaled; the caller marks a query done once its agents
+    have been written. The checkpoint is marked finished once every query
+    has run.
+
+    With ``refresh``, agents it holds that are still fresh are reused
+    without fetching, and re-fetched pages whose content is unchanged reuse
+    the previous record instead of being parsed.
+    """
+    setup_logging(settings.get("log_level", "INFO"))
+
+    http_backend = settings.get("http_backend", "requests")
+    if http_backend not in HTTP_BACKENDS:
+        raise ValueError(
+            f"Unknown http_backend '{http_backend}', expected one of {', '.join(HTTP_BACKENDS)}."
+        )
+
+    metrics = build_metrics(settings)
+    if http_backend == "aiohttp":
+        async_client = build_async_http_client(settings, metrics)
+    else:
+        http_client = build_http_client(settings, metrics)
+    parser = build_parser(settings, metrics)
+    agent_cache = build_agent_cache(settings)
+    if refresh is not None:
+        parser = RefreshingParser(parser, refresh)
+        if agent_cache is None:
+            # Only serves the fresh agents seeded below.
+            agent_cache = AgentCache(max_entries=0)
+        seeded = 0
+        for url, agent in refresh.fresh_agents():
+            agent_cache.seed(url, agent)
+            seeded += 1
+        logging.info("Refresh: %d previous agents are fresh and won't be fetched again.", seeded)
+
+    reporter = None
+    metrics_path = settings.get("metrics_path")
+    if metrics is not None and metrics_path:
+        reporter = MetricsFileReporter(
+            metrics,
+            metrics_path,
+            interval=float(settings.get("metrics_interval_seconds", 30)),
+        ).start()
+
+    base_url = settings.get("base_url", "https://www.zillow.com")
+    profile_concurrency = int(settings.get("profile_concurrency", 1))
+    query_concurrency = int(settings.get("query_concurrency", 1))
+    max_search_pages = max(1, int(settings.get("search_max_pages", 1)))
+    card_prefilter = bool(settings.get("search_card_prefilter", True))
+
+    total_queries = len(queries) if isinstance(queries, Sized) else None
+    stop = threading.Event()
+
+    def start_query(idx: int, query: Dict[str, Any]) -> bool:
+        if total_queries is not None:
+            logging.info("Processing query %d/%d: %s", idx, total_queries, json.dumps(query))
+        else:
+            logging.info("Processing query %d: %s", idx, json.dumps(query))
+        if not isinstance(query, dict):
+            logging.warning("Query %d is not a JSON object, skipping.", idx)
+            return False
+        return True
+
+    def run_query(idx: int, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if stop.is_set() or not start_query(idx, query):
+            return []
+        profile_store = checkpoint.profile_log(idx) if checkpoint is not None else None
+        return process_query(
+            http_client,
+            parser,
+            query,
+            base_url,
+            profile_concurrency,
+            profile_store,
+            agent_cache,
+            max_search_pages,
+            card_prefilter,
+            stop,
+        )
+
+    async def run_query_async(idx: int, query: Dict[str, Any]) -> List[Dict[str, Any]]:
+        if not start_query(idx, query):
+            return []
+        profile_store = checkpoint.profile_log(idx) if checkpoint is not None else None
+        return await process_query_async(
+            async_client,
+            parser,
+            query,
+            base_url,
+            profile_concurrency,
+            profile_store,
+            agent_cache,
+            max_search_pages,
+            card_prefilter,
+        )
+
+    def pending_queries() -> Iterator[Tuple[int, Dict[str, Any]]]:
+        for idx, query in enumerate(queries, start=1):
+            if checkpoint is not None and checkpoint.is_query_done(idx, query):
+                logging.info("Skipping query %d, already completed.", idx)
+                continue
+            yield idx, query
+
+    if http_backend == "aiohttp":
+        results: Iterator[QueryResult] = _run_queries_on_event_loop(
+            pending_queries(),
+            run_query_async,
+            query_concurrency,
+            on_close=async_client.close,
+        )
+    elif query_concurrency <= 1:
+        results = (
+            (idx, query, run_query(idx, query)) for idx, query in pending_queries()
+        )
+    else:
+        results = _run_queries_concurrently(
+            pending_queries(), run_query, query_concurrency, stop
+        )
+
+    total = 0
+    interrupted = False
+    try:
+        for result in results:
+            total += len(result[2])
+            if metrics is not None:
+                metrics.increment("queries")
+                metrics.increment("agents", len(result[2]))
+            yield result
+    except KeyboardInterrupt:
+        interrupted = True
+        logging.warning("Interrupted by user.")
+    finally:
+        # Wind down and join the workers before the clients they use are closed.
+        results.close()
+        parser.close()
+        client = async_client if http_backend == "aiohttp" else http_client
+        if client.archive is not None:
+            client.archive.close()
+        if client.cache is not None:
+            client.cache.close()
+        if reporter is not None:
+            reporter.close()
+
+    if agent_cache is not None:
+        logging.info(
+            "Agent cache: %d profiles fetched, %d repeat lookups served from cache.",
+            agent_cache.misses,
+            agent_cache.hits,
+        )
+    if refresh is not None:
+        logging.info(
+            "Refresh: %d profiles fetched, %d unchanged since the previous run and not parsed again.",
+            refresh.fetched,
+            refresh.unchanged,
+        )
+    if checkpoint is not None and not interrupted:
+        checkpoint.finish()
+    logging.info("Finished processing queries. Total agents: %d", total)
+    if metrics is not None:
+        logging.info(metrics.format_summary())
+
+def iter_agents(
+    queries: Iterable[Dict[str, Any]],
+    settings: Dict[str, Any],
+    refresh: Optional[RefreshState] = None,
+) -> Iterator[Dict[str, Any]]:
+    """
+    Process queries and yield matching agents in input order as each query
+    completes.
+    """
+    for _, _, agents in iter_query_results(queries, settings, refresh=refresh):
+        yield from agents
+
+def process_queries(
+    queries: Iterable[Dict[str, Any]],
+    settings: Dict[str, Any],
+    refresh: Optional[RefreshState] = None,
+) -> List[Dict[str, Any]]:
+    return list(iter_agents(queries, settings, refresh))
+
+def run_with_checkpoint(
+    queries: Iterable[Dict[str, Any]],
+    settings: Dict[str, Any],
+    output_path: str,
+    checkpoint_path: str,
+    resume: bool = False,
+    refresh: Optional[RefreshState] = None,
+    output_format: str = "ndjson",
+) -> None:
+    """
+    Stream agents to an NDJSON or CSV output while journaling progress, so
+    an interrupted run can be picked up again with ``resume=True``. The
+    checkpoint is removed once the run completes.
+    """
+    if resume and not os.path.exists(checkpoint_path):
+        raise ValueError(
+            f"--resume found no checkpoint at {checkpoint_path}; the previous run "
+            "either finished or never started."
+        )
+    checkpoint = CheckpointJournal(checkpoint_path, resume=resume)
+    results: Optional[Iterator[QueryResult]] = None
+    try:
+        if resume:
+            if checkpoint.output_offset is None:
+                logging.warning(
+                    "Checkpoint %s doesn't record the output size; keeping %s as it is.",
+                    checkpoint_path,
+                    output_path,
+                )
+            # Drop agents written after the last checkpointed query; that
+            # query will run again.
+            truncate_file(output_path, checkpoint.output_offset)
+        writer = build_output_writer(settings, output_path, output_format, append=resume)
+        with writer:
+            if not resume:
+                checkpoint.record_output_offset(writer.tell())
+            results = iter_query_results(queries, settings, checkpoint, refresh)
+            for idx, query, agents in results:
+                for agent in agents:
+                    writer.write(agent)
+                writer.flush()
+                checkpoint.mark_query_done(idx, query, output_offset=writer.tell())
+    except KeyboardInterrupt:
+        logging.warning("Interrupted by user.")
+    finally:
+        # Join the workers before the journal they write profiles to is closed.
+        if results is not None:
+            results.close()
+        checkpoint.close()
+    if checkpoint.finished:
+        os.remove(checkpoint_path)
+
+def write_agents(
+    agents: Iterable[Dict[str, Any]],
+    settings: Dict[str, Any],
+    output_path: str,
+    output_format: Optional[str] = None,
+) -> int:
+    """
+    Stream ``agents`` to ``output_path`` in ``output_format`` (by default
+    the one its extension implies) and return how many were written.
+    """
+    with build_output_writer(settings, output_path, output_format) as writer:
+        for agent in agents:
+            writer.write(agent)
+    return writer.count
@@ -0,0 +1,185 @@
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit, urlunsplit
+
+from utils.helpers import completed_future
+
+def normalize_profile_url(url: str) -> str:
+    """
+    Canonical form of a profile URL used as the cache key: lower-case scheme
+    and host, no query string or fragment, no trailing slash.
+    """
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, "", ""))
+
+class _FetchAbandoned(Exception):
+    """
+    Set on an in-flight fetch whose owning task was cancelled.
+    """
+
+class AgentCache:
+    """
+    Run-wide memo of parsed agent records keyed by normalized profile URL.
+
+    ``get_or_fetch`` runs the fetch for a URL at most once, even when several
+    threads ask for it at the same time; the others wait for that result.
+    Failed fetches (``None`` or an exception) are not cached. With
+    ``max_entries`` set, the least recently used records are dropped;
+    records stored with ``seed`` are kept regardless.
+    ``get_or_submit`` does the same without waiting, for fetches that
+    return a future. ``get_or_fetch_async`` does it for coroutines on an
+    event loop; when the task running a fetch is cancelled, a waiting task
+    fetches the record itself instead of getting None.
+    """
+
+    def __init__(self, max_entries: Optional[int] = None) -> None:
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._seeded: Dict[str, Dict[str, Any]] = {}
+        self._inflight: Dict[str, "Future[Optional[Dict[str, Any]]]"] = {}
+        self._lock = threading.Lock()
+
+    def _claim(
+        self, key: str
+    ) -> Tuple[Optional[Dict[str, Any]], "Future[Optional[Dict[str, Any]]]", bool]:
+        """
+        Return ``(cached agent, in-flight future, owner)`` for ``key``. The
+        owner is the caller that must run the fetch and ``_release`` it.
+        """
+        with self._lock:
+            agent = self._entries.get(key)
+            if agent is not None:
+                self._entries.move_to_end(key)
+            else:
+                agent = self._seeded.get(key)
+            if agent is not None:
+                self.hits += 1
+                return agent, Future(), False
+            pending = self._inflight.get(key)
+            if pending is None:
+                self.misses += 1
+                pending = Future()
+                self._inflight[key] = pending
+                return None, pending, True
+            self.hits += 1
+            return None, pending, False
+
+    def _release(
+        self,
+        key: str,
+        pending: "Future[Optional[Dict[str, Any]]]",
+        agent: Optional[Dict[str, Any]],
+        abandoned: bool = False,
+    ) -> None:
+        with self._lock:
+            del self._inflight[key]
+            if agent is not None:
+                self._store_locked(key, agent)
+        if abandoned:
+            pending.set_exception(_FetchAbandoned())
+        else:
+            pending.set_result(agent)
+
+    def get_or_fetch(
+        self,
+        url: str,
+        fetch: Callable[[], Optional[Dict[str, Any]]],
+    ) -> Optional[Dict[str, Any]]:
+        key = normalize_profile_url(url)
+        agent, pending, owner = self._claim(key)
+        if agent is not None:
+            return agent
+        if not owner:
+            logging.debug("Waiting for in-flight fetch of %s", url)
+            return pending.result()
+
+        try:
+            agent = fetch()
+        finally:
+            self._release(key, pending, agent)
+        return agent
+
+    def get_or_submit(
+        self,
+        url: str,
+        submit: Callable[[], "Future[Optional[Dict[str, Any]]]"],
+    ) -> "Future[Optional[Dict[str, Any]]]":
+        """
+        ``get_or_fetch`` for a fetch that returns a future of the record
+        (e.g. a page handed to a parser pool): returns the record as a future
+        without waiting for it. Callers waiting on another caller's fetch get
+        None if it fails; its owner gets the exception.
+        """
+        key = normalize_profile_url(url)
+        agent, pending, owner = self._claim(key)
+        if agent is not None:
+            return completed_future(agent)
+        if not owner:
+            logging.debug("Waiting for in-flight fetch of %s", url)
+            return pending
+
+        try:
+            submitted = submit()
+        except BaseException:
+            self._release(key, pending, None)
+            raise
+
+        def release(done: "Future[Optional[Dict[str, Any]]]") -> None:
+            failed = done.cancelled() or done.exception() is not None
+            self._release(key, pending, None if failed else done.result())
+
+        submitted.add_done_callback(release)
+        return submitted
+
+    async def get_or_fetch_async(
+        self,
+        url: str,
+        fetch: Callable[[], Awaitable[Optional[Dict[str, Any]]]],
+    ) -> Optional[Dict[str, Any]]:
+        key = normalize_profile_url(url)
+        while True:
+            agent, pending, owner = self._claim(key)
+            if agent is not None:
+                return agent
+            if owner:
+                break
+            logging.debug("Waiting for in-flight fetch of %s", url)
+            try:
+                return await asyncio.wrap_future(pending)
+            except _FetchAbandoned:
+                logging.debug("Fetch of %s was cancelled, fetching it again", url)
+
+        abandoned = False
+        try:
+            agent = await fetch()
+        except asyncio.CancelledError:
+            abandoned = True
+            raise
+        finally:
+            self._release(key, pending, agent, abandoned)
+        return agent
+
+    def seed(self, url: str, agent: Dict[str, Any]) -> None:
+        """
+        Store ``agent`` for ``url`` up front, as if it had been fetched. Seeded
+        records don't count towards ``max_entries``.
+        """
+        with self._lock:
+            self._seeded[normalize_profile_url(url)] = agent
+
+    def _store_locked(self, key: str, agent: Dict[str, Any]) -> None:
+        self._entries[key] = agent
+        self._entries.move_to_end(key)
+        if self.max_entries is not None:
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._entries) + len(self._seeded)
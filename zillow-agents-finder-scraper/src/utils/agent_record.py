@@ -0,0 +1,127 @@
+import json
+from collections.abc import Mapping
+from json.encoder import encode_basestring
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+# Output keys in order, paired with the attribute that stores each one.
+AGENT_FIELDS: Tuple[Tuple[str, str], ...] = (
+    ("agentName", "agent_name"),
+    ("profileUrl", "profile_url"),
+    ("agency", "agency"),
+    ("phoneNumber", "phone_number"),
+    ("reviews", "reviews"),
+    ("salesListings", "sales_listings"),
+    ("soldListings", "sold_listings"),
+    ("location", "location"),
+    ("rating", "rating"),
+)
+_ATTRIBUTE_FOR_KEY: Dict[str, str] = dict(AGENT_FIELDS)
+_ENCODE = json.JSONEncoder(ensure_ascii=False).encode
+_JSON_TEMPLATE = "{" + ", ".join(f"{_ENCODE(key)}: %s" for key, _ in AGENT_FIELDS) + "}"
+
+def _json_value(value: Any) -> str:
+    # Shortcuts for the common types; anything else goes through the encoder.
+    if value is None:
+        return "null"
+    if type(value) is str:
+        return encode_basestring(value)
+    if type(value) is int:
+        return int.__repr__(value)
+    return _ENCODE(value)
+
+class AgentRecord(Mapping):
+    """
+    Compact agent record: the nine output fields in ``__slots__`` instead of
+    a per-agent dict, which cuts the per-record overhead by more than half.
+
+    It is a read-only ``Mapping`` keyed by the output (JSON) field names, so
+    code written against agent dicts (``agent["location"]``,
+    ``agent.get("reviews")``, ``dict(agent)``, ``agent == {...}``) keeps
+    working. Use ``from_dict``/``to_dict`` to convert and ``to_json`` to
+    serialize without building a dict.
+    """
+
+    __slots__ = tuple(attribute for _, attribute in AGENT_FIELDS)
+
+    def __init__(
+        self,
+        agent_name: Optional[str] = None,
+        profile_url: Optional[str] = None,
+        agency: Optional[str] = None,
+        phone_number: Optional[str] = None,
+        reviews: Optional[int] = None,
+        sales_listings: Optional[int] = None,
+        sold_listings: Optional[int] = None,
+        location: Optional[str] = None,
+        rating: Optional[float] = None,
+    ) -> None:
+        self.agent_name = agent_name
+        self.profile_url = profile_url
+        self.agency = agency
+        self.phone_number = phone_number
+        self.reviews = reviews
+        self.sales_listings = sales_listings
+        self.sold_listings = sold_listings
+        self.location = location
+        self.rating = rating
+
+    @classmethod
+    def from_dict(cls, data: Mapping) -> "AgentRecord":
+        """
+        Build a record from an agent dict; unknown keys are ignored and
+        missing ones become None.
+        """
+        return cls(*(data.get(key) for key, _ in AGENT_FIELDS))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: getattr(self, attribute) for key, attribute in AGENT_FIELDS}
+
+    def to_json(self) -> str:
+        """
+        Same text as ``json.dumps(self.to_dict(), ensure_ascii=False)``.
+        """
+        return _JSON_TEMPLATE % (
+            _json_value(self.agent_name),
+            _json_value(self.profile_url),
+            _json_value(self.agency),
+            _json_value(self.phone_number),
+            _json_value(self.reviews),
+            _json_value(self.sales_listings),
+            _json_value(self.sold_listings),
+            _json_value(self.location),
+            _json_value(self.rating),
+        )
+
+    def __getitem__(self, key: str) -> Any:
+        attribute = _ATTRIBUTE_FOR_KEY.get(key)
+        if attribute is None:
+            raise KeyError(key)
+        return getattr(self, attribute)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        attribute = _ATTRIBUTE_FOR_KEY.get(key)
+        return default if attribute is None else getattr(self, attribute)
+
+    def __iter__(self) -> Iterator[str]:
+        return (key for key, _ in AGENT_FIELDS)
+
+    def __len__(self) -> int:
+        return len(AGENT_FIELDS)
+
+    def __contains__(self, key: object) -> bool:
+        return key in _ATTRIBUTE_FOR_KEY
+
+    def __repr__(self) -> str:
+        return f"AgentRecord({self.to_dict()!r})"
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (AgentRecord, tuple(getattr(self, attribute) for _, attribute in AGENT_FIELDS))
+
+def agent_json_default(value: Any) -> Any:
+    """
+    ``default=`` hook for ``json.dump``/``json.dumps`` that serializes
+    :class:`AgentRecord` values as agent dicts.
+    """
+    if isinstance(value, AgentRecord):
+        return value.to_dict()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
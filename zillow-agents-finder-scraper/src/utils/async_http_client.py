@@ -0,0 +1,186 @@
+import asyncio
+from typing import Any, Dict, Optional
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency, only needed for http_backend "aiohttp".
+    aiohttp = None
+
+from utils.html_archive import HtmlArchive
+from utils.http_client import (
+    RESPONSE_FAILED,
+    RESPONSE_OK,
+    RESPONSE_REVALIDATED,
+    BaseHttpClient,
+)
+from utils.metrics import Metrics
+from utils.rate_limiter import RateLimiter
+from utils.response_cache import ResponseCache
+from utils.throttle import AdaptiveThrottle
+
+class AsyncHttpClient(BaseHttpClient):
+    """
+    asyncio counterpart of :class:`HttpClient` built on aiohttp.
+
+    Retries, backoff, default headers, rate limiting, adaptive throttling,
+    response caching, archiving and metrics behave exactly as in
+    ``HttpClient._request`` (the policy lives in :class:`BaseHttpClient`);
+    the difference is that a request waiting on the
+    network or on the rate limiter only holds a coroutine, so thousands can
+    be outstanding on one event loop. Connections are pooled and kept alive, up to
+    ``max_connections`` in total.
+
+    The underlying session is created on first use and must be used from a
+    single event loop; call ``close`` from that loop when done. Cache and
+    archive I/O runs in worker threads so it never blocks the loop.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: int = 10,
+        max_retries: int = 3,
+        backoff_factor: int = 1,
+        rate_limit_per_minute: int = 60,
+        user_agent: Optional[str] = None,
+        max_connections: int = 100,
+        rate_limit_burst: int = 1,
+        host_rate_limits: Optional[Dict[str, float]] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[Metrics] = None,
+        throttle: Optional[AdaptiveThrottle] = None,
+        archive: Optional[HtmlArchive] = None,
+    ) -> None:
+        if aiohttp is None:
+            raise ValueError("HTTP backend 'aiohttp' is not available; install the 'aiohttp' package.")
+        super().__init__(
+            base_url,
+            timeout=timeout,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            rate_limit_per_minute=rate_limit_per_minute,
+            user_agent=user_agent,
+            rate_limit_burst=rate_limit_burst,
+            host_rate_limits=host_rate_limits,
+            rate_limiter=rate_limiter,
+            cache=cache,
+            metrics=metrics,
+            throttle=throttle,
+            archive=archive,
+        )
+        self.max_connections = max_connections
+        self._session: Optional["aiohttp.ClientSession"] = None
+
+    def _get_session(self) -> "aiohttp.ClientSession":
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections),
+                # Like requests' timeout: per connect and per read, so time
+                # spent waiting for a pooled connection doesn't count.
+                timeout=aiohttp.ClientTimeout(
+                    total=None,
+                    sock_connect=self.timeout,
+                    sock_read=self.timeout,
+                ),
+            )
+        return self._session
+
+    async def _respect_rate_limit(self, url: str) -> None:
+        waited = await self.rate_limiter.acquire_async(url)
+        if waited > 0 and self.metrics is not None:
+            self.metrics.observe("rate_limit.wait", waited)
+
+    async def _acquire_slot(self) -> Optional[int]:
+        if self.throttle is None:
+            return None
+        token, waited = await self.throttle.acquire_async()
+        if waited > 0 and self.metrics is not None:
+            self.metrics.observe("throttle.wait", waited)
+        return token
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Optional[str]:
+        full_headers = self._headers(headers)
+        if params:
+            # requests silently drops None values; aiohttp rejects them.
+            params = {key: value for key, value in params.items() if value is not None}
+
+        cached = None
+        if self.cache is not None and method.upper() == "GET":
+            cached = await asyncio.to_thread(self.cache.get, method, url, params)
+            if cached is not None:
+                body = self._cached_body(url, cached, full_headers)
+                if body is not None:
+                    return body
+
+        session = self._get_session()
+        for attempt in range(1, self.max_retries + 1):
+            token = await self._acquire_slot()
+            status: Optional[int] = None
+            retry_after: Optional[float] = None
+            try:
+                await self._respect_rate_limit(url)
+                started = self._start_attempt(method, url, params, attempt)
+                async with session.request(
+                    method.upper(),
+                    url,
+                    params=params,
+                    headers=full_headers,
+                ) as resp:
+                    body = await resp.text(errors="replace")
+                status = resp.status
+                self._record_response(started, status)
+                action, retry_after = self._classify(
+                    url, status, resp.reason, resp.headers, attempt, cached is not None
+                )
+                if action == RESPONSE_OK:
+                    await asyncio.to_thread(self._store, method, url, params, body, resp.headers)
+                    return body
+                if action == RESPONSE_REVALIDATED:
+                    await asyncio.to_thread(self.cache.mark_revalidated, method, url, params)
+                    return cached.body
+                if action == RESPONSE_FAILED:
+                    return None
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                self._record_error(started, attempt, exc)
+            finally:
+                self._release_slot(token, status, retry_after)
+
+            delay = self._backoff_delay(attempt, retry_after)
+            if delay is not None:
+                await asyncio.sleep(delay)
+
+        self._exhausted(url)
+        return None
+
+    async def get(
+        self,
+        path: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Optional[str]:
+        """
+        Perform an HTTP GET relative to the configured base_url.
+        """
+        return await self._request("GET", self._absolute_url(path), params=params, headers=headers)
+
+    async def get_url(
+        self,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None,
+    ) -> Optional[str]:
+        """
+        Perform an HTTP GET to an absolute URL.
+        """
+        return await self._request("GET", url, params=params, headers=headers)
+
+    async def close(self) -> None:
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
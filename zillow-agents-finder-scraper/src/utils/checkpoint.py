@@ -0,0 +1,153 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, Mapping, Optional, TextIO
+
+from utils.agent_record import AgentRecord, agent_json_default
+from utils.helpers import ensure_dir_for_file, iter_json_lines_file
+
+def query_fingerprint(query: Any) -> str:
+    encoded = json.dumps(query, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha1(encoded.encode("utf-8")).hexdigest()
+
+class QueryProfileLog:
+    """
+    Profile store for a single query, backed by the run's checkpoint journal.
+    Profiles parsed before an interruption are served from here on resume.
+    """
+
+    def __init__(self, journal: "CheckpointJournal", query_index: int) -> None:
+        self.journal = journal
+        self.query_index = query_index
+
+    def get(self, url: str) -> Optional[AgentRecord]:
+        return self.journal.get_profile(self.query_index, url)
+
+    def put(self, url: str, agent: Mapping[str, Any]) -> None:
+        self.journal.record_profile(self.query_index, url, agent)
+
+class CheckpointJournal:
+    """
+    Append-only NDJSON journal of finished queries and parsed profiles.
+
+    A query is recorded as done only after its agents have been written to
+    the output, together with the output size at that point, so on resume
+    every recorded query can be skipped and the output trimmed back to the
+    last complete query. Profiles parsed for a query that did not finish
+    are replayed instead of being fetched again. Queries are identified by
+    their position in the input plus a fingerprint of their contents. The
+    output size before the first query is recorded too (see
+    ``record_output_offset``), so even a run interrupted during its first
+    query can be trimmed on resume.
+
+    Once every query has run, ``finish`` marks the journal as no longer
+    needed, so the caller can remove it.
+    """
+
+    def __init__(self, path: str, resume: bool = False) -> None:
+        self.path = path
+        self._done: Dict[int, str] = {}
+        self._profiles: Dict[int, Dict[str, AgentRecord]] = {}
+        self.output_offset: Optional[int] = None
+        self.finished = False
+        self._lock = threading.Lock()
+
+        if resume and os.path.exists(path):
+            self._load()
+        ensure_dir_for_file(path)
+        self._file: Optional[TextIO] = open(path, "a" if resume else "w", encoding="utf-8")
+        if resume and self._file.tell() > 0:
+            # A crash may have left a partial last line; start on a fresh one.
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    self._file.write("\n")
+
+    def _load(self) -> None:
+        for entry in iter_json_lines_file(self.path):
+            if not isinstance(entry, dict):
+                continue
+            kind = entry.get("type")
+            if kind == "query":
+                self._done[entry["index"]] = entry["fingerprint"]
+                self._profiles.pop(entry["index"], None)
+                if entry.get("outputOffset") is not None:
+                    self.output_offset = entry["outputOffset"]
+            elif kind == "output":
+                self.output_offset = entry.get("outputOffset")
+            elif kind == "profile" and entry.get("query") not in self._done:
+                agent = AgentRecord.from_dict(entry["agent"])
+                self._profiles.setdefault(entry["query"], {})[entry["url"]] = agent
+        logging.info(
+            "Loaded checkpoint %s: %d finished queries, %d saved profiles.",
+            self.path,
+            len(self._done),
+            sum(len(profiles) for profiles in self._profiles.values()),
+        )
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        with self._lock:
+            if self._file is None:
+                # Closed; profiles still arriving from winding-down workers are dropped.
+                return
+            self._file.write(json.dumps(entry, ensure_ascii=False, default=agent_json_default))
+            self._file.write("\n")
+            self._file.flush()
+
+    def is_query_done(self, index: int, query: Any) -> bool:
+        fingerprint = self._done.get(index)
+        if fingerprint is None:
+            return False
+        if fingerprint != query_fingerprint(query):
+            logging.warning(
+                "Query %d differs from the checkpointed one, running it again.", index
+            )
+            return False
+        return True
+
+    def mark_query_done(
+        self,
+        index: int,
+        query: Any,
+        output_offset: Optional[int] = None,
+    ) -> None:
+        fingerprint = query_fingerprint(query)
+        self._append(
+            {
+                "type": "query",
+                "index": index,
+                "fingerprint": fingerprint,
+                "outputOffset": output_offset,
+            }
+        )
+        with self._lock:
+            self._done[index] = fingerprint
+            self._profiles.pop(index, None)
+            if output_offset is not None:
+                self.output_offset = output_offset
+
+    def record_output_offset(self, output_offset: int) -> None:
+        self._append({"type": "output", "outputOffset": output_offset})
+        with self._lock:
+            self.output_offset = output_offset
+
+    def get_profile(self, index: int, url: str) -> Optional[AgentRecord]:
+        with self._lock:
+            return self._profiles.get(index, {}).get(url)
+
+    def record_profile(self, index: int, url: str, agent: Mapping[str, Any]) -> None:
+        self._append({"type": "profile", "query": index, "url": url, "agent": agent})
+
+    def profile_log(self, index: int) -> QueryProfileLog:
+        return QueryProfileLog(self, index)
+
+    def finish(self) -> None:
+        self.finished = True
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -1,7 +1,10 @@
-thonimport json
+import json
 import logging
 import os
-from typing import Any, Dict
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator
+
+from utils.agent_record import agent_json_default
 
 def setup_logging(level: str = "INFO") -> None:
     numeric_level = getattr(logging, level.upper(), logging.INFO)
@@ -19,10 +22,35 @@ def load_json_file(path: str) -> Any:
     with open(path, "r", encoding="utf-8") as f:
         return json.load(f)
 
+def iter_json_lines_file(path: str) -> Iterator[Any]:
+    """
+    Lazily yield one decoded value per non-blank line of an NDJSON file.
+    Lines that are not valid JSON are logged and skipped.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError as exc:
+                logging.warning("Skipping invalid JSON on line %d of %s: %s", line_no, path, exc)
+
 def save_json_file(path: str, data: Any) -> None:
     ensure_dir_for_file(path)
     with open(path, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+        json.dump(data, f, indent=2, ensure_ascii=False, default=agent_json_default)
+
+def truncate_file(path: str, size: int | None) -> None:
+    """
+    Cut ``path`` back to ``size`` bytes if it exists and is longer.
+    """
+    if size is None or not os.path.exists(path):
+        return
+    if os.path.getsize(path) > size:
+        with open(path, "r+b") as f:
+            f.truncate(size)
 
 def load_settings(path: str) -> Dict[str, Any]:
     if not os.path.exists(path):
@@ -48,4 +76,32 @@ def try_float(value: Any) -> float | None:
 def normalize_whitespace(text: str | None) -> str | None:
     if text is None:
         return None
-    return " ".join(str(text).split())
\ No newline at end of file
+    return " ".join(str(text).split())
+
+def completed_future(value: Any) -> "Future[Any]":
+    """
+    A future that already holds ``value``.
+    """
+    future: "Future[Any]" = Future()
+    future.set_result(value)
+    return future
+
+def chain_future(future: "Future[Any]", func: Callable[[Any], Any]) -> "Future[Any]":
+    """
+    Future of ``func(result)`` once ``future`` has its result, computed in
+    the thread that completes ``future``. Exceptions from ``future`` or
+    ``func`` are passed on; ``func`` isn't called if the returned future
+    was cancelled first.
+    """
+    chained: "Future[Any]" = Future()
+
+    def done(source: "Future[Any]") -> None:
+        if not chained.set_running_or_notify_cancel():
+            return
+        try:
+            chained.set_result(func(source.result()))
+        except BaseException as exc:  # noqa: BLE001
+            chained.set_exception(exc)
+
+    future.add_done_callback(done)
+    return chained
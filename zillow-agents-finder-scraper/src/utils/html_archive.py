@@ -0,0 +1,252 @@
+import gzip
+import json
+import mmap
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, TextIO
+from urllib.parse import urlencode
+
+try:
+    import zstandard
+except ImportError:  # Optional dependency, only needed for archive_compression "zstd".
+    zstandard = None
+
+try:
+    import fcntl
+except ImportError:  # Not on Windows; the directory lock is skipped there.
+    fcntl = None
+
+from utils.helpers import iter_json_lines_file
+
+INDEX_FILE = "index.jsonl"
+LOCK_FILE = "archive.lock"
+SEGMENT_PREFIX = "segment-"
+COMPRESSIONS = {"gzip": ".html.gz", "zstd": ".html.zst"}
+
+@dataclass
+class ArchiveEntry:
+    """
+    Where one archived response lives: ``length`` compressed bytes at
+    ``offset`` in the segment file ``segment``.
+    """
+
+    url: str
+    fetched_at: float
+    segment: str
+    offset: int
+    length: int
+
+def archive_url(url: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """
+    The URL a GET with ``params`` was sent to, as stored in the archive.
+    """
+    if not params:
+        return url
+    separator = "&" if "?" in url else "?"
+    return f"{url}{separator}{urlencode(params, doseq=True)}"
+
+def _compression_of(segment: str) -> str:
+    for name, suffix in COMPRESSIONS.items():
+        if segment.endswith(suffix):
+            return name
+    raise ValueError(f"Unknown archive segment type: {segment}")
+
+class HtmlArchive:
+    """
+    Append-only archive of raw response bodies in a directory, so pages can
+    be parsed again later without fetching them.
+
+    Each body is compressed on its own (gzip, or zstd when the
+    ``zstandard`` package is installed) and appended to the current segment
+    file; a new segment is started once it reaches ``segment_max_bytes``.
+    ``index.jsonl`` records the URL, fetch time and position of every
+    body, and is only written after the body itself, so a crash can't leave
+    an entry pointing at missing data. Bodies are read back through mmap.
+
+    Appends are safe from several threads of one process. A writer holds a
+    lock on ``archive.lock`` in the directory, so a second process writing
+    to the same directory fails instead of corrupting the index.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        compression: str = "gzip",
+        segment_max_bytes: int = 256 * 1024 * 1024,
+        level: Optional[int] = None,
+    ) -> None:
+        if compression not in COMPRESSIONS:
+            raise ValueError(
+                f"Unknown archive compression '{compression}', expected one of "
+                f"{', '.join(COMPRESSIONS)}."
+            )
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("archive_compression 'zstd' needs the zstandard package.")
+        self.directory = directory
+        self.compression = compression
+        self.segment_max_bytes = segment_max_bytes
+        self.level = level
+        self._lock = threading.Lock()
+        # Opened on the first append, so a read-only archive is never touched.
+        self._segment: Optional[BinaryIO] = None
+        self._segment_name: Optional[str] = None
+        self._index: Optional[TextIO] = None
+        self._lock_file: Optional[TextIO] = None
+        self._maps: Dict[str, mmap.mmap] = {}
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.compression == "zstd":
+            return zstandard.ZstdCompressor(level=self.level or 3).compress(data)
+        return gzip.compress(data, compresslevel=self.level or 6, mtime=0)
+
+    def _segment_names(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(
+            name for name in os.listdir(self.directory) if name.startswith(SEGMENT_PREFIX)
+        )
+
+    def lock_directory(self) -> None:
+        """
+        Claim the directory for writing; raises ValueError if another
+        process is already writing to it. Done on the first append anyway.
+        """
+        with self._lock:
+            self._lock_directory()
+
+    def _lock_directory(self) -> None:
+        # Called with the lock held.
+        if self._lock_file is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        if fcntl is None:
+            return
+        lock_file = open(os.path.join(self.directory, LOCK_FILE), "a", encoding="utf-8")
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            lock_file.close()
+            raise ValueError(
+                f"HTML archive {self.directory} is being written by another process; "
+                "give each process its own archive_path."
+            ) from None
+        self._lock_file = lock_file
+
+    def _open_segment(self, size: int) -> BinaryIO:
+        # Called with the lock held.
+        suffix = COMPRESSIONS[self.compression]
+        if self._segment is not None:
+            used = self._segment.tell()
+            if used == 0 or used + size <= self.segment_max_bytes:
+                return self._segment
+            self._segment.close()
+            number = int(self._segment_name[len(SEGMENT_PREFIX):].split(".")[0]) + 1
+        else:
+            self._lock_directory()
+            names = self._segment_names()
+            number = 1
+            if names:
+                last = names[-1]
+                number = int(last[len(SEGMENT_PREFIX):].split(".")[0])
+                used = os.path.getsize(os.path.join(self.directory, last))
+                if not last.endswith(suffix) or (used and used + size > self.segment_max_bytes):
+                    number += 1
+        self._segment_name = f"{SEGMENT_PREFIX}{number:06d}{suffix}"
+        self._segment = open(os.path.join(self.directory, self._segment_name), "ab")
+        return self._segment
+
+    def append(
+        self,
+        url: str,
+        body: str,
+        params: Optional[Dict[str, Any]] = None,
+        fetched_at: Optional[float] = None,
+    ) -> ArchiveEntry:
+        """
+        Store ``body`` as the response for ``url`` (and ``params``).
+        """
+        data = self._compress(body.encode("utf-8"))
+        with self._lock:
+            segment = self._open_segment(len(data))
+            offset = segment.tell()
+            segment.write(data)
+            segment.flush()
+            entry = ArchiveEntry(
+                url=archive_url(url, params),
+                fetched_at=time.time() if fetched_at is None else fetched_at,
+                segment=self._segment_name,
+                offset=offset,
+                length=len(data),
+            )
+            if self._index is None:
+                self._index = open(os.path.join(self.directory, INDEX_FILE), "a", encoding="utf-8")
+            self._index.write(json.dumps(asdict(entry), ensure_ascii=False) + "\n")
+            self._index.flush()
+        return entry
+
+    def entries(self) -> Iterator[ArchiveEntry]:
+        """
+        Every archived response, oldest first.
+        """
+        path = os.path.join(self.directory, INDEX_FILE)
+        if not os.path.exists(path):
+            return
+        for item in iter_json_lines_file(path):
+            yield ArchiveEntry(**item)
+
+    def latest_entries(self) -> List[ArchiveEntry]:
+        """
+        The most recent response for each URL, in the order URLs were first
+        archived.
+        """
+        latest: Dict[str, ArchiveEntry] = {}
+        for entry in self.entries():
+            previous = latest.get(entry.url)
+            if previous is None or entry.fetched_at >= previous.fetched_at:
+                latest[entry.url] = entry
+        return list(latest.values())
+
+    def _map(self, segment: str, end: int) -> mmap.mmap:
+        mapped = self._maps.get(segment)
+        if mapped is None or len(mapped) < end:
+            # Not mapped yet, or the segment has grown since.
+            if mapped is not None:
+                mapped.close()
+            with open(os.path.join(self.directory, segment), "rb") as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = mapped
+        return mapped
+
+    def read(self, entry: ArchiveEntry) -> str:
+        """
+        The body archived for ``entry``.
+        """
+        with self._lock:
+            if self._segment is not None and entry.segment == self._segment_name:
+                self._segment.flush()
+            mapped = self._map(entry.segment, entry.offset + entry.length)
+            data = mapped[entry.offset : entry.offset + entry.length]
+        if _compression_of(entry.segment) == "zstd":
+            if zstandard is None:
+                raise ValueError(f"Reading {entry.segment} needs the zstandard package.")
+            data = zstandard.ZstdDecompressor().decompress(data)
+        else:
+            data = gzip.decompress(data)
+        return data.decode("utf-8")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._segment is not None:
+                self._segment.close()
+                self._segment = None
+            if self._index is not None:
+                self._index.close()
+                self._index = None
+            for mapped in self._maps.values():
+                mapped.close()
+            self._maps.clear()
+            if self._lock_file is not None:
+                self._lock_file.close()
+                self._lock_file = None
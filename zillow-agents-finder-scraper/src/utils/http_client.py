@@ -1,13 +1,36 @@
-thonimport logging
+import logging
 import time
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Mapping, Optional, Tuple
 from urllib.parse import urljoin
 
 import requests
+from requests.adapters import HTTPAdapter
 
-class HttpClient:
+from utils.html_archive import HtmlArchive
+from utils.metrics import Metrics
+from utils.rate_limiter import RateLimiter
+from utils.response_cache import CachedResponse, ResponseCache
+from utils.throttle import THROTTLE_STATUSES, AdaptiveThrottle, parse_retry_after
+
+DEFAULT_HEADERS: Dict[str, str] = {
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en-US,en;q=0.5",
+    "Connection": "keep-alive",
+}
+DEFAULT_USER_AGENT = "Mozilla/5.0 (compatible; ZillowAgentsFinder/1.0; +https://example.com)"
+
+# What to do with a response, as decided by BaseHttpClient._classify.
+RESPONSE_OK = "ok"
+RESPONSE_REVALIDATED = "revalidated"
+RESPONSE_RETRY = "retry"
+RESPONSE_FAILED = "failed"
+
+class BaseHttpClient:
     """
-    Lightweight HTTP client with retry and basic rate limiting support.
+    Request policy shared by :class:`HttpClient` and ``AsyncHttpClient``:
+    default headers, rate limiter and throttle setup, response cache and
+    archive handling, metrics, retry backoff and what each response status
+    means. Subclasses send the requests and do the waiting.
     """
 
     def __init__(
@@ -18,39 +41,259 @@ class HttpClient:
         backoff_factor: int = 1,
         rate_limit_per_minute: int = 60,
         user_agent: Optional[str] = None,
+        rate_limit_burst: int = 1,
+        host_rate_limits: Optional[Dict[str, float]] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[Metrics] = None,
+        throttle: Optional[AdaptiveThrottle] = None,
+        archive: Optional[HtmlArchive] = None,
     ) -> None:
         self.base_url = base_url.rstrip("/")
         self.timeout = timeout
         self.max_retries = max_retries
         self.backoff_factor = backoff_factor
         self.rate_limit_per_minute = rate_limit_per_minute
-        self.session = requests.Session()
 
-        self.default_headers: Dict[str, str] = {
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-            "Connection": "keep-alive",
-        }
-        if user_agent:
-            self.default_headers["User-Agent"] = user_agent
-        else:
-            self.default_headers[
-                "User-Agent"
-            ] = "Mozilla/5.0 (compatible; ZillowAgentsFinder/1.0; +https://example.com)"
-
-        # Used for naïve rate limiting
-        self._last_request_ts: float = 0.0
-
-    def _respect_rate_limit(self) -> None:
-        if not self.rate_limit_per_minute:
+        self.default_headers: Dict[str, str] = dict(DEFAULT_HEADERS)
+        self.default_headers["User-Agent"] = user_agent or DEFAULT_USER_AGENT
+
+        self.rate_limiter = rate_limiter or RateLimiter(
+            rate_limit_per_minute,
+            burst=rate_limit_burst,
+            host_limits=host_rate_limits,
+        )
+        self.cache = cache
+        self.metrics = metrics
+        self.throttle = throttle
+        self.archive = archive
+        if throttle is not None and throttle.rate_limiter is None:
+            throttle.rate_limiter = self.rate_limiter
+
+    def _absolute_url(self, path: str) -> str:
+        return urljoin(self.base_url + "/", path.lstrip("/"))
+
+    def _headers(self, headers: Optional[Dict[str, str]]) -> Dict[str, str]:
+        full_headers = dict(self.default_headers)
+        if headers:
+            full_headers.update(headers)
+        return full_headers
+
+    def _cached_body(
+        self,
+        url: str,
+        cached: CachedResponse,
+        full_headers: Dict[str, str],
+    ) -> Optional[str]:
+        """
+        The body of ``cached`` if it is fresh enough to serve without a
+        request; otherwise None, and ``full_headers`` get its validators.
+        """
+        if self.cache is not None and self.cache.is_fresh(url, cached):
+            logging.debug("Cache hit for %s", url)
+            if self.metrics is not None:
+                self.metrics.increment("http.cache_hits")
+            return cached.body
+        full_headers.update(cached.conditional_headers())
+        return None
+
+    def _start_attempt(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        attempt: int,
+    ) -> float:
+        if attempt > 1 and self.metrics is not None:
+            self.metrics.increment("http.retries")
+        logging.debug(
+            "HTTP %s %s params=%s attempt=%d",
+            method,
+            url,
+            params,
+            attempt,
+        )
+        return time.perf_counter()
+
+    def _record_response(self, started: float, status: int) -> None:
+        if self.metrics is not None:
+            self.metrics.observe("http.request", time.perf_counter() - started)
+            self.metrics.increment(f"http.status.{status}")
+
+    def _record_error(self, started: float, attempt: int, exc: BaseException) -> None:
+        logging.warning("HTTP request failed (attempt %d): %s", attempt, exc or type(exc).__name__)
+        if self.metrics is not None:
+            self.metrics.observe("http.request", time.perf_counter() - started)
+            self.metrics.increment("http.errors")
+
+    def _classify(
+        self,
+        url: str,
+        status: int,
+        reason: Optional[str],
+        headers: Mapping[str, str],
+        attempt: int,
+        revalidating: bool,
+    ) -> Tuple[str, Optional[float]]:
+        """
+        What to do with a response (one of the ``RESPONSE_*`` values) and the
+        ``Retry-After`` delay it asked for, if any.
+        """
+        if 200 <= status < 300:
+            return RESPONSE_OK, None
+        if status == 304 and revalidating:
+            logging.debug("Cached response for %s revalidated", url)
+            return RESPONSE_REVALIDATED, None
+        if status in THROTTLE_STATUSES:
+            logging.warning(
+                "Throttled by %s: %s %s (attempt %d)",
+                url,
+                status,
+                reason,
+                attempt,
+            )
+            return RESPONSE_RETRY, parse_retry_after(headers.get("Retry-After"))
+        if 400 <= status < 500:
+            logging.error(
+                "Client error from %s: %s %s",
+                url,
+                status,
+                reason,
+            )
+            return RESPONSE_FAILED, None
+        logging.warning(
+            "Server error from %s: %s %s (attempt %d)",
+            url,
+            status,
+            reason,
+            attempt,
+        )
+        return RESPONSE_RETRY, None
+
+    def _store(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        body: str,
+        headers: Mapping[str, str],
+    ) -> None:
+        """
+        Archive and cache the body of a successful GET. Blocking file and
+        SQLite I/O.
+        """
+        if method.upper() != "GET":
             return
-        min_interval = 60.0 / float(self.rate_limit_per_minute)
-        now = time.time()
-        elapsed = now - self._last_request_ts
-        if elapsed < min_interval:
-            sleep_for = min_interval - elapsed
-            logging.debug("Rate limiting active, sleeping for %.2f seconds", sleep_for)
-            time.sleep(sleep_for)
+        if self.archive is not None:
+            self.archive.append(url, body, params)
+        if self.cache is not None:
+            self.cache.put(
+                method,
+                url,
+                params,
+                body,
+                etag=headers.get("ETag"),
+                last_modified=headers.get("Last-Modified"),
+            )
+
+    def _release_slot(
+        self,
+        token: Optional[int],
+        status: Optional[int],
+        retry_after: Optional[float],
+    ) -> None:
+        if self.throttle is not None and token is not None:
+            self.throttle.release(token, status, retry_after)
+
+    def _backoff_delay(self, attempt: int, retry_after: Optional[float]) -> Optional[float]:
+        """
+        Seconds to wait before the next attempt; None after the last one.
+        """
+        if attempt >= self.max_retries:
+            return None
+        backoff = self.backoff_factor * (2 ** (attempt - 1))
+        if retry_after is not None:
+            backoff = max(backoff, retry_after)
+        logging.debug("Backing off for %.2f seconds before retry", backoff)
+        if self.metrics is not None:
+            self.metrics.observe("http.backoff", backoff)
+        return backoff
+
+    def _exhausted(self, url: str) -> None:
+        logging.error("Exhausted HTTP retries for %s", url)
+        if self.metrics is not None:
+            self.metrics.increment("http.exhausted")
+
+class HttpClient(BaseHttpClient):
+    """
+    Lightweight HTTP client with retry and basic rate limiting support.
+
+    A single instance may be shared between threads; the rate limit is
+    enforced across all of them. Pass ``rate_limiter`` to share one budget
+    between several clients, and ``cache`` to serve repeated GETs from disk.
+    With ``metrics`` set, request latency, status codes, retries, backoff
+    and rate-limit waits are recorded there.
+
+    429 and 503 responses are retried after at least their ``Retry-After``
+    delay. With a ``throttle``, every request also takes one of its slots,
+    so those responses lower the client's concurrency and rate (shared by
+    all threads) until the server is healthy again.
+
+    With an ``archive``, the body of every successful GET sent over the
+    network is also stored there, so it can be parsed again offline.
+    """
+
+    def __init__(
+        self,
+        base_url: str,
+        timeout: int = 10,
+        max_retries: int = 3,
+        backoff_factor: int = 1,
+        rate_limit_per_minute: int = 60,
+        user_agent: Optional[str] = None,
+        pool_maxsize: int = 10,
+        rate_limit_burst: int = 1,
+        host_rate_limits: Optional[Dict[str, float]] = None,
+        rate_limiter: Optional[RateLimiter] = None,
+        cache: Optional[ResponseCache] = None,
+        metrics: Optional[Metrics] = None,
+        throttle: Optional[AdaptiveThrottle] = None,
+        archive: Optional[HtmlArchive] = None,
+    ) -> None:
+        super().__init__(
+            base_url,
+            timeout=timeout,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            rate_limit_per_minute=rate_limit_per_minute,
+            user_agent=user_agent,
+            rate_limit_burst=rate_limit_burst,
+            host_rate_limits=host_rate_limits,
+            rate_limiter=rate_limiter,
+            cache=cache,
+            metrics=metrics,
+            throttle=throttle,
+            archive=archive,
+        )
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_maxsize, pool_maxsize=pool_maxsize)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    def _respect_rate_limit(self, url: str) -> None:
+        # Slots are reserved when a request starts, so slow responses don't
+        # eat into the budget.
+        waited = self.rate_limiter.acquire(url)
+        if waited > 0 and self.metrics is not None:
+            self.metrics.observe("rate_limit.wait", waited)
+
+    def _acquire_slot(self) -> Optional[int]:
+        if self.throttle is None:
+            return None
+        token, waited = self.throttle.acquire()
+        if waited > 0 and self.metrics is not None:
+            self.metrics.observe("throttle.wait", waited)
+        return token
 
     def _request(
         self,
@@ -59,20 +302,23 @@ class HttpClient:
         params: Optional[Dict[str, Any]] = None,
         headers: Optional[Dict[str, str]] = None,
     ) -> Optional[str]:
-        full_headers = dict(self.default_headers)
-        if headers:
-            full_headers.update(headers or {})
+        full_headers = self._headers(headers)
+
+        cached = None
+        if self.cache is not None and method.upper() == "GET":
+            cached = self.cache.get(method, url, params)
+            if cached is not None:
+                body = self._cached_body(url, cached, full_headers)
+                if body is not None:
+                    return body
 
         for attempt in range(1, self.max_retries + 1):
-            self._respect_rate_limit()
+            token = self._acquire_slot()
+            status: Optional[int] = None
+            retry_after: Optional[float] = None
             try:
-                logging.debug(
-                    "HTTP %s %s params=%s attempt=%d",
-                    method,
-                    url,
-                    params,
-                    attempt,
-                )
+                self._respect_rate_limit(url)
+                started = self._start_attempt(method, url, params, attempt)
                 resp = self.session.request(
                     method=method.upper(),
                     url=url,
@@ -80,36 +326,29 @@ class HttpClient:
                     headers=full_headers,
                     timeout=self.timeout,
                 )
-                self._last_request_ts = time.time()
-
-                if 200 <= resp.status_code < 300:
+                status = resp.status_code
+                self._record_response(started, status)
+                action, retry_after = self._classify(
+                    url, status, resp.reason, resp.headers, attempt, cached is not None
+                )
+                if action == RESPONSE_OK:
+                    self._store(method, url, params, resp.text, resp.headers)
                     return resp.text
-
-                if 400 <= resp.status_code < 500:
-                    logging.error(
-                        "Client error from %s: %s %s",
-                        url,
-                        resp.status_code,
-                        resp.reason,
-                    )
+                if action == RESPONSE_REVALIDATED:
+                    self.cache.mark_revalidated(method, url, params)
+                    return cached.body
+                if action == RESPONSE_FAILED:
                     return None
-
-                logging.warning(
-                    "Server error from %s: %s %s (attempt %d)",
-                    url,
-                    resp.status_code,
-                    resp.reason,
-                    attempt,
-                )
             except requests.RequestException as exc:  # noqa: BLE001
-                logging.warning("HTTP request failed (attempt %d): %s", attempt, exc)
+                self._record_error(started, attempt, exc)
+            finally:
+                self._release_slot(token, status, retry_after)
 
-            if attempt < self.max_retries:
-                backoff = self.backoff_factor * (2 ** (attempt - 1))
-                logging.debug("Backing off for %.2f seconds before retry", backoff)
-                time.sleep(backoff)
+            delay = self._backoff_delay(attempt, retry_after)
+            if delay is not None:
+                time.sleep(delay)
 
-        logging.error("Exhausted HTTP retries for %s", url)
+        self._exhausted(url)
         return None
 
     def get(
@@ -121,8 +360,7 @@ class HttpClient:
         """
         Perform an HTTP GET relative to the configured base_url.
         """
-        url = urljoin(self.base_url + "/", path.lstrip("/"))
-        return self._request("GET", url, params=params, headers=headers)
+        return self._request("GET", self._absolute_url(path), params=params, headers=headers)
 
     def get_url(
         self,
@@ -133,4 +371,4 @@ class HttpClient:
         """
         Perform an HTTP GET to an absolute URL.
         """
-        return self._request("GET", url, params=params, headers=headers)
\ No newline at end of file
+        return self._request("GET", url, params=params, headers=headers)
@@ -0,0 +1,179 @@
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+# Upper bounds (milliseconds) of the latency histogram buckets.
+DEFAULT_BUCKETS_MS: Tuple[float, ...] = (
+    1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000,
+)
+
+class Histogram:
+    """
+    Fixed-bucket latency histogram. Percentiles are estimated as the upper
+    bound of the bucket the rank falls into (the exact maximum for the
+    overflow bucket).
+    """
+
+    def __init__(self, buckets_ms: Tuple[float, ...] = DEFAULT_BUCKETS_MS) -> None:
+        self.buckets_ms = buckets_ms
+        self.counts: List[int] = [0] * (len(buckets_ms) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.min: Optional[float] = None
+        self.max = 0.0
+
+    def observe(self, seconds: float) -> None:
+        ms = seconds * 1000
+        index = len(self.buckets_ms)
+        for i, bound in enumerate(self.buckets_ms):
+            if ms <= bound:
+                index = i
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+        self.min = seconds if self.min is None else min(self.min, seconds)
+
+    def percentile(self, pct: float) -> float:
+        """
+        Estimated ``pct`` percentile in seconds.
+        """
+        if not self.count:
+            return 0.0
+        rank = pct / 100.0 * self.count
+        seen = 0
+        for i, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                if i == len(self.buckets_ms):
+                    return self.max
+                return min(self.buckets_ms[i] / 1000, self.max)
+        return self.max
+
+    def to_dict(self) -> Dict[str, Any]:
+        labels = [f"le_{bound:g}ms" for bound in self.buckets_ms] + ["overflow"]
+        return {
+            "count": self.count,
+            "totalSeconds": round(self.total, 6),
+            "meanMs": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "minMs": round((self.min or 0.0) * 1000, 3),
+            "maxMs": round(self.max * 1000, 3),
+            "p50Ms": round(self.percentile(50) * 1000, 3),
+            "p90Ms": round(self.percentile(90) * 1000, 3),
+            "p99Ms": round(self.percentile(99) * 1000, 3),
+            "buckets": {label: n for label, n in zip(labels, self.counts) if n},
+        }
+
+class Metrics:
+    """
+    Thread-safe run-wide counters and latency histograms.
+
+    Counters are plain totals (``increment``); timers record durations into a
+    :class:`Histogram` (``observe`` or the ``time`` context manager). The
+    ``agents`` counter also drives the agents-per-second rate in snapshots.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic) -> None:
+        self._clock = clock
+        self.started_at = clock()
+        self.counters: Dict[str, float] = {}
+        self.timers: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.timers.get(name)
+            if histogram is None:
+                histogram = self.timers[name] = Histogram()
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            elapsed = self._clock() - self.started_at
+            counters = dict(sorted(self.counters.items()))
+            timers = {name: h.to_dict() for name, h in sorted(self.timers.items())}
+        agents = counters.get("agents", 0)
+        return {
+            "elapsedSeconds": round(elapsed, 3),
+            "agentsPerSecond": round(agents / elapsed, 3) if elapsed > 0 else 0.0,
+            "counters": counters,
+            "timers": timers,
+        }
+
+    def format_summary(self) -> str:
+        snap = self.snapshot()
+        lines = [
+            f"Run metrics after {snap['elapsedSeconds']:.1f}s "
+            f"({snap['agentsPerSecond']:.2f} agents/s):"
+        ]
+        for name, value in snap["counters"].items():
+            lines.append(f"  {name:<28} {value:>10g}")
+        if snap["timers"]:
+            lines.append(
+                f"  {'timer':<28} {'count':>8} {'total s':>9} {'p50 ms':>9}"
+                f" {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}"
+            )
+        for name, stats in snap["timers"].items():
+            lines.append(
+                f"  {name:<28} {stats['count']:>8} {stats['totalSeconds']:>9.2f}"
+                f" {stats['p50Ms']:>9.1f} {stats['p90Ms']:>9.1f}"
+                f" {stats['p99Ms']:>9.1f} {stats['maxMs']:>9.1f}"
+            )
+        return "\n".join(lines)
+
+class MetricsFileReporter:
+    """
+    Background thread that rewrites ``path`` with a JSON snapshot of
+    ``metrics`` every ``interval`` seconds, and once more on ``close``.
+    The file is replaced atomically so readers never see a partial write.
+    """
+
+    def __init__(self, metrics: Metrics, path: str, interval: float = 30.0) -> None:
+        self.metrics = metrics
+        self.path = path
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics-reporter", daemon=True)
+
+    def start(self) -> "MetricsFileReporter":
+        dir_name = os.path.dirname(self.path)
+        if dir_name:
+            os.makedirs(dir_name, exist_ok=True)
+        self._thread.start()
+        return self
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.write()
+
+    def write(self) -> None:
+        tmp_path = f"{self.path}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.metrics.snapshot(), f, indent=2)
+            os.replace(tmp_path, self.path)
+        except OSError as exc:
+            logging.warning("Could not write metrics file %s: %s", self.path, exc)
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.write()
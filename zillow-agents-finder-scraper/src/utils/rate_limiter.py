@@ -0,0 +1,143 @@
+import asyncio
+import logging
+import threading
+import time
+from typing import Callable, Dict, Optional
+from urllib.parse import urlparse
+
+class TokenBucket:
+    """
+    Token bucket refilled at ``rate_per_minute`` with room for ``burst`` tokens.
+
+    Callers reserve a token up front and are told how long to wait for it, so
+    the bucket can be shared by threads and coroutines alike: the reservation
+    is atomic and the waiting happens outside the lock.
+    """
+
+    def __init__(
+        self,
+        rate_per_minute: float,
+        burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        self.rate_per_second = float(rate_per_minute) / 60.0
+        self.capacity = float(max(1, burst))
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        # Called with the lock held.
+        now = self._clock()
+        elapsed = max(0.0, now - self._updated)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_second)
+        self._updated = now
+
+    def set_rate(self, rate_per_minute: float) -> None:
+        """
+        Change the refill rate; tokens accrued so far keep the old rate.
+        """
+        if rate_per_minute <= 0:
+            raise ValueError("rate_per_minute must be positive")
+        with self._lock:
+            self._refill()
+            self.rate_per_second = float(rate_per_minute) / 60.0
+
+    def reserve(self, tokens: float = 1.0) -> float:
+        """
+        Take ``tokens`` from the bucket and return the seconds to wait before
+        they are actually available. The balance may go negative; later
+        callers then queue up behind the outstanding debt.
+        """
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            if self._tokens >= 0:
+                return 0.0
+            return -self._tokens / self.rate_per_second
+
+class RateLimiter:
+    """
+    Per-host request budgets backed by token buckets.
+
+    Every host gets its own bucket at ``rate_limit_per_minute`` unless it is
+    listed in ``host_limits`` (host -> requests per minute). A falsy rate
+    disables limiting for that host. ``set_rate_fraction`` scales every
+    host's rate down (e.g. while the server is throttling us) and back up.
+    """
+
+    def __init__(
+        self,
+        rate_limit_per_minute: Optional[float],
+        burst: int = 1,
+        host_limits: Optional[Dict[str, float]] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.rate_limit_per_minute = rate_limit_per_minute
+        self.burst = burst
+        self.host_limits = {host.lower(): rate for host, rate in (host_limits or {}).items()}
+        self._clock = clock
+        self.rate_fraction = 1.0
+        self._buckets: Dict[str, Optional[TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    def _host_rate(self, host: str) -> Optional[float]:
+        return self.host_limits.get(host, self.rate_limit_per_minute)
+
+    def _bucket_for(self, url: str) -> Optional[TokenBucket]:
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            if host not in self._buckets:
+                rate = self._host_rate(host)
+                self._buckets[host] = (
+                    TokenBucket(rate * self.rate_fraction, burst=self.burst, clock=self._clock)
+                    if rate
+                    else None
+                )
+            return self._buckets[host]
+
+    def set_rate_fraction(self, fraction: float) -> None:
+        """
+        Run every host at ``fraction`` (0 < fraction <= 1) of its configured rate.
+        """
+        if not 0 < fraction <= 1:
+            raise ValueError("fraction must be in (0, 1]")
+        with self._lock:
+            self.rate_fraction = fraction
+            for host, bucket in self._buckets.items():
+                if bucket is not None:
+                    bucket.set_rate(self._host_rate(host) * fraction)
+
+    def reserve(self, url: str) -> float:
+        """
+        Reserve a request slot for ``url``'s host and return the delay before
+        the request may be sent.
+        """
+        bucket = self._bucket_for(url)
+        if bucket is None:
+            return 0.0
+        return bucket.reserve()
+
+    def acquire(self, url: str) -> float:
+        """
+        Block the calling thread until a request to ``url`` is allowed.
+        Returns the time spent waiting.
+        """
+        wait = self.reserve(url)
+        if wait > 0:
+            logging.debug("Rate limiting active, sleeping for %.2f seconds", wait)
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, url: str) -> float:
+        """
+        Coroutine counterpart of :meth:`acquire` that sleeps on the event loop.
+        """
+        wait = self.reserve(url)
+        if wait > 0:
+            logging.debug("Rate limiting active, sleeping for %.2f seconds", wait)
+            await asyncio.sleep(wait)
+        return wait
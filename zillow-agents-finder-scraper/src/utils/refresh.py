@@ -0,0 +1,197 @@
+import datetime
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from utils.agent_cache import normalize_profile_url
+from utils.agent_record import AgentRecord
+from utils.helpers import chain_future, completed_future, ensure_dir_for_file, load_json_file
+from utils.writers import iter_output_agents
+from extractors.zillow_parser import SearchPage
+
+STATE_SUFFIX = ".state.json"
+
+def content_fingerprint(html: str) -> str:
+    return hashlib.sha1(html.encode("utf-8")).hexdigest()
+
+def _format_time(timestamp: float) -> str:
+    moment = datetime.datetime.fromtimestamp(timestamp, tz=datetime.timezone.utc)
+    return moment.isoformat(timespec="seconds")
+
+def _parse_time(value: Any) -> Optional[float]:
+    if not isinstance(value, str):
+        return None
+    try:
+        moment = datetime.datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.timestamp()
+
+def load_agents_file(path: str) -> List[AgentRecord]:
+    """
+    Read the agents of a previous run's output, in any output format.
+    """
+    return [
+        AgentRecord.from_dict(item) for item in iter_output_agents(path) if isinstance(item, dict)
+    ]
+
+class RefreshState:
+    """
+    Per-profile ``lastFetched`` time and content fingerprint, plus the agent
+    records of the previous run, for incremental refreshes.
+
+    Agents fetched less than ``max_age_seconds`` ago are reused without a
+    request (see ``fresh_agents``). Older ones are fetched again, but when
+    the page's fingerprint matches the previous one the old record is reused
+    instead of parsing the page (see ``RefreshingParser``). Profiles are
+    keyed by normalized profile URL. Only the time and fingerprint of newly
+    fetched profiles are kept, not their records.
+    """
+
+    def __init__(
+        self,
+        max_age_seconds: float = 86400,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.max_age_seconds = max_age_seconds
+        self._clock = clock
+        self._agents: Dict[str, AgentRecord] = {}
+        self._entries: Dict[str, Tuple[float, Optional[str]]] = {}
+        self._lock = threading.Lock()
+        self.fetched = 0
+        self.unchanged = 0
+
+    @classmethod
+    def load(
+        cls,
+        previous_output: str,
+        state_path: Optional[str] = None,
+        max_age_seconds: float = 86400,
+    ) -> "RefreshState":
+        """
+        Load the previous output and its state file (default:
+        ``<previous_output>.state.json``). Agents without a state entry are
+        treated as stale and fetched again.
+        """
+        state = cls(max_age_seconds=max_age_seconds)
+        for agent in load_agents_file(previous_output):
+            if agent.profile_url:
+                state._agents[normalize_profile_url(agent.profile_url)] = agent
+
+        state_path = state_path or previous_output + STATE_SUFFIX
+        if os.path.exists(state_path):
+            data = load_json_file(state_path)
+            profiles = data.get("profiles", {}) if isinstance(data, dict) else {}
+            for url, entry in profiles.items():
+                fetched_at = _parse_time(entry.get("lastFetched")) if isinstance(entry, dict) else None
+                if fetched_at is not None:
+                    state._entries[url] = (fetched_at, entry.get("contentHash"))
+        else:
+            logging.warning("No refresh state at %s; every previous agent is treated as stale.", state_path)
+
+        logging.info(
+            "Loaded %d previous agents from %s (%d with fetch times).",
+            len(state._agents),
+            previous_output,
+            len(state._entries),
+        )
+        return state
+
+    def fresh_agents(self) -> Iterator[Tuple[str, AgentRecord]]:
+        """
+        Previous agents fetched within the freshness window.
+        """
+        now = self._clock()
+        with self._lock:
+            items = list(self._agents.items())
+            entries = dict(self._entries)
+        for key, agent in items:
+            entry = entries.get(key)
+            if entry is not None and now - entry[0] < self.max_age_seconds:
+                yield key, agent
+
+    def reuse_if_unchanged(self, url: str, html: str) -> Tuple[Optional[AgentRecord], str]:
+        """
+        Return the previous record for ``url`` if ``html`` has the same
+        fingerprint as last time (else None), and the new fingerprint.
+        """
+        key = normalize_profile_url(url)
+        fingerprint = content_fingerprint(html)
+        with self._lock:
+            self.fetched += 1
+            entry = self._entries.get(key)
+            agent = self._agents.get(key)
+            if entry is not None and entry[1] == fingerprint and agent is not None:
+                self.unchanged += 1
+                self._entries[key] = (self._clock(), fingerprint)
+                return agent, fingerprint
+        return None, fingerprint
+
+    def record(self, url: str, fingerprint: str) -> None:
+        key = normalize_profile_url(url)
+        with self._lock:
+            self._entries[key] = (self._clock(), fingerprint)
+
+    def save(self, path: str) -> None:
+        """
+        Write the fetch times and fingerprints atomically to ``path``.
+        """
+        with self._lock:
+            profiles = {
+                url: {"lastFetched": _format_time(fetched_at), "contentHash": fingerprint}
+                for url, (fetched_at, fingerprint) in sorted(self._entries.items())
+            }
+        ensure_dir_for_file(path)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"profiles": profiles}, f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+class RefreshingParser:
+    """
+    Wraps a parser so profile pages whose content is unchanged since the
+    previous run return the previous record without being parsed; all
+    other calls go straight to the wrapped parser.
+    """
+
+    def __init__(self, parser: Any, state: RefreshState) -> None:
+        self.parser = parser
+        self.state = state
+        self.max_pending = parser.max_pending
+
+    def parse_search_results(self, html: str, limit: Optional[int] = None) -> List[AgentRecord]:
+        return self.parser.parse_search_results(html, limit=limit)
+
+    def parse_search_page(self, html: str, limit: Optional[int] = None) -> SearchPage:
+        return self.parser.parse_search_page(html, limit=limit)
+
+    def submit_agent_profile(
+        self,
+        html: str,
+        profile_url: Optional[str] = None,
+    ) -> "Future[AgentRecord]":
+        if not profile_url:
+            return self.parser.submit_agent_profile(html, profile_url=profile_url)
+        previous, fingerprint = self.state.reuse_if_unchanged(profile_url, html)
+        if previous is not None:
+            logging.debug("Profile %s unchanged since last fetch, reusing record.", profile_url)
+            return completed_future(previous)
+
+        def record(agent: AgentRecord) -> AgentRecord:
+            self.state.record(profile_url, fingerprint)
+            return agent
+
+        return chain_future(self.parser.submit_agent_profile(html, profile_url=profile_url), record)
+
+    def parse_agent_profile(self, html: str, profile_url: Optional[str] = None) -> AgentRecord:
+        return self.submit_agent_profile(html, profile_url=profile_url).result()
+
+    def close(self) -> None:
+        self.parser.close()
@@ -0,0 +1,189 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+from urllib.parse import urlparse
+
+from utils.helpers import ensure_dir_for_file
+
+@dataclass
+class CachedResponse:
+    """
+    A response body stored in the cache together with its validators.
+    """
+
+    body: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched_at: float
+
+    def conditional_headers(self) -> Dict[str, str]:
+        headers: Dict[str, str] = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+class ResponseCache:
+    """
+    Persistent HTTP response cache stored in a single SQLite file.
+
+    Entries are keyed by method, URL and query params. An entry younger than
+    its TTL is served without touching the network; an older one is kept so
+    it can be revalidated with ETag / Last-Modified. When the stored bodies
+    exceed ``max_size_bytes`` the least recently used entries are evicted.
+
+    ``path_ttls`` maps URL path prefixes (e.g. ``"/profile/"``) to TTLs that
+    override ``ttl_seconds``. The cache is safe to share between threads.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl_seconds: float = 86400,
+        max_size_bytes: Optional[int] = None,
+        path_ttls: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_size_bytes = max_size_bytes
+        self.path_ttls = dict(path_ttls or {})
+        self._lock = threading.Lock()
+
+        ensure_dir_for_file(path)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                body TEXT NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                fetched_at REAL NOT NULL,
+                last_access REAL NOT NULL,
+                size INTEGER NOT NULL
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)"
+        )
+        self._conn.commit()
+        row = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()
+        self._total_size: int = row[0]
+        with self._lock:
+            self._evict_locked()
+            self._conn.commit()
+
+    @staticmethod
+    def make_key(method: str, url: str, params: Optional[Dict[str, Any]] = None) -> str:
+        encoded_params = json.dumps(params or {}, sort_keys=True, default=str)
+        raw = f"{method.upper()} {url} {encoded_params}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def ttl_for(self, url: str) -> float:
+        path = urlparse(url).path
+        best_prefix = ""
+        ttl = self.ttl_seconds
+        for prefix, prefix_ttl in self.path_ttls.items():
+            if path.startswith(prefix) and len(prefix) > len(best_prefix):
+                best_prefix, ttl = prefix, prefix_ttl
+        return ttl
+
+    def is_fresh(self, url: str, entry: CachedResponse) -> bool:
+        return time.time() - entry.fetched_at < self.ttl_for(url)
+
+    def get(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> Optional[CachedResponse]:
+        key = self.make_key(method, url, params)
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body, etag, last_modified, fetched_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (time.time(), key)
+            )
+            self._conn.commit()
+        return CachedResponse(body=row[0], etag=row[1], last_modified=row[2], fetched_at=row[3])
+
+    def put(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]],
+        body: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        key = self.make_key(method, url, params)
+        size = len(body.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            old = self._conn.execute(
+                "SELECT size FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            self._conn.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                    (key, url, body, etag, last_modified, fetched_at, last_access, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, url, body, etag, last_modified, now, now, size),
+            )
+            self._total_size += size - (old[0] if old else 0)
+            self._evict_locked()
+            self._conn.commit()
+
+    def mark_revalidated(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Restart the TTL of an entry after the server answered 304 Not Modified.
+        """
+        key = self.make_key(method, url, params)
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET fetched_at = ?, last_access = ? WHERE key = ?",
+                (now, now, key),
+            )
+            self._conn.commit()
+
+    def _evict_locked(self) -> None:
+        if self.max_size_bytes is None or self._total_size <= self.max_size_bytes:
+            return
+        evicted = 0
+        while self._total_size > self.max_size_bytes:
+            rows = self._conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_access ASC LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for key, size in rows:
+                if self._total_size <= self.max_size_bytes:
+                    break
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._total_size -= size
+                evicted += 1
+        logging.debug("Evicted %d cached responses to stay under %d bytes", evicted, self.max_size_bytes)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,219 @@
+import asyncio
+import datetime
+import email.utils
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Optional, Tuple
+
+from utils.metrics import Metrics
+from utils.rate_limiter import RateLimiter
+
+# Statuses that mean "slow down" rather than "this request is broken".
+THROTTLE_STATUSES = (429, 503)
+MAX_RETRY_AFTER_SECONDS = 600.0
+
+def parse_retry_after(value: Optional[str], now: Optional[float] = None) -> Optional[float]:
+    """
+    Seconds to wait according to a ``Retry-After`` header (delay in seconds
+    or an HTTP date), capped at ``MAX_RETRY_AFTER_SECONDS``; None if the
+    header is missing or unparseable.
+    """
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            moment = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        if moment.tzinfo is None:
+            moment = moment.replace(tzinfo=datetime.timezone.utc)
+        seconds = moment.timestamp() - (time.time() if now is None else now)
+    if seconds != seconds:  # NaN
+        return None
+    return min(max(0.0, seconds), MAX_RETRY_AFTER_SECONDS)
+
+class AdaptiveThrottle:
+    """
+    AIMD controller for the concurrency and request rate of an HTTP client.
+
+    Every request takes a slot with ``acquire`` (or ``acquire_async``) and
+    gives it back with ``release``, passing the response status. A 429 or
+    503 halves the number of concurrent requests allowed and the rate of the
+    attached ``RateLimiter`` (down to ``min_concurrency`` and
+    ``min_rate_fraction`` of the configured rate), and a ``Retry-After``
+    pauses every request until it has passed. Responses to requests sent
+    before a decrease don't decrease again, so one burst of 429s counts once.
+    Each healthy response then adds back about one slot per window of
+    ``limit`` responses and ``rate_step`` of the configured rate, never going
+    above ``max_concurrency`` or the configured rate.
+
+    Safe to share between threads; coroutines on any event loop can wait
+    for slots too.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int,
+        min_concurrency: int = 1,
+        min_rate_fraction: float = 0.1,
+        rate_step: float = 0.02,
+        decrease_factor: float = 0.5,
+        rate_limiter: Optional[RateLimiter] = None,
+        metrics: Optional[Metrics] = None,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1")
+        if not 0 < min_rate_fraction <= 1:
+            raise ValueError("min_rate_fraction must be in (0, 1]")
+        if not 0 < decrease_factor < 1:
+            raise ValueError("decrease_factor must be in (0, 1)")
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = max(1, min(min_concurrency, max_concurrency))
+        self.min_rate_fraction = min_rate_fraction
+        self.rate_step = rate_step
+        self.decrease_factor = decrease_factor
+        self.rate_limiter = rate_limiter
+        self.metrics = metrics
+        self._clock = clock
+
+        self._window = float(max_concurrency)
+        self.rate_fraction = 1.0
+        self._in_flight = 0
+        self._epoch = 0
+        self._paused_until = 0.0
+        self._cond = threading.Condition()
+        self._async_waiters: Deque[Tuple[asyncio.AbstractEventLoop, "asyncio.Future[None]"]] = deque()
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_concurrency, int(self._window))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def _try_take(self) -> Tuple[bool, float]:
+        # Called with the lock held: (slot taken, seconds left in a pause).
+        pause = self._paused_until - self._clock()
+        if pause > 0:
+            return False, pause
+        if self._in_flight < self.limit:
+            self._in_flight += 1
+            return True, 0.0
+        return False, 0.0
+
+    def acquire(self) -> Tuple[int, float]:
+        """
+        Block until a request may start. Returns the token to pass to
+        ``release`` and the seconds spent waiting.
+        """
+        started = self._clock()
+        with self._cond:
+            while True:
+                taken, pause = self._try_take()
+                if taken:
+                    return self._epoch, self._clock() - started
+                self._cond.wait(timeout=pause if pause > 0 else None)
+
+    async def acquire_async(self) -> Tuple[int, float]:
+        """
+        Coroutine counterpart of :meth:`acquire`.
+        """
+        loop = asyncio.get_running_loop()
+        started = self._clock()
+        while True:
+            waiter: Optional["asyncio.Future[None]"] = None
+            with self._cond:
+                taken, pause = self._try_take()
+                if taken:
+                    return self._epoch, self._clock() - started
+                if pause <= 0:
+                    waiter = loop.create_future()
+                    self._async_waiters.append((loop, waiter))
+            if waiter is None:
+                await asyncio.sleep(pause)
+                continue
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # Pass on the wakeup this waiter can no longer use.
+                    with self._cond:
+                        self._wake_async_waiter()
+                raise
+
+    def _wake_async_waiter(self) -> None:
+        # Called with the lock held.
+        while self._async_waiters:
+            loop, waiter = self._async_waiters.popleft()
+            if waiter.done():
+                continue
+            try:
+                loop.call_soon_threadsafe(_resolve, waiter)
+            except RuntimeError:  # loop already closed
+                continue
+            return
+
+    def _notify(self, slots: int) -> None:
+        # Called with the lock held.
+        self._cond.notify(slots)
+        for _ in range(slots):
+            self._wake_async_waiter()
+
+    def release(
+        self,
+        token: int,
+        status: Optional[int] = None,
+        retry_after: Optional[float] = None,
+    ) -> None:
+        """
+        Return a slot taken by ``acquire``. ``status`` is the response status
+        (None if the request failed without one) and ``retry_after`` the
+        parsed ``Retry-After`` delay, if any.
+        """
+        with self._cond:
+            self._in_flight -= 1
+            old_limit = self.limit
+            if status in THROTTLE_STATUSES:
+                self._throttled(token, status, retry_after)
+            elif status is not None and (200 <= status < 400):
+                self._window = min(float(self.max_concurrency), self._window + 1.0 / self._window)
+                if self.rate_fraction < 1.0:
+                    self._set_rate_fraction(min(1.0, self.rate_fraction + self.rate_step))
+            self._notify(1 + max(0, self.limit - old_limit))
+
+    def _throttled(self, token: int, status: int, retry_after: Optional[float]) -> None:
+        # Called with the lock held.
+        now = self._clock()
+        if retry_after:
+            self._paused_until = max(self._paused_until, now + retry_after)
+        if token != self._epoch:
+            return
+        self._epoch += 1
+        self._window = max(float(self.min_concurrency), self._window * self.decrease_factor)
+        self._set_rate_fraction(max(self.min_rate_fraction, self.rate_fraction * self.decrease_factor))
+        if self.metrics is not None:
+            self.metrics.increment("throttle.decreases")
+        logging.warning(
+            "Server answered %d; slowing down to %d concurrent requests and %.0f%% of the "
+            "configured request rate%s.",
+            status,
+            self.limit,
+            self.rate_fraction * 100,
+            f", pausing {retry_after:.1f} s" if retry_after else "",
+        )
+
+    def _set_rate_fraction(self, fraction: float) -> None:
+        self.rate_fraction = fraction
+        if self.rate_limiter is not None:
+            self.rate_limiter.set_rate_fraction(fraction)
+
+def _resolve(waiter: "asyncio.Future[None]") -> None:
+    if not waiter.done():
+        waiter.set_result(None)
@@ -0,0 +1,252 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence
+
+from utils.agent_cache import normalize_profile_url
+from utils.agent_record import AgentRecord, agent_json_default
+from utils.helpers import ensure_dir_for_file
+
+@dataclass
+class WorkBatch:
+    """
+    A run of consecutive queries leased to one worker. ``first_index`` is
+    the input position (1-based) of the first query.
+    """
+
+    id: int
+    first_index: int
+    queries: List[Dict[str, Any]]
+
+class WorkQueue:
+    """
+    Work queue shared by several scraper nodes, stored in a single SQLite
+    file (on a local disk for one machine, or a shared volume).
+
+    A coordinator ``enqueue``s the input as batches of queries and
+    ``seal``s the queue. Workers ``claim`` a batch, which leases it for
+    ``lease_seconds``, keep the lease alive with ``heartbeat`` and hand the
+    agents back with ``complete``. A batch whose lease runs out (its worker
+    died) is handed to the next worker that asks. ``iter_merged_agents``
+    reads the results back in input order, de-duplicated by profile URL.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        lease_seconds: float = 600,
+        clock: Callable[[], float] = time.time,
+    ) -> None:
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        ensure_dir_for_file(path)
+        # Transactions are explicit; other nodes wait up to 30 s for a write lock.
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        with self._transaction():
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS batches (
+                    id INTEGER PRIMARY KEY,
+                    first_index INTEGER NOT NULL,
+                    size INTEGER NOT NULL,
+                    queries TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    worker TEXT,
+                    lease_expires REAL,
+                    attempts INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS results (
+                    query_index INTEGER NOT NULL,
+                    position INTEGER NOT NULL,
+                    batch_id INTEGER NOT NULL,
+                    profile_url TEXT,
+                    agent TEXT NOT NULL,
+                    PRIMARY KEY (query_index, position)
+                )
+                """
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS results_batch ON results (batch_id)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def enqueue(self, queries: Iterable[Dict[str, Any]], batch_size: int = 10) -> int:
+        """
+        Append ``queries`` as batches of ``batch_size`` and return the number
+        of queries added. Queries are numbered after those already queued.
+        """
+        if batch_size < 1:
+            raise ValueError("batch_size must be at least 1")
+        added = 0
+        batch: List[Dict[str, Any]] = []
+
+        def flush() -> None:
+            with self._transaction():
+                row = self._conn.execute(
+                    "SELECT COALESCE(MAX(first_index + size), 1) FROM batches"
+                ).fetchone()
+                self._conn.execute(
+                    "INSERT INTO batches (first_index, size, queries) VALUES (?, ?, ?)",
+                    (row[0], len(batch), json.dumps(batch, ensure_ascii=False)),
+                )
+            batch.clear()
+
+        for query in queries:
+            batch.append(query)
+            added += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        return added
+
+    def seal(self) -> None:
+        """
+        Mark the input as complete: workers that find nothing left to claim
+        stop once every batch is done instead of waiting for more.
+        """
+        with self._transaction():
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('sealed', '1')")
+
+    def is_sealed(self) -> bool:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = 'sealed'").fetchone()
+        return row is not None
+
+    def claim(self, worker: str) -> Optional[WorkBatch]:
+        """
+        Lease the oldest pending (or abandoned) batch to ``worker``; None if
+        there is none right now.
+        """
+        now = self._clock()
+        with self._transaction():
+            row = self._conn.execute(
+                """
+                SELECT id, first_index, queries, attempts FROM batches
+                WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?)
+                ORDER BY id LIMIT 1
+                """,
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            batch_id, first_index, queries, attempts = row
+            self._conn.execute(
+                """
+                UPDATE batches
+                SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1
+                WHERE id = ?
+                """,
+                (worker, now + self.lease_seconds, batch_id),
+            )
+        if attempts:
+            logging.warning("Batch %d was abandoned by its worker, taking it over.", batch_id)
+        return WorkBatch(id=batch_id, first_index=first_index, queries=json.loads(queries))
+
+    def heartbeat(self, worker: str) -> None:
+        """
+        Extend the leases of every batch ``worker`` is working on.
+        """
+        with self._transaction():
+            self._conn.execute(
+                "UPDATE batches SET lease_expires = ? WHERE status = 'leased' AND worker = ?",
+                (self._clock() + self.lease_seconds, worker),
+            )
+
+    def complete(
+        self,
+        batch: WorkBatch,
+        results: Sequence[Sequence[Mapping[str, Any]]],
+    ) -> bool:
+        """
+        Store the agents of each query in ``batch`` (``results[i]`` for
+        ``batch.queries[i]``) and mark it done. Returns False, storing
+        nothing, if another worker already completed the batch.
+        """
+        with self._transaction():
+            row = self._conn.execute(
+                "SELECT status FROM batches WHERE id = ?", (batch.id,)
+            ).fetchone()
+            if row is None or row[0] == "done":
+                return False
+            self._conn.execute("DELETE FROM results WHERE batch_id = ?", (batch.id,))
+            self._conn.executemany(
+                """
+                INSERT INTO results (query_index, position, batch_id, profile_url, agent)
+                VALUES (?, ?, ?, ?, ?)
+                """,
+                (
+                    (
+                        batch.first_index + offset,
+                        position,
+                        batch.id,
+                        agent.get("profileUrl"),
+                        json.dumps(agent, ensure_ascii=False, default=agent_json_default),
+                    )
+                    for offset, agents in enumerate(results)
+                    for position, agent in enumerate(agents)
+                ),
+            )
+            self._conn.execute(
+                "UPDATE batches SET status = 'done', lease_expires = NULL WHERE id = ?",
+                (batch.id,),
+            )
+        return True
+
+    def counts(self) -> Dict[str, int]:
+        """
+        Number of batches per status (pending, leased, done).
+        """
+        counts = {"pending": 0, "leased": 0, "done": 0}
+        for status, count in self._conn.execute(
+            "SELECT status, COUNT(*) FROM batches GROUP BY status"
+        ):
+            counts[status] = count
+        return counts
+
+    def is_finished(self) -> bool:
+        counts = self.counts()
+        return self.is_sealed() and counts["pending"] == 0 and counts["leased"] == 0
+
+    def iter_merged_agents(self) -> Iterator[AgentRecord]:
+        """
+        Every stored agent in input order, keeping only the first agent seen
+        for each profile URL. Agents without a profile URL are all kept.
+        """
+        seen = set()
+        rows = self._conn.execute(
+            "SELECT profile_url, agent FROM results ORDER BY query_index, position"
+        )
+        for profile_url, agent in rows:
+            if profile_url:
+                key = normalize_profile_url(profile_url)
+                if key in seen:
+                    continue
+                seen.add(key)
+            yield AgentRecord.from_dict(json.loads(agent))
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,364 @@
+import csv
+import json
+import os
+import time
+from typing import Any, Dict, Iterator, List, Mapping, Optional, TextIO
+
+try:
+    import pyarrow
+    import pyarrow.ipc
+    import pyarrow.parquet
+except ImportError:  # Optional dependency, only needed for the parquet and arrow formats.
+    pyarrow = None
+
+from utils.agent_record import AGENT_FIELDS, AgentRecord, agent_json_default
+from utils.helpers import (
+    ensure_dir_for_file,
+    iter_json_lines_file,
+    load_json_file,
+    try_float,
+    try_int,
+)
+
+JSON_LINES_EXTENSIONS = (".jsonl", ".ndjson")
+OUTPUT_FORMATS = ("json", "ndjson", "csv", "parquet", "arrow")
+# Formats written line by line, which can be appended to and truncated, so
+# checkpointed runs can resume them.
+LINE_FORMATS = ("ndjson", "csv")
+FORMAT_EXTENSIONS: Dict[str, str] = {
+    ".jsonl": "ndjson",
+    ".ndjson": "ndjson",
+    ".csv": "csv",
+    ".parquet": "parquet",
+    ".arrow": "arrow",
+    ".feather": "arrow",
+}
+# Column types of the agent fields in columnar outputs.
+INT_FIELDS = ("reviews", "salesListings", "soldListings")
+FLOAT_FIELDS = ("rating",)
+
+def is_json_lines_path(path: str) -> bool:
+    return path.lower().endswith(JSON_LINES_EXTENSIONS)
+
+def output_format_for_path(path: str, output_format: Optional[str] = None) -> str:
+    """
+    ``output_format`` if given, else the format implied by the extension of
+    ``path`` (pretty-printed JSON for unknown extensions).
+    """
+    if output_format is not None:
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(
+                f"Unknown output format '{output_format}', expected one of "
+                f"{', '.join(OUTPUT_FORMATS)}."
+            )
+        return output_format
+    return FORMAT_EXTENSIONS.get(os.path.splitext(path)[1].lower(), "json")
+
+class JsonLinesWriter:
+    """
+    Writes agent records (dicts or ``AgentRecord``s) to an NDJSON file one
+    line at a time.
+
+    The file is flushed every ``flush_every`` records and at least every
+    ``flush_interval`` seconds, so a crash only loses the last few agents.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        append: bool = False,
+        flush_every: int = 100,
+        flush_interval: float = 5.0,
+    ) -> None:
+        self.path = path
+        self.append = append
+        self.flush_every = max(1, flush_every)
+        self.flush_interval = flush_interval
+        self.count = 0
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+        self._file: Optional[TextIO] = None
+
+    def open(self) -> "JsonLinesWriter":
+        ensure_dir_for_file(self.path)
+        self._file = open(self.path, "a" if self.append else "w", encoding="utf-8")
+        return self
+
+    def _write_record(self, record: Mapping[str, Any]) -> None:
+        assert self._file is not None
+        if isinstance(record, AgentRecord):
+            self._file.write(record.to_json())
+        else:
+            self._file.write(json.dumps(record, ensure_ascii=False))
+        self._file.write("\n")
+
+    def write(self, record: Mapping[str, Any]) -> None:
+        if self._file is None:
+            self.open()
+        self._write_record(record)
+        self.count += 1
+        self._unflushed += 1
+        if (
+            self._unflushed >= self.flush_every
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        if self._file is None:
+            return
+        self._file.flush()
+        self._unflushed = 0
+        self._last_flush = time.monotonic()
+
+    def tell(self) -> int:
+        """
+        Byte offset of the end of the data written so far.
+        """
+        if self._file is None:
+            return 0
+        self.flush()
+        return self._file.tell()
+
+    def close(self) -> None:
+        if self._file is None:
+            return
+        self.flush()
+        self._file.close()
+        self._file = None
+
+    def __enter__(self) -> "JsonLinesWriter":
+        return self.open()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+class CsvWriter(JsonLinesWriter):
+    """
+    Streams agent records to a CSV file with one column per agent field,
+    flushed like :class:`JsonLinesWriter`. Missing values are left empty.
+    The header is written unless appending to a file that already has data.
+    """
+
+    def open(self) -> "CsvWriter":
+        ensure_dir_for_file(self.path)
+        has_data = self.append and os.path.exists(self.path) and os.path.getsize(self.path) > 0
+        self._file = open(self.path, "a" if self.append else "w", encoding="utf-8", newline="")
+        self._csv = csv.writer(self._file)
+        if not has_data:
+            self._csv.writerow([key for key, _ in AGENT_FIELDS])
+        return self
+
+    def _write_record(self, record: Mapping[str, Any]) -> None:
+        self._csv.writerow([record.get(key) for key, _ in AGENT_FIELDS])
+
+class JsonArrayWriter:
+    """
+    Streams agent records into a pretty-printed JSON list, byte for byte the
+    same as ``save_json_file`` writes for the whole list, without holding
+    the records in memory.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.count = 0
+        self._file: Optional[TextIO] = None
+
+    def open(self) -> "JsonArrayWriter":
+        ensure_dir_for_file(self.path)
+        self._file = open(self.path, "w", encoding="utf-8")
+        self._file.write("[")
+        return self
+
+    def write(self, record: Mapping[str, Any]) -> None:
+        if self._file is None:
+            self.open()
+        assert self._file is not None
+        text = json.dumps(record, indent=2, ensure_ascii=False, default=agent_json_default)
+        self._file.write(",\n  " if self.count else "\n  ")
+        self._file.write(text.replace("\n", "\n  "))
+        self.count += 1
+
+    def flush(self) -> None:
+        if self._file is not None:
+            self._file.flush()
+
+    def close(self) -> None:
+        if self._file is None:
+            self.open()
+        assert self._file is not None
+        self._file.write("\n]" if self.count else "]")
+        self._file.close()
+        self._file = None
+
+    def __enter__(self) -> "JsonArrayWriter":
+        return self.open()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+def agent_schema() -> "pyarrow.Schema":
+    """
+    Arrow schema of the agent fields: strings, except for the int64 counts
+    and the float64 rating.
+    """
+    if pyarrow is None:
+        raise ValueError("Parquet and Arrow output need the pyarrow package.")
+    columns = []
+    for key, _ in AGENT_FIELDS:
+        if key in INT_FIELDS:
+            column_type = pyarrow.int64()
+        elif key in FLOAT_FIELDS:
+            column_type = pyarrow.float64()
+        else:
+            column_type = pyarrow.string()
+        columns.append(pyarrow.field(key, column_type))
+    return pyarrow.schema(columns)
+
+def _column_value(key: str, value: Any) -> Any:
+    # Coerce stray types (e.g. agents read back from an old output) to the schema.
+    if value is None:
+        return None
+    if key in INT_FIELDS:
+        return value if type(value) is int else try_int(value)
+    if key in FLOAT_FIELDS:
+        return float(value) if type(value) in (int, float) else try_float(value)
+    return value if type(value) is str else str(value)
+
+class ColumnarWriter:
+    """
+    Writes agent records to a Parquet file (``output_format="parquet"``) or
+    an Arrow IPC / Feather v2 file (``"arrow"``) with the fixed
+    :func:`agent_schema`.
+
+    Records are buffered per column and written as a record batch (a row
+    group, for Parquet) every ``batch_size`` records, so memory stays
+    bounded however large the output. The file is only valid once closed.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        output_format: str = "parquet",
+        batch_size: int = 10_000,
+        compression: Optional[str] = "zstd",
+    ) -> None:
+        if output_format not in ("parquet", "arrow"):
+            raise ValueError(f"ColumnarWriter can't write '{output_format}' files.")
+        self.path = path
+        self.output_format = output_format
+        self.batch_size = max(1, batch_size)
+        self.compression = compression
+        self.count = 0
+        self.schema = agent_schema()
+        self._columns: Dict[str, List[Any]] = {key: [] for key, _ in AGENT_FIELDS}
+        self._buffered = 0
+        self._writer: Any = None
+
+    def open(self) -> "ColumnarWriter":
+        ensure_dir_for_file(self.path)
+        if self.output_format == "parquet":
+            self._writer = pyarrow.parquet.ParquetWriter(
+                self.path, self.schema, compression=self.compression or "none"
+            )
+        else:
+            options = pyarrow.ipc.IpcWriteOptions(compression=self.compression)
+            self._writer = pyarrow.ipc.new_file(self.path, self.schema, options=options)
+        return self
+
+    def write(self, record: Mapping[str, Any]) -> None:
+        if self._writer is None:
+            self.open()
+        for key, values in self._columns.items():
+            values.append(_column_value(key, record.get(key)))
+        self._buffered += 1
+        self.count += 1
+        if self._buffered >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._writer is None or not self._buffered:
+            return
+        batch = pyarrow.RecordBatch.from_arrays(
+            [
+                pyarrow.array(self._columns[field.name], type=field.type)
+                for field in self.schema
+            ],
+            schema=self.schema,
+        )
+        self._writer.write_batch(batch)
+        for values in self._columns.values():
+            values.clear()
+        self._buffered = 0
+
+    def close(self) -> None:
+        if self._writer is None:
+            self.open()
+        self.flush()
+        self._writer.close()
+        self._writer = None
+
+    def __enter__(self) -> "ColumnarWriter":
+        return self.open()
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+def open_writer(
+    path: str,
+    output_format: str,
+    append: bool = False,
+    flush_every: int = 100,
+    batch_size: int = 10_000,
+    compression: Optional[str] = "zstd",
+) -> Any:
+    """
+    Writer for ``output_format`` (see ``OUTPUT_FORMATS``). Every writer has
+    ``write``, ``flush``, ``close`` and ``count`` and is a context manager;
+    the ``LINE_FORMATS`` ones can also ``append`` and ``tell``.
+    """
+    if append and output_format not in LINE_FORMATS:
+        raise ValueError(f"Can't append to a '{output_format}' output.")
+    if output_format == "ndjson":
+        return JsonLinesWriter(path, append=append, flush_every=flush_every)
+    if output_format == "csv":
+        return CsvWriter(path, append=append, flush_every=flush_every)
+    if output_format == "json":
+        return JsonArrayWriter(path)
+    if output_format in ("parquet", "arrow"):
+        return ColumnarWriter(
+            path, output_format, batch_size=batch_size, compression=compression
+        )
+    raise ValueError(
+        f"Unknown output format '{output_format}', expected one of {', '.join(OUTPUT_FORMATS)}."
+    )
+
+def iter_output_agents(path: str, output_format: Optional[str] = None) -> Iterator[Any]:
+    """
+    Read back the items of an output written in any of ``OUTPUT_FORMATS``.
+    CSV values are converted back to the agent field types, with empty
+    cells as None.
+    """
+    output_format = output_format_for_path(path, output_format)
+    if output_format == "ndjson":
+        yield from iter_json_lines_file(path)
+    elif output_format == "csv":
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                yield {
+                    key: _column_value(key, row.get(key) or None) for key, _ in AGENT_FIELDS
+                }
+    elif output_format in ("parquet", "arrow"):
+        if pyarrow is None:
+            raise ValueError("Reading Parquet and Arrow files needs the pyarrow package.")
+        if output_format == "parquet":
+            table = pyarrow.parquet.read_table(path)
+        else:
+            with pyarrow.ipc.open_file(path) as reader:
+                table = reader.read_all()
+        yield from table.to_pylist()
+    else:
+        data = load_json_file(path)
+        if not isinstance(data, list):
+            raise ValueError(f"{path} must be a JSON list.")
+        yield from data
@@ -0,0 +1,25 @@
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+FIXTURES_DIR = os.path.join(TESTS_DIR, "..", "benchmarks", "fixtures")
+
+# Tests import the scraper modules the same way main.py does.
+SRC_DIR = os.path.join(TESTS_DIR, "..", "src")
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
+
+class FakeClock:
+    """
+    Clock for the ``clock`` parameter of time-dependent classes; only
+    moves when a test advances it.
+    """
+
+    def __init__(self, now: float = 1000.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+    def advance(self, seconds: float) -> None:
+        self.now += seconds
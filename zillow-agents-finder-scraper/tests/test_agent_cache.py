@@ -0,0 +1,113 @@
+import asyncio
+from concurrent.futures import Future
+
+import pytest
+
+from utils.agent_cache import AgentCache
+from pipeline.builders import build_agent_cache
+
+URL = "https://www.zillow.com/profile/JaneDoe"
+
+def test_fetches_each_profile_once():
+    cache = AgentCache()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return {"profileUrl": URL}
+
+    assert cache.get_or_fetch(URL, fetch) == {"profileUrl": URL}
+    assert cache.get_or_fetch("HTTPS://WWW.ZILLOW.COM/profile/JaneDoe/?tab=reviews", fetch)
+    assert len(calls) == 1
+    assert (cache.misses, cache.hits) == (1, 1)
+
+def test_failed_fetches_are_not_cached():
+    cache = AgentCache()
+    assert cache.get_or_fetch(URL, lambda: None) is None
+    assert cache.get_or_fetch(URL, lambda: {"profileUrl": URL}) == {"profileUrl": URL}
+
+def test_max_entries_drops_least_recently_used():
+    cache = AgentCache(max_entries=2)
+    for name in ("a", "b", "c"):
+        cache.get_or_fetch(f"{URL}{name}", lambda: {"name": name})
+    assert len(cache) == 2
+    assert cache.get_or_fetch(f"{URL}a", lambda: {"name": "again"}) == {"name": "again"}
+
+def test_seeded_agents_are_kept_past_max_entries():
+    cache = AgentCache(max_entries=0)
+    cache.seed(URL, {"name": "seeded"})
+    cache.get_or_fetch(f"{URL}b", lambda: {"name": "b"})
+    assert cache.get_or_fetch(URL, lambda: None) == {"name": "seeded"}
+
+def test_get_or_submit_returns_without_waiting():
+    cache = AgentCache()
+    parsed = Future()
+    owner = cache.get_or_submit(URL, lambda: parsed)
+    waiter = cache.get_or_submit(URL, lambda: pytest.fail("fetched twice"))
+    assert not owner.done() and not waiter.done()
+    parsed.set_result({"name": "parsed"})
+    assert owner.result() == waiter.result() == {"name": "parsed"}
+    assert cache.get_or_submit(URL, lambda: pytest.fail("not cached")).result() == {"name": "parsed"}
+
+def test_get_or_submit_failure_is_not_cached():
+    cache = AgentCache()
+    parsed = Future()
+    owner = cache.get_or_submit(URL, lambda: parsed)
+    waiter = cache.get_or_submit(URL, lambda: pytest.fail("fetched twice"))
+    parsed.set_exception(ValueError("bad page"))
+    with pytest.raises(ValueError):
+        owner.result()
+    assert waiter.result() is None
+    retried = Future()
+    retried.set_result({"name": "retried"})
+    assert cache.get_or_submit(URL, lambda: retried).result() == {"name": "retried"}
+
+def test_agent_cache_settings():
+    assert build_agent_cache({}).max_entries is None
+    assert build_agent_cache({"agent_cache_max_entries": None}).max_entries is None
+    assert build_agent_cache({"agent_cache_max_entries": 50}).max_entries == 50
+    assert build_agent_cache({"agent_cache_max_entries": 0}) is None
+    assert build_agent_cache({"agent_cache_enabled": False}) is None
+    with pytest.raises(ValueError):
+        build_agent_cache({"agent_cache_max_entries": -1})
+
+def test_waiter_fetches_again_when_owner_is_cancelled():
+    async def run():
+        cache = AgentCache()
+        started = asyncio.Event()
+
+        async def slow():
+            started.set()
+            await asyncio.sleep(10)
+            return {"name": "slow"}
+
+        async def fast():
+            return {"name": "fast"}
+
+        owner = asyncio.create_task(cache.get_or_fetch_async(URL, slow))
+        await started.wait()
+        waiter = asyncio.create_task(cache.get_or_fetch_async(URL, fast))
+        await asyncio.sleep(0)
+        owner.cancel()
+        result = await waiter
+        assert owner.cancelled()
+        return result, await cache.get_or_fetch_async(URL, fast)
+
+    assert asyncio.run(run()) == ({"name": "fast"}, {"name": "fast"})
+
+def test_waiters_share_the_owner_result():
+    async def run():
+        cache = AgentCache()
+        calls = []
+
+        async def fetch():
+            calls.append(1)
+            await asyncio.sleep(0.01)
+            return {"name": "shared"}
+
+        results = await asyncio.gather(*(cache.get_or_fetch_async(URL, fetch) for _ in range(5)))
+        return results, len(calls)
+
+    results, calls = asyncio.run(run())
+    assert results == [{"name": "shared"}] * 5
+    assert calls == 1
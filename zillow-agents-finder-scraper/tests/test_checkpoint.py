@@ -0,0 +1,94 @@
+import json
+
+import pytest
+
+from utils.agent_record import AgentRecord
+from utils.checkpoint import CheckpointJournal
+from pipeline.runner import run_with_checkpoint
+
+URL = "https://www.zillow.com/profile/JaneDoe"
+QUERY = {"name": "Jane Doe", "limit": 1}
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "out.jsonl.checkpoint")
+
+def test_finished_queries_are_skipped_on_resume(path):
+    journal = CheckpointJournal(path)
+    journal.record_output_offset(0)
+    journal.mark_query_done(1, QUERY, output_offset=120)
+    journal.close()
+
+    resumed = CheckpointJournal(path, resume=True)
+    assert resumed.is_query_done(1, QUERY)
+    assert not resumed.is_query_done(1, {"name": "Someone else"})
+    assert not resumed.is_query_done(2, QUERY)
+    assert resumed.output_offset == 120
+    resumed.close()
+
+def test_profiles_of_unfinished_queries_are_replayed(path):
+    journal = CheckpointJournal(path)
+    journal.record_profile(1, URL, {"agentName": "Done"})
+    journal.mark_query_done(1, QUERY, output_offset=50)
+    journal.record_profile(2, URL, AgentRecord(agent_name="Jane Doe", profile_url=URL))
+    journal.close()
+
+    resumed = CheckpointJournal(path, resume=True)
+    assert resumed.get_profile(1, URL) is None
+    replayed = resumed.profile_log(2).get(URL)
+    assert replayed is not None
+    assert replayed.agent_name == "Jane Doe"
+    resumed.close()
+
+def test_output_offset_is_recorded_before_the_first_query(path):
+    journal = CheckpointJournal(path)
+    journal.record_output_offset(92)
+    journal.close()
+    assert CheckpointJournal(path, resume=True).output_offset == 92
+
+def test_partial_last_line_is_ignored_and_appends_continue(path):
+    journal = CheckpointJournal(path)
+    journal.mark_query_done(1, QUERY, output_offset=10)
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"type": "query", "index": 2')
+
+    resumed = CheckpointJournal(path, resume=True)
+    resumed.mark_query_done(2, QUERY, output_offset=20)
+    resumed.close()
+
+    again = CheckpointJournal(path, resume=True)
+    assert again.is_query_done(1, QUERY) and again.is_query_done(2, QUERY)
+    assert again.output_offset == 20
+    again.close()
+
+def test_a_new_journal_replaces_the_old_one(path):
+    journal = CheckpointJournal(path)
+    journal.mark_query_done(1, QUERY, output_offset=10)
+    journal.close()
+    CheckpointJournal(path).close()
+    assert not CheckpointJournal(path, resume=True).is_query_done(1, QUERY)
+
+def test_writes_after_close_are_dropped(path):
+    journal = CheckpointJournal(path)
+    journal.close()
+    journal.record_profile(1, URL, {"agentName": "Late"})
+    journal.close()
+    with open(path, encoding="utf-8") as f:
+        assert f.read() == ""
+
+def test_journal_lines_are_json(path):
+    journal = CheckpointJournal(path)
+    journal.record_profile(3, URL, AgentRecord(agent_name="Jane Doe", reviews=4))
+    journal.close()
+    with open(path, encoding="utf-8") as f:
+        entry = json.loads(f.readline())
+    assert entry["type"] == "profile" and entry["query"] == 3
+    assert entry["agent"]["reviews"] == 4
+
+def test_resume_without_a_checkpoint_keeps_the_output(tmp_path):
+    output = tmp_path / "out.jsonl"
+    output.write_text('{"agentName": "Kept"}\n', encoding="utf-8")
+    with pytest.raises(ValueError):
+        run_with_checkpoint([QUERY], {}, str(output), str(output) + ".checkpoint", resume=True)
+    assert output.read_text(encoding="utf-8") == '{"agentName": "Kept"}\n'
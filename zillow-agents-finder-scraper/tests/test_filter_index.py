@@ -0,0 +1,83 @@
+import json
+import random
+
+from extractors.filter_index import AgentIndex
+from extractors.filters import AgentFilter, filter_agents
+from pipeline.offline import filter_previous_output
+
+CITIES = (("Orlando", "FL", "328"), ("Los Angeles", "CA", "900"), ("Austin", "TX", "787"))
+# Values the numeric filters have to coerce the same way filter_agents does.
+ODD_REVIEWS = (None, "17", "n/a", 12.9, True, "", "-3")
+ODD_RATINGS = (None, "4.5", "n/a", 5, "nan", "", float("inf"))
+
+def build_agents(count, rng):
+    agents = []
+    for i in range(count):
+        city, state, zip_prefix = rng.choice(CITIES)
+        roll = rng.random()
+        if roll < 0.05:
+            location = None
+        elif roll < 0.5:
+            location = f"{city}, {state} {zip_prefix}{rng.randint(0, 99):02d}"
+        else:
+            location = f"{city.upper() if roll < 0.6 else city}, {state}"
+        agents.append(
+            {
+                "agentName": f"Agent {i}",
+                "profileUrl": f"https://www.zillow.com/profile/agent-{i}",
+                "location": location,
+                "reviews": rng.choice(ODD_REVIEWS) if rng.random() < 0.1 else rng.randint(0, 400),
+                "rating": rng.choice(ODD_RATINGS) if rng.random() < 0.1 else round(rng.uniform(1, 5), 1),
+            }
+        )
+    return agents
+
+def build_filters(count, rng):
+    filters = [AgentFilter()]
+    while len(filters) < count:
+        city, state, zip_prefix = rng.choice(CITIES)
+        filters.append(
+            AgentFilter(
+                location=rng.choice((None, city, city.lower(), f"{city}, {state}", state, "nowhere")),
+                zip=rng.choice((None, None, zip_prefix, f"{zip_prefix}1")),
+                min_reviews=rng.choice((None, 0, 10, 200, "25", 10_000)),
+                min_rating=rng.choice((None, 3.0, 4.5, "4", float("nan"))),
+            )
+        )
+    return filters
+
+def test_matches_filter_agents():
+    rng = random.Random(7)
+    agents = build_agents(2_000, rng)
+    index = AgentIndex(agents)
+    filters = build_filters(300, rng)
+    for f, got in zip(filters, index.filter_many(filters)):
+        want = filter_agents(agents, f)
+        assert len(got) == len(want), f
+        assert all(a is b for a, b in zip(got, want)), f
+
+def test_empty_index():
+    index = AgentIndex([])
+    assert len(index) == 0
+    assert index.filter(AgentFilter(location="Orlando")) == []
+
+def test_filter_previous_output(tmp_path):
+    rng = random.Random(11)
+    agents = build_agents(500, rng)
+    previous = tmp_path / "previous.jsonl"
+    previous.write_text("".join(json.dumps(agent) + "\n" for agent in agents), encoding="utf-8")
+    queries = [
+        {"name": "ignored", "filters": {"location": "orlando", "min_reviews": 50}, "limit": 5},
+        {"filters": {"min_rating": 4.5}},
+        {"filters": {"zip": "900"}, "limit": 0},
+    ]
+    output = tmp_path / "filtered.jsonl"
+
+    filter_previous_output(queries, str(previous), {}, str(output))
+
+    written = [json.loads(line) for line in output.read_text(encoding="utf-8").splitlines()]
+    expected = (
+        filter_agents(agents, AgentFilter(location="orlando", min_reviews=50))[:5]
+        + filter_agents(agents, AgentFilter(min_rating=4.5))
+    )
+    assert [agent["profileUrl"] for agent in written] == [agent["profileUrl"] for agent in expected]
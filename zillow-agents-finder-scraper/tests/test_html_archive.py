@@ -0,0 +1,130 @@
+import glob
+import os
+
+import pytest
+
+from conftest import FIXTURES_DIR
+from extractors.reparse import iter_reparsed_profiles
+from extractors.zillow_parser import ZillowParser
+from utils.html_archive import INDEX_FILE, HtmlArchive, archive_url, zstandard
+
+BASE = "https://www.zillow.com"
+
+@pytest.fixture
+def directory(tmp_path):
+    return str(tmp_path / "archive")
+
+def segments(directory):
+    return sorted(name for name in os.listdir(directory) if name.startswith("segment-"))
+
+def test_bodies_read_back_as_written(directory):
+    archive = HtmlArchive(directory)
+    bodies = {f"{BASE}/profile/agent-{i}": f"<html>agent {i} é</html>" * (i + 1) for i in range(5)}
+    entries = [archive.append(url, body) for url, body in bodies.items()]
+    assert [archive.read(entry) for entry in entries] == list(bodies.values())
+    archive.close()
+
+    reopened = HtmlArchive(directory)
+    assert [entry.url for entry in reopened.entries()] == list(bodies)
+    assert [reopened.read(entry) for entry in reopened.entries()] == list(bodies.values())
+    reopened.close()
+
+def test_segments_roll_over_at_the_size_limit(directory):
+    archive = HtmlArchive(directory, segment_max_bytes=400)
+    entries = [archive.append(f"{BASE}/profile/{i}", os.urandom(150).hex()) for i in range(6)]
+    archive.close()
+    names = segments(directory)
+    assert len(names) > 1
+    assert names[0] == "segment-000001.html.gz"
+    for name in names:
+        assert os.path.getsize(os.path.join(directory, name)) <= 400
+    assert len({entry.segment for entry in entries}) == len(names)
+
+def test_oversized_body_gets_a_segment_of_its_own(directory):
+    archive = HtmlArchive(directory, segment_max_bytes=100)
+    first = archive.append(f"{BASE}/a", os.urandom(200).hex())
+    second = archive.append(f"{BASE}/b", "small")
+    assert first.segment != second.segment
+    assert archive.read(first) and archive.read(second) == "small"
+    archive.close()
+
+def test_reopened_archive_appends_to_the_last_segment(directory):
+    archive = HtmlArchive(directory)
+    first = archive.append(f"{BASE}/a", "one")
+    archive.close()
+    archive = HtmlArchive(directory)
+    second = archive.append(f"{BASE}/b", "two")
+    assert second.segment == first.segment
+    assert second.offset == first.offset + first.length
+    archive.close()
+
+def test_reads_see_bodies_appended_after_mapping(directory):
+    archive = HtmlArchive(directory)
+    first = archive.append(f"{BASE}/a", "one")
+    assert archive.read(first) == "one"
+    second = archive.append(f"{BASE}/b", "two")
+    assert archive.read(second) == "two"
+    archive.close()
+
+def test_latest_entries_keep_the_newest_copy_in_first_seen_order(directory):
+    archive = HtmlArchive(directory)
+    archive.append(f"{BASE}/a", "a-old", fetched_at=1.0)
+    archive.append(f"{BASE}/b", "b", fetched_at=2.0)
+    archive.append(f"{BASE}/a", "a-new", fetched_at=3.0)
+    archive.append(f"{BASE}/a", "a-stale", fetched_at=0.5)
+    latest = archive.latest_entries()
+    assert [entry.url for entry in latest] == [f"{BASE}/a", f"{BASE}/b"]
+    assert [archive.read(entry) for entry in latest] == ["a-new", "b"]
+    archive.close()
+
+def test_query_parameters_are_part_of_the_url(directory):
+    archive = HtmlArchive(directory)
+    entry = archive.append(f"{BASE}/agents/", "results", params={"searchQuery": "Jane Doe"})
+    assert entry.url == f"{BASE}/agents/?searchQuery=Jane+Doe"
+    assert archive_url(f"{BASE}/x?page=2", {"a": 1}) == f"{BASE}/x?page=2&a=1"
+    archive.close()
+
+def test_reading_an_empty_archive(directory):
+    archive = HtmlArchive(directory)
+    assert archive.latest_entries() == []
+    assert not os.path.exists(directory)
+    archive.close()
+
+def test_a_second_writer_is_refused(directory):
+    writer = HtmlArchive(directory)
+    writer.lock_directory()
+    other = HtmlArchive(directory)
+    with pytest.raises(ValueError):
+        other.append(f"{BASE}/a", "body")
+    writer.close()
+    other.append(f"{BASE}/a", "body")
+    other.close()
+    with open(os.path.join(directory, INDEX_FILE), encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
+
+def test_unknown_compression_is_rejected(directory):
+    with pytest.raises(ValueError):
+        HtmlArchive(directory, compression="brotli")
+
+@pytest.mark.skipif(zstandard is None, reason="zstandard not installed")
+def test_zstd_segments(directory):
+    archive = HtmlArchive(directory, compression="zstd")
+    entry = archive.append(f"{BASE}/a", "<html>zstd</html>")
+    assert entry.segment.endswith(".html.zst")
+    assert archive.read(entry) == "<html>zstd</html>"
+    archive.close()
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_reparse_matches_parsing_the_pages(directory, workers):
+    archive = HtmlArchive(directory)
+    parser = ZillowParser()
+    expected = []
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, "profiles", "*.html"))):
+        with open(path, encoding="utf-8") as f:
+            html = f.read()
+        url = f"{BASE}/profile/{os.path.splitext(os.path.basename(path))[0]}"
+        archive.append(url, html)
+        expected.append(parser.parse_agent_profile(html, profile_url=url))
+    archive.append(f"{BASE}/agents/", "<html>not a profile</html>")
+    archive.close()
+    assert list(iter_reparsed_profiles(directory, workers=workers, chunk_size=2)) == expected
@@ -0,0 +1,62 @@
+import glob
+import os
+
+import pytest
+from bs4.builder import builder_registry
+
+from conftest import FIXTURES_DIR
+from extractors.zillow_parser import ZillowParser
+
+REFERENCE = ZillowParser(backend="html.parser", single_pass=False, embedded_state=False)
+
+def load_fixtures(kind):
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(FIXTURES_DIR, kind, "*.html"))):
+        with open(path, "r", encoding="utf-8") as f:
+            pages[os.path.basename(path)] = f.read()
+    return pages
+
+PROFILES = load_fixtures("profiles")
+SEARCHES = load_fixtures("search")
+
+def parser_configs():
+    for backend in ZillowParser.BACKENDS:
+        installed = builder_registry.lookup(backend) is not None
+        for single_pass in (True, False):
+            for embedded_state in (True, False):
+                yield pytest.param(
+                    (backend, single_pass, embedded_state),
+                    id=f"{backend}-{'single' if single_pass else 'per-field'}"
+                    f"{'-embedded' if embedded_state else ''}",
+                    marks=pytest.mark.skipif(not installed, reason=f"{backend} not installed"),
+                )
+
+@pytest.fixture(params=list(parser_configs()))
+def parser(request):
+    backend, single_pass, embedded_state = request.param
+    parser = ZillowParser(backend=backend, single_pass=single_pass, embedded_state=embedded_state)
+    yield parser
+    parser.close()
+
+def test_fixtures_present():
+    assert PROFILES and SEARCHES
+
+@pytest.mark.parametrize("name", sorted(PROFILES))
+def test_profile_matches_reference(parser, name):
+    html = PROFILES[name]
+    url = f"https://www.zillow.com/profile/{os.path.splitext(name)[0]}"
+    assert parser.parse_agent_profile(html) == REFERENCE.parse_agent_profile(html)
+    assert parser.parse_agent_profile(html, profile_url=url) == REFERENCE.parse_agent_profile(
+        html, profile_url=url
+    )
+
+@pytest.mark.parametrize("name", sorted(SEARCHES))
+def test_search_page_matches_reference(parser, name):
+    html = SEARCHES[name]
+    assert parser.parse_search_results(html) == REFERENCE.parse_search_results(html)
+    assert parser.parse_search_page(html) == REFERENCE.parse_search_page(html)
+    assert parser.parse_search_page(html, limit=1) == REFERENCE.parse_search_page(html, limit=1)
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        ZillowParser(backend="no-such-parser")
@@ -0,0 +1,87 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from utils.helpers import chain_future
+from pipeline.queries import _iter_candidate_profiles
+
+URL = "https://www.zillow.com/profile/agent-"
+
+class StubClient:
+    def __init__(self):
+        self.fetched = []
+
+    def get_url(self, url):
+        self.fetched.append(url)
+        return f"<html>{url}</html>"
+
+class DeferredParser:
+    """
+    Parser that queues pages until ``release`` parses them all, like a
+    parser pool whose workers are busy.
+    """
+
+    def __init__(self, max_pending):
+        self.max_pending = max_pending
+        self.pending = []
+        self.released = False
+        self._lock = threading.Lock()
+
+    def submit_agent_profile(self, html, profile_url=None):
+        future = Future()
+        with self._lock:
+            if not self.released:
+                self.pending.append((future, profile_url))
+                return future
+        future.set_result({"profileUrl": profile_url})
+        return future
+
+    def release(self):
+        with self._lock:
+            self.released = True
+            pending, self.pending = self.pending, []
+        for future, profile_url in pending:
+            future.set_result({"profileUrl": profile_url})
+
+def test_fetching_goes_on_while_pages_are_parsed():
+    client = StubClient()
+    parser = DeferredParser(max_pending=3)
+    urls = [f"{URL}{i}" for i in range(8)]
+    queued_before_release = []
+
+    def release_when_idle():
+        # Wait until fetching stops making progress, then let parsing finish.
+        deadline = time.monotonic() + 5
+        seen = -1
+        while time.monotonic() < deadline and len(client.fetched) != seen:
+            seen = len(client.fetched)
+            time.sleep(0.2)
+        queued_before_release.append(len(parser.pending))
+        parser.release()
+
+    releaser = threading.Thread(target=release_when_idle)
+    releaser.start()
+    agents = list(_iter_candidate_profiles(client, parser, iter(urls), concurrency=2))
+    releaser.join()
+
+    assert [agent["profileUrl"] for agent in agents] == urls
+    # Two fetch threads plus the parser's queue, none of them waiting on a parse.
+    assert queued_before_release == [5]
+
+def test_chain_future():
+    source = Future()
+    chained = chain_future(source, lambda value: value * 2)
+    source.set_result(21)
+    assert chained.result() == 42
+
+    source = Future()
+    chained = chain_future(source, lambda value: value)
+    source.set_exception(ValueError("bad"))
+    assert isinstance(chained.exception(), ValueError)
+
+    calls = []
+    source = Future()
+    chained = chain_future(source, calls.append)
+    assert chained.cancel()
+    source.set_result(1)
+    assert calls == []
@@ -0,0 +1,42 @@
+import pytest
+
+from extractors.filters import AgentFilter, may_match
+from extractors.zillow_parser import ZillowParser
+
+URL = "https://www.zillow.com/profile/JaneDoe"
+
+def card_reviews(card_html):
+    html = f'<ul><li class="agent-card"><a href="{URL}">Jane Doe</a>{card_html}</li></ul>'
+    parser = ZillowParser(backend="html.parser")
+    (candidate,) = parser.parse_search_page(html).candidates
+    return candidate.reviews
+
+@pytest.mark.parametrize(
+    "card_html, reviews",
+    [
+        ('<span class="reviews">262 reviews</span>', 262),
+        ('<span class="review-count">(1,024)</span>', 1024),
+        ('<meta itemprop="reviewCount" content="31">', 31),
+        ('<span itemprop="reviewCount">45</span> reviews', 45),
+        ("<span>12 reviews</span>", 12),
+        # Text that mentions reviews but isn't a count of them.
+        ('<p class="review-snippet">Sold 3 homes for us, 5 stars</p>', None),
+        ('<div class="reviews">Top review from 2019</div>', None),
+        ("<p>Read 2 of her reviews</p>", None),
+        ("", None),
+    ],
+)
+def test_card_review_count(card_html, reviews):
+    assert card_reviews(card_html) == reviews
+
+def test_count_element_inside_review_section():
+    card_html = (
+        '<div class="reviews-section"><p>Sold 3 homes</p>'
+        '<span class="review-count">88 reviews</span></div>'
+    )
+    assert card_reviews(card_html) == 88
+
+def test_card_without_count_is_not_ruled_out():
+    reviews = card_reviews('<p class="review-snippet">Closed 3 deals in 2 weeks</p>')
+    candidate = {"profileUrl": URL, "reviews": reviews}
+    assert may_match(candidate, AgentFilter(min_reviews=50))
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+
+import pytest
+
+from conftest import FakeClock
+from utils.rate_limiter import RateLimiter
+from utils.throttle import MAX_RETRY_AFTER_SECONDS, AdaptiveThrottle, parse_retry_after
+
+def take(throttle, count):
+    return [throttle.acquire()[0] for _ in range(count)]
+
+def test_starts_at_max_concurrency():
+    throttle = AdaptiveThrottle(4, clock=FakeClock())
+    take(throttle, 4)
+    assert throttle.limit == 4
+    assert throttle.in_flight == 4
+
+def test_acquire_blocks_until_a_slot_is_released():
+    throttle = AdaptiveThrottle(1, clock=FakeClock())
+    (token,) = take(throttle, 1)
+    waiter = threading.Thread(target=throttle.acquire)
+    waiter.start()
+    waiter.join(timeout=0.1)
+    assert waiter.is_alive()
+    throttle.release(token, 200)
+    waiter.join(timeout=2)
+    assert not waiter.is_alive()
+    assert throttle.in_flight == 1
+
+def test_throttle_status_halves_concurrency_and_rate():
+    limiter = RateLimiter(600)
+    throttle = AdaptiveThrottle(8, rate_limiter=limiter, clock=FakeClock())
+    (token,) = take(throttle, 1)
+    throttle.release(token, 429)
+    assert throttle.limit == 4
+    assert throttle.rate_fraction == pytest.approx(0.5)
+    assert limiter.rate_fraction == pytest.approx(0.5)
+
+def test_one_burst_of_throttled_responses_decreases_once():
+    throttle = AdaptiveThrottle(8, clock=FakeClock())
+    tokens = take(throttle, 3)
+    for token in tokens:
+        throttle.release(token, 503)
+    assert throttle.limit == 4
+    (token,) = take(throttle, 1)
+    throttle.release(token, 503)
+    assert throttle.limit == 2
+
+def test_decreases_stop_at_the_minimums():
+    throttle = AdaptiveThrottle(8, min_concurrency=2, min_rate_fraction=0.25, clock=FakeClock())
+    for _ in range(10):
+        (token,) = take(throttle, 1)
+        throttle.release(token, 429)
+    assert throttle.limit == 2
+    assert throttle.rate_fraction == pytest.approx(0.25)
+
+def test_healthy_responses_recover_up_to_the_maximum():
+    throttle = AdaptiveThrottle(4, rate_step=0.1, clock=FakeClock())
+    (token,) = take(throttle, 1)
+    throttle.release(token, 429)
+    assert throttle.limit == 2
+    limits = []
+    for _ in range(40):
+        (token,) = take(throttle, 1)
+        throttle.release(token, 200)
+        limits.append(throttle.limit)
+    assert limits == sorted(limits)
+    assert limits[0] == 2
+    assert throttle.limit == 4
+    assert throttle.rate_fraction == 1.0
+
+def test_errors_without_a_status_leave_the_limits_alone():
+    throttle = AdaptiveThrottle(4, clock=FakeClock())
+    (token,) = take(throttle, 1)
+    throttle.release(token, 429)
+    (token,) = take(throttle, 1)
+    throttle.release(token, None)
+    (token,) = take(throttle, 1)
+    throttle.release(token, 404)
+    assert throttle.limit == 2
+    assert throttle.in_flight == 0
+
+def test_retry_after_pauses_new_requests():
+    throttle = AdaptiveThrottle(4)
+    token, _ = throttle.acquire()
+    throttle.release(token, 429, retry_after=0.2)
+    _, waited = throttle.acquire()
+    assert waited >= 0.15
+
+def test_acquire_async_waits_for_release():
+    async def run():
+        throttle = AdaptiveThrottle(1, clock=FakeClock())
+        token, _ = await throttle.acquire_async()
+        waiter = asyncio.create_task(throttle.acquire_async())
+        await asyncio.sleep(0.05)
+        assert not waiter.done()
+        throttle.release(token, 200)
+        await asyncio.wait_for(waiter, timeout=2)
+        return throttle.in_flight
+
+    assert asyncio.run(run()) == 1
+
+@pytest.mark.parametrize(
+    "kwargs",
+    [{"max_concurrency": 0}, {"min_rate_fraction": 0}, {"decrease_factor": 1}],
+)
+def test_rejects_bad_settings(kwargs):
+    options = {"max_concurrency": 4, **kwargs}
+    with pytest.raises(ValueError):
+        AdaptiveThrottle(**options)
+
+def test_parse_retry_after():
+    assert parse_retry_after(None) is None
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after("nan") is None
+    assert parse_retry_after("12") == 12.0
+    assert parse_retry_after("-5") == 0.0
+    assert parse_retry_after("100000") == MAX_RETRY_AFTER_SECONDS
+    assert parse_retry_after("Wed, 21 Oct 2015 07:28:30 GMT", now=1445412480.0) == 30.0
@@ -0,0 +1,112 @@
+import pytest
+
+from conftest import FakeClock
+from utils.work_queue import WorkQueue
+
+def make_queries(count):
+    return [{"name": f"Agent {i}"} for i in range(1, count + 1)]
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = WorkQueue(str(tmp_path / "queue.sqlite"), lease_seconds=60, clock=clock)
+    yield queue
+    queue.close()
+
+def agents_for(batch):
+    return [
+        [{"agentName": query["name"], "profileUrl": f"https://www.zillow.com/profile/{query['name']}"}]
+        for query in batch.queries
+    ]
+
+def test_enqueue_splits_input_into_numbered_batches(queue):
+    assert queue.enqueue(make_queries(5), batch_size=2) == 5
+    assert queue.enqueue(make_queries(1), batch_size=2) == 1
+    batches = [queue.claim("w1") for _ in range(4)]
+    assert [batch.first_index for batch in batches] == [1, 3, 5, 6]
+    assert [len(batch.queries) for batch in batches] == [2, 2, 1, 1]
+    assert queue.claim("w1") is None
+    assert queue.counts() == {"pending": 0, "leased": 4, "done": 0}
+
+def test_batches_are_claimed_once_while_leased(queue, clock):
+    queue.enqueue(make_queries(2), batch_size=1)
+    first = queue.claim("w1")
+    second = queue.claim("w2")
+    assert first.id != second.id
+    clock.advance(59)
+    assert queue.claim("w3") is None
+
+def test_expired_lease_is_handed_to_another_worker(queue, clock):
+    queue.enqueue(make_queries(1), batch_size=1)
+    batch = queue.claim("w1")
+    clock.advance(61)
+    taken_over = queue.claim("w2")
+    assert taken_over is not None
+    assert taken_over.id == batch.id
+    assert taken_over.queries == batch.queries
+
+def test_heartbeat_extends_the_lease(queue, clock):
+    queue.enqueue(make_queries(1), batch_size=1)
+    queue.claim("w1")
+    clock.advance(50)
+    queue.heartbeat("w1")
+    clock.advance(50)
+    assert queue.claim("w2") is None
+    clock.advance(11)
+    assert queue.claim("w2") is not None
+
+def test_a_batch_is_only_completed_once(queue, clock):
+    queue.enqueue(make_queries(1), batch_size=1)
+    batch = queue.claim("w1")
+    clock.advance(61)
+    retry = queue.claim("w2")
+    assert queue.complete(retry, agents_for(retry))
+    assert not queue.complete(batch, [[{"agentName": "late"}]])
+    assert [agent.agent_name for agent in queue.iter_merged_agents()] == ["Agent 1"]
+    assert queue.counts()["done"] == 1
+
+def test_finished_only_once_sealed_and_done(queue):
+    queue.enqueue(make_queries(2), batch_size=2)
+    batch = queue.claim("w1")
+    queue.complete(batch, agents_for(batch))
+    assert not queue.is_finished()
+    queue.seal()
+    assert queue.is_sealed()
+    assert queue.is_finished()
+
+def test_merged_agents_follow_input_order_without_duplicates(queue):
+    queue.enqueue(make_queries(3), batch_size=2)
+    first = queue.claim("w1")
+    second = queue.claim("w2")
+    shared = {"agentName": "Shared", "profileUrl": "https://www.zillow.com/profile/Shared"}
+    queue.complete(second, [[shared, {"agentName": "No URL"}]])
+    queue.complete(
+        first,
+        [
+            [{"agentName": "A", "profileUrl": "https://www.zillow.com/profile/A"}],
+            [{"agentName": "Shared again", "profileUrl": "HTTPS://WWW.ZILLOW.COM/profile/Shared/"}],
+        ],
+    )
+    names = [agent.agent_name for agent in queue.iter_merged_agents()]
+    assert names == ["A", "Shared again", "No URL"]
+
+def test_queue_is_shared_between_connections(tmp_path, clock):
+    path = str(tmp_path / "queue.sqlite")
+    coordinator = WorkQueue(path, clock=clock)
+    worker = WorkQueue(path, clock=clock)
+    try:
+        coordinator.enqueue(make_queries(1))
+        coordinator.seal()
+        batch = worker.claim("w1")
+        worker.complete(batch, agents_for(batch))
+        assert coordinator.is_finished()
+    finally:
+        coordinator.close()
+        worker.close()
+
+def test_rejects_empty_batches(queue):
+    with pytest.raises(ValueError):
+        queue.enqueue(make_queries(1), batch_size=0)